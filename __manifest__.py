@@ -1,6 +1,6 @@
 {
     'name': 'TravelPro ERP',
-    'version': '16.0.4.1',
+    'version': '16.0.4.7',
     'summary': 'Agence de Voyage - Réservations, Crédit, Caisse, Factures',
     'description': '''
         Module complet de gestion d'agence de voyage:
@@ -57,6 +57,8 @@
         # Vues principales
         'views/company_views.xml',
         'views/member_views.xml',
+        'views/member_import_wizard_views.xml',
+        'views/member_duplicate_views.xml',
         'views/supplier_views.xml',
         'views/service_views.xml',
         'views/travel_views.xml',
@@ -80,6 +82,8 @@
         'views/pos_views.xml',
         # Rapports
         'views/report_reservation_quote.xml',
+        'views/report_batch_views.xml',
+        'views/perf_sample_views.xml',
         # Menu (doit être chargé en dernier)
         'views/menu.xml',
     ],
@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+"""
+Migration du registre crédit: initialisation des soldes courants
+(balance_after) sur l'historique existant.
+"""
+
+
+def migrate(cr, version):
+    """
+    Remplir balance_after pour toutes les lignes d'historique crédit.
+
+    Le solde courant d'une ligne est la somme cumulée des montants du
+    membre dans l'ordre d'insertion (id).
+    """
+    cr.execute("""
+        UPDATE travel_credit_history h
+           SET balance_after = r.running
+          FROM (SELECT id, ROUND(SUM(amount) OVER (PARTITION BY member_id ORDER BY id)::numeric, 2) AS running
+                  FROM travel_credit_history) r
+         WHERE h.id = r.id
+    """)
+    print(f"Migration registre crédit: {cr.rowcount} lignes mises à jour")
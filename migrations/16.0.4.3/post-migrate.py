@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+Migration des caisses vers les sessions de caisse.
+"""
+from odoo import SUPERUSER_ID, api
+
+
+def migrate(cr, version):
+    """
+    Créer une session pour chaque caisse déjà ouverte (ou fermée) avant
+    l'introduction de cash.register.session, avec les totaux de sa
+    dernière période d'ouverture.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    cashes = env['cash.register'].with_context(active_test=False).search([])
+    cashes._init_legacy_sessions()
+    print(f"Migration sessions de caisse: {len(cashes)} caisse(s) traitée(s)")
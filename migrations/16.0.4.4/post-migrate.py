@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Stockage des montants des lignes de facture client: remplissage par lots.
+"""
+from odoo import SUPERUSER_ID, api
+
+CHUNK_SIZE = 1000
+
+AMOUNT_FIELDS = ['price_unit', 'price_subtotal', 'price_tax', 'price_total']
+
+
+def migrate(cr, version):
+    """
+    Calculer price_unit, price_subtotal, price_tax et price_total des
+    lignes existantes par lots, en vidant le cache entre deux lots.
+    """
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    Line = env['travel.invoice.client.line']
+    cr.execute("SELECT id FROM travel_invoice_client_line WHERE price_total IS NULL ORDER BY id")
+    line_ids = [row[0] for row in cr.fetchall()]
+
+    for start in range(0, len(line_ids), CHUNK_SIZE):
+        lines = Line.browse(line_ids[start:start + CHUNK_SIZE])
+        for fname in AMOUNT_FIELDS:
+            env.add_to_compute(Line._fields[fname], lines)
+        lines.flush_recordset(AMOUNT_FIELDS)
+        env.invalidate_all()
+
+    print(f"Migration lignes de facture: {len(line_ids)} montants calculés")
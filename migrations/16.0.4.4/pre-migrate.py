@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""
+Stockage des montants des lignes de facture client.
+
+Les colonnes sont créées avant le chargement du module pour éviter le
+recalcul complet (en une seule transaction mémoire) par l'ORM; elles
+sont remplies par lots dans post-migrate.py.
+"""
+
+
+def migrate(cr, version):
+    """Créer les colonnes stockées et copier les champs de la facture."""
+    cr.execute("""
+        ALTER TABLE travel_invoice_client_line
+            ADD COLUMN IF NOT EXISTS price_unit numeric,
+            ADD COLUMN IF NOT EXISTS price_subtotal numeric,
+            ADD COLUMN IF NOT EXISTS price_tax numeric,
+            ADD COLUMN IF NOT EXISTS price_total numeric,
+            ADD COLUMN IF NOT EXISTS travel_company_id int4,
+            ADD COLUMN IF NOT EXISTS date_invoice date,
+            ADD COLUMN IF NOT EXISTS invoice_state varchar
+    """)
+    cr.execute("""
+        UPDATE travel_invoice_client_line l
+           SET travel_company_id = i.travel_company_id,
+               date_invoice = i.date_invoice,
+               invoice_state = i.state
+          FROM travel_invoice_client i
+         WHERE i.id = l.invoice_id
+    """)
+    print(f"Migration lignes de facture: {cr.rowcount} lignes rattachées à leur facture")
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+Récapitulatif TVA stocké: initialisation pour les factures existantes.
+"""
+from odoo import SUPERUSER_ID, api
+
+CHUNK_SIZE = 500
+
+
+def migrate(cr, version):
+    """Créer les lignes travel.invoice.client.tax de chaque facture, par lots."""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    cr.execute("SELECT id FROM travel_invoice_client ORDER BY id")
+    invoice_ids = [row[0] for row in cr.fetchall()]
+
+    for start in range(0, len(invoice_ids), CHUNK_SIZE):
+        env['travel.invoice.client'].browse(invoice_ids[start:start + CHUNK_SIZE])._sync_tax_lines()
+        env['travel.invoice.client.tax'].flush_model()
+        env.invalidate_all()
+
+    print(f"Migration récapitulatif TVA: {len(invoice_ids)} facture(s) traitée(s)")
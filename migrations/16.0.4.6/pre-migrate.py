@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Garde de facturation unique des réservations.
+
+Initialise le drapeau stocké is_invoiced en SQL (sans recalcul ORM) et
+signale les réservations déjà facturées plusieurs fois: tant qu'elles
+existent, la contrainte reservation_invoiced_once ne peut pas être créée.
+"""
+
+
+def migrate(cr, version):
+    """Remplir is_invoiced et lister les doubles facturations existantes."""
+    cr.execute("ALTER TABLE travel_reservation ADD COLUMN IF NOT EXISTS is_invoiced boolean")
+    cr.execute("""
+        UPDATE travel_reservation r
+           SET is_invoiced = EXISTS (
+                   SELECT 1
+                     FROM travel_invoice_client_line l
+                     JOIN travel_invoice_client i ON i.id = l.invoice_id
+                    WHERE l.reservation_id = r.id
+                      AND i.state != 'cancel'
+               )
+    """)
+    cr.execute("""
+        SELECT l.reservation_id, array_agg(DISTINCT i.name)
+          FROM travel_invoice_client_line l
+          JOIN travel_invoice_client i ON i.id = l.invoice_id
+         WHERE l.reservation_id IS NOT NULL
+           AND i.state != 'cancel'
+      GROUP BY l.reservation_id
+        HAVING COUNT(*) > 1
+    """)
+    duplicates = cr.fetchall()
+    for reservation_id, invoice_names in duplicates:
+        print(f"Réservation {reservation_id} facturée plusieurs fois: {', '.join(invoice_names)}")
+    print(f"Migration facturation unique: {len(duplicates)} réservation(s) à corriger")
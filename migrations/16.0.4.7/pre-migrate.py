@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Statistiques de paiement des membres stockées.
+
+Crée et remplit en SQL les colonnes total_paid, total_remaining et
+payment_count, pour éviter un recalcul ORM de tous les membres à la mise
+à jour du module.
+"""
+
+
+def migrate(cr, version):
+    """Ajouter les colonnes et les remplir en une requête groupée."""
+    cr.execute("""
+        ALTER TABLE travel_member
+            ADD COLUMN IF NOT EXISTS total_paid double precision,
+            ADD COLUMN IF NOT EXISTS total_remaining double precision,
+            ADD COLUMN IF NOT EXISTS payment_count integer
+    """)
+    cr.execute("""
+        WITH payment AS (
+            SELECT reservation_id,
+                   SUM(signed_amount) AS paid,
+                   COUNT(*) FILTER (WHERE type = 'receipt') AS receipt_count
+              FROM cash_register_operation
+             WHERE state = 'confirmed' AND reservation_id IS NOT NULL
+          GROUP BY reservation_id
+        ), stats AS (
+            SELECT r.member_id,
+                   COALESCE(SUM(payment.paid), 0) AS paid,
+                   COALESCE(SUM(r.remaining_to_pay), 0) AS remaining,
+                   COALESCE(SUM(payment.receipt_count), 0) AS receipt_count
+              FROM travel_reservation r
+              LEFT JOIN payment ON payment.reservation_id = r.id
+          GROUP BY r.member_id
+        )
+        UPDATE travel_member m
+           SET total_paid = COALESCE(stats.paid, 0),
+               total_remaining = COALESCE(stats.remaining, 0),
+               payment_count = COALESCE(stats.receipt_count, 0)
+          FROM travel_member m2
+          LEFT JOIN stats ON stats.member_id = m2.id
+         WHERE m.id = m2.id
+    """)
+    print(f"Migration statistiques de paiement: {cr.rowcount} membre(s) initialisé(s)")
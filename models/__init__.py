@@ -5,6 +5,7 @@ from . import mixins
 # Modèles principaux
 from . import company
 from . import member
+from . import member_duplicate
 from . import reservation
 from . import service
 from . import travel
@@ -14,13 +15,26 @@ from . import credit
 from . import purchase
 from . import invoice
 from . import invoice_client
+from . import invoice_client_tax
 from . import withholding
 from . import purchase_travel
 
 # Caisse et POS
 from . import pos
 from . import cash_register
+from . import cash_register_session
 from . import cash_register_operation
 
+# Rapports
+from . import report_cash_bordereau
+from . import report_batch
+from . import report_pdf_cache
+
+# Recherche
+from . import travel_search
+
+# Performances
+from . import perf_sample
+
 # Extensions modèles Odoo
 from . import partner
\ No newline at end of file
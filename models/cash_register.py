@@ -37,6 +37,11 @@ class CashRegister(models.Model):
     closing_user_id = fields.Many2one('res.users', string='Fermé par', tracking=True)
     closing_balance = fields.Float(string='Solde de Fermeture', tracking=True)
     
+    # Session courante (ou dernière session si la caisse est fermée)
+    current_session_id = fields.Many2one('cash.register.session', string='Session Courante',
+                                         readonly=True, copy=False)
+    session_ids = fields.One2many('cash.register.session', 'cash_register_id', string='Sessions')
+
     # Totaux calculés
     total_receipts = fields.Float(string='Total Recettes', compute='_compute_totals', store=True)
     total_expenses = fields.Float(string='Total Dépenses', compute='_compute_totals', store=True)
@@ -51,6 +56,17 @@ class CashRegister(models.Model):
                                      compute='_compute_sub_cash_count', store=True)
     
     active = fields.Boolean(string='Active', default=True)
+
+    # Impression des reçus
+    receipt_output = fields.Selection([
+        ('pdf', 'PDF'),
+        ('text', 'Texte brut'),
+        ('escpos', 'ESC/POS (imprimante thermique)'),
+    ], string='Format des Reçus', default='pdf', required=True,
+        help="PDF: rendu QWeb/wkhtmltopdf. Texte brut et ESC/POS: reçu produit directement "
+             "depuis l'opération, sans rendu HTML, avec repli sur le PDF en cas d'échec.")
+    receipt_width = fields.Integer(string='Largeur du Ticket', default=42,
+                                   help="Nombre de caractères par ligne: 42 pour un rouleau 80 mm, 32 pour 58 mm")
     
     @api.depends('sub_cash_ids', 'is_main')
     def _compute_sub_cash_count(self):
@@ -61,24 +77,12 @@ class CashRegister(models.Model):
             else:
                 cash.sub_cash_count = 0
 
-    @api.depends('operation_ids.amount', 'operation_ids.type', 'operation_ids.state', 'opening_date')
+    @api.depends('current_session_id.total_receipts', 'current_session_id.total_expenses')
     def _compute_totals(self):
-        """Calculer les totaux des recettes et dépenses de la session actuelle uniquement."""
+        """Lire les totaux de la session courante (maintenus de façon incrémentale)."""
         for cash in self:
-            # Filtrer les opérations de la session actuelle (après la date d'ouverture)
-            # et uniquement les opérations confirmées
-            if cash.opening_date:
-                current_operations = cash.operation_ids.filtered(
-                    lambda o: o.state == 'confirmed' and o.date >= cash.opening_date
-                )
-            else:
-                # Si pas de date d'ouverture, prendre toutes les opérations confirmées
-                current_operations = cash.operation_ids.filtered(lambda o: o.state == 'confirmed')
-            
-            receipts = current_operations.filtered(lambda o: o.type == 'receipt')
-            expenses = current_operations.filtered(lambda o: o.type == 'expense')
-            cash.total_receipts = sum(receipts.mapped('amount'))
-            cash.total_expenses = sum(expenses.mapped('amount'))
+            cash.total_receipts = cash.current_session_id.total_receipts
+            cash.total_expenses = cash.current_session_id.total_expenses
 
     @api.depends('opening_balance', 'total_receipts', 'total_expenses')
     def _compute_balance(self):
@@ -168,25 +172,30 @@ class CashRegister(models.Model):
             opening_balance = 0.0
 
         # Si c'est la caisse principale, ouvrir toutes les sous-caisses avec solde = 0
+        Session = self.env['cash.register.session']
         if self.is_main:
             sub_cashes = self.search([
                 ('main_cash_id', '=', self.id),
                 ('state', '=', 'closed'),
                 ('active', '=', True)
             ])
-            for sub_cash in sub_cashes:
+            sub_sessions = Session._open_for(sub_cashes, {})
+            for sub_cash, session in zip(sub_cashes, sub_sessions):
                 sub_cash.write({
                     'state': 'opened',
-                    'opening_date': fields.Datetime.now(),
+                    'opening_date': session.opening_date,
                     'opening_user_id': self.env.user.id,
                     'opening_balance': 0.0,  # Sous-caisses toujours à 0
+                    'current_session_id': session.id,
                 })
 
+        session = Session._open_for(self, {self.id: opening_balance})
         self.write({
             'state': 'opened',
-            'opening_date': fields.Datetime.now(),
+            'opening_date': session.opening_date,
             'opening_user_id': self.env.user.id,
             'opening_balance': opening_balance,
+            'current_session_id': session.id,
         })
 
         return {
@@ -233,6 +242,7 @@ class CashRegister(models.Model):
             total_balance += sub_cash.closing_balance or 0.0
         
         # Fermer la caisse principale avec le solde total
+        self.current_session_id._close(total_balance)
         self.write({
             'state': 'closed',
             'closing_date': fields.Datetime.now(),
@@ -259,6 +269,47 @@ class CashRegister(models.Model):
             }
         }
 
+    def _get_bordereau_rows(self, limit=None):
+        """
+        Lignes du bordereau (recettes confirmées de la caisse et de ses sous-caisses).
+
+        Seules les opérations des sessions courantes (dernières sessions si
+        les caisses sont fermées) sont reprises: le bordereau correspond aux
+        totaux des sessions. Une seule requête groupée: les lignes sont triées par mode de paiement puis
+        par date, et chaque ligne porte le total de son mode de paiement.
+
+        Args:
+            limit (int): Nombre maximum de lignes (ex: 1 pour un test d'existence)
+
+        Returns:
+            list: dictionnaires (payment_method, date, cash_name, name,
+                  member_name, reservation_name, amount, method_total)
+        """
+        self.ensure_one()
+        session_ids = tuple((self | self.sub_cash_ids).current_session_id.ids)
+        if not session_ids:
+            return []
+        self.env['cash.register.operation'].flush_model([
+            'cash_register_id', 'session_id', 'date', 'state', 'type', 'payment_method', 'amount', 'name',
+            'reservation_id',
+        ])
+        self.env['travel.reservation'].flush_model(['name', 'member_id'])
+        self.env.cr.execute("""
+            SELECT op.payment_method, op.date, cash.name AS cash_name, op.name,
+                   member.name AS member_name, reservation.name AS reservation_name, op.amount,
+                   SUM(op.amount) OVER (PARTITION BY op.payment_method) AS method_total
+              FROM cash_register_operation op
+              JOIN cash_register cash ON cash.id = op.cash_register_id
+         LEFT JOIN travel_reservation reservation ON reservation.id = op.reservation_id
+         LEFT JOIN travel_member member ON member.id = reservation.member_id
+             WHERE op.session_id IN %s
+               AND op.state = 'confirmed'
+               AND op.type = 'receipt'
+          ORDER BY op.payment_method, op.date, op.id
+             LIMIT %s
+        """, (session_ids, limit))
+        return self.env.cr.dictfetchall()
+
     def action_print_bordereau(self):
         """Imprimer le bordereau récapitulatif de la caisse principale et ses sous-caisses."""
         self.ensure_one()
@@ -266,16 +317,7 @@ class CashRegister(models.Model):
             raise UserError("Le bordereau ne peut être imprimé que depuis la caisse principale.")
         
         # Vérifier s'il y a des opérations à imprimer
-        start_date = self.opening_date or fields.Datetime.now().replace(hour=0, minute=0, second=0)
-        cashes = self | self.sub_cash_ids
-        ops = self.env['cash.register.operation'].search([
-            ('cash_register_id', 'in', cashes.ids),
-            ('date', '>=', start_date),
-            ('state', '=', 'confirmed'),
-            ('type', '=', 'receipt')
-        ])
-        
-        if not ops:
+        if not self._get_bordereau_rows(limit=1):
             raise UserError("Aucune opération de recette confirmée pour cette session.")
             
         return self.env.ref('travel_pro_version1.action_report_cash_bordereau').report_action(self)
@@ -290,6 +332,7 @@ class CashRegister(models.Model):
             raise UserError("Cette caisse est déjà fermée.")
 
         closing_balance = self.balance
+        self.current_session_id._close(closing_balance)
         self.write({
             'state': 'closed',
             'closing_date': fields.Datetime.now(),
@@ -335,3 +378,38 @@ class CashRegister(models.Model):
                     'line': '1',
                 })
 
+    def _init_legacy_sessions(self):
+        """
+        Créer la session des caisses qui n'en ont pas encore (données antérieures aux sessions).
+
+        Les opérations confirmées depuis la date d'ouverture sont rattachées à la
+        session; les sessions des caisses fermées sont ensuite fermées.
+        """
+        Session = self.env['cash.register.session']
+        Operation = self.env['cash.register.operation']
+        for cash in self.filtered(lambda c: not c.current_session_id and c.opening_date):
+            domain = [
+                ('cash_register_id', '=', cash.id),
+                ('state', '=', 'confirmed'),
+                ('date', '>=', cash.opening_date),
+            ]
+            if cash.state == 'closed' and cash.closing_date:
+                domain.append(('date', '<=', cash.closing_date))
+            operations = Operation.search(domain)
+            session = Session.create({
+                'name': f"{cash.code}/{fields.Datetime.to_string(cash.opening_date)}",
+                'cash_register_id': cash.id,
+                'opening_date': cash.opening_date,
+                'opening_user_id': cash.opening_user_id.id,
+                'opening_balance': cash.opening_balance,
+            })
+            # Le rattachement des opérations alimente les totaux de la session
+            operations.write({'session_id': session.id})
+            if cash.state == 'closed':
+                session.write({
+                    'state': 'closed',
+                    'closing_date': cash.closing_date,
+                    'closing_user_id': cash.closing_user_id.id,
+                    'closing_balance': cash.closing_balance,
+                })
+            cash.current_session_id = session
@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
+import base64
+import logging
+from collections import defaultdict
+
 from odoo import api, fields, models
 from odoo.exceptions import UserError, ValidationError
 
+from .receipt_text import render_receipt_escpos, render_receipt_text
+
+_logger = logging.getLogger(__name__)
+
 
 class CashRegisterOperation(models.Model):
     """Modèle pour les opérations de caisse (recettes et dépenses)."""
@@ -14,6 +22,9 @@ class CashRegisterOperation(models.Model):
     sequence_id = fields.Many2one('ir.sequence', string='Séquence')
     cash_register_id = fields.Many2one('cash.register', string='Caisse', 
                                         required=True, ondelete='cascade', tracking=True)
+    session_id = fields.Many2one('cash.register.session', string='Session', readonly=True,
+                                 copy=False, index=True,
+                                 help="Session de caisse dans laquelle l'opération a été confirmée")
     date = fields.Datetime(string='Date', default=fields.Datetime.now, required=True, tracking=True)
     type = fields.Selection([
         ('receipt', 'Recette'),
@@ -51,6 +62,87 @@ class CashRegisterOperation(models.Model):
         ('cancelled', 'Annulé'),
     ], string='État', default='draft', tracking=True, required=True)
     
+    # Champs dont la modification change la contribution aux totaux de session
+    _SESSION_FIELDS = {'state', 'type', 'amount', 'session_id'}
+
+    def _session_contributions(self):
+        """
+        Contribution des opérations aux totaux des sessions ouvertes.
+
+        Returns:
+            dict: {session_id: [recettes, dépenses]}
+        """
+        totals = defaultdict(lambda: [0.0, 0.0])
+        for operation in self:
+            session = operation.session_id
+            if operation.state == 'confirmed' and session and session.state == 'opened':
+                totals[session.id][0 if operation.type == 'receipt' else 1] += operation.amount
+        return totals
+
+    @api.model
+    def _apply_session_deltas(self, before, after):
+        """
+        Mettre à jour les totaux des sessions avec la différence des contributions.
+
+        Incrément SQL (total = total + delta): une seule requête par session
+        touchée, sans relire ses opérations ni ses totaux, et sans perdre
+        l'incrément d'une transaction concurrente sur la même session. Les
+        champs qui en dépendent (solde, totaux de la caisse) sont recalculés.
+        """
+        deltas = {}
+        for session_id in set(before) | set(after):
+            old_receipts, old_expenses = before.get(session_id, (0.0, 0.0))
+            new_receipts, new_expenses = after.get(session_id, (0.0, 0.0))
+            if new_receipts - old_receipts or new_expenses - old_expenses:
+                deltas[session_id] = (new_receipts - old_receipts, new_expenses - old_expenses)
+        if not deltas:
+            return
+        sessions = self.env['cash.register.session'].browse(list(deltas))
+        session_fields = ['total_receipts', 'total_expenses']
+        sessions.flush_recordset(session_fields)
+        for session_id, (delta_receipts, delta_expenses) in deltas.items():
+            self.env.cr.execute("""
+                UPDATE cash_register_session
+                   SET total_receipts = total_receipts + %s,
+                       total_expenses = total_expenses + %s,
+                       write_uid = %s,
+                       write_date = (now() at time zone 'UTC')
+                 WHERE id = %s
+            """, (delta_receipts, delta_expenses, self.env.uid, session_id))
+        sessions.invalidate_recordset(session_fields + ['write_uid', 'write_date'])
+        sessions.modified(session_fields)
+
+    def _assign_current_session(self):
+        """
+        Rattacher les opérations confirmées à la session courante de leur caisse.
+
+        Une opération sans session, ou rattachée à une session qui n'est plus
+        ouverte, passe dans la session ouverte de sa caisse.
+        """
+        for operation in self.filtered(
+            lambda o: o.state == 'confirmed' and (not o.session_id or o.session_id.state != 'opened')
+        ):
+            session = operation.cash_register_id.current_session_id
+            if session and session.state == 'opened' and session != operation.session_id:
+                super(CashRegisterOperation, operation).write({'session_id': session.id})
+
+    def write(self, vals):
+        """Maintenir les totaux de session de façon incrémentale."""
+        if not self._SESSION_FIELDS & set(vals):
+            return super().write(vals)
+        before = self._session_contributions()
+        result = super().write(vals)
+        self._assign_current_session()
+        self._apply_session_deltas(before, self._session_contributions())
+        return result
+
+    def unlink(self):
+        """Retirer les opérations confirmées des totaux de leur session."""
+        before = self._session_contributions()
+        result = super().unlink()
+        self._apply_session_deltas(before, {})
+        return result
+
     @api.model
     def create(self, vals):
         """Générer automatiquement la référence de l'opération."""
@@ -73,7 +165,11 @@ class CashRegisterOperation(models.Model):
                     self.env['ir.sequence'].next_by_code('cash.register.operation')
                     or 'Nouveau'
                 )
-        return super().create(vals)
+        operation = super().create(vals)
+        if operation.state == 'confirmed':
+            operation._assign_current_session()
+            self._apply_session_deltas({}, operation._session_contributions())
+        return operation
     
     @api.depends('amount', 'type')
     def _compute_signed_amount(self):
@@ -120,11 +216,115 @@ class CashRegisterOperation(models.Model):
         if self.type == 'receipt':
             return self.action_print_receipt()
 
+    def _get_pdf_cache_version(self):
+        """
+        Version du reçu pour le cache PDF: l'opération et sa réservation.
+
+        Le reçu imprime le total et le reste à payer de la réservation, qui
+        changent sans modifier l'opération.
+        """
+        self.ensure_one()
+        return f"{self.write_date}|{self.reservation_id.write_date or ''}"
+
     def action_print_receipt(self):
-        """Imprimer le reçu de caisse."""
+        """
+        Imprimer le reçu de caisse.
+
+        Selon le format de la caisse, le reçu est produit directement en
+        texte brut ou en ESC/POS; le PDF reste utilisé par défaut et en cas
+        d'échec du rendu texte.
+        """
         self.ensure_one()
+        receipt_output = self.cash_register_id.receipt_output
+        if receipt_output in ('text', 'escpos'):
+            try:
+                return self._action_download_text_receipt(receipt_output)
+            except (KeyError, ValueError, UnicodeError):
+                _logger.exception("Reçu %s: échec du rendu %s, repli sur le PDF", self.name, receipt_output)
         return self.env.ref('travel_pro_version1.action_report_cash_receipt').report_action(self)
 
+    def _get_receipt_values(self):
+        """
+        Valeurs du reçu thermique, formatées en chaînes.
+
+        Returns:
+            dict: valeurs indexées par les clés du gabarit (receipt_text)
+        """
+        self.ensure_one()
+        type_labels = dict(self._fields['type']._description_selection(self.env))
+        method_labels = dict(self._fields['payment_method']._description_selection(self.env))
+        reservation = self.reservation_id
+        values = {
+            'name': self.name or '',
+            'date': fields.Datetime.context_timestamp(self, self.date).strftime('%d/%m/%Y %H:%M'),
+            'cash': self.cash_register_id.name or '',
+            'cashier': self.user_id.name or '',
+            'type': (type_labels.get(self.type) or '').upper(),
+            'payment_method': method_labels.get(self.payment_method) or '',
+            'reservation': reservation.name or '',
+            'invoice_number': self.invoice_number or '',
+            'sale_order': self.sale_order_id.name or '',
+            'invoice': self.invoice_id.name or '',
+            'quote_number': self.quote_number or '',
+            'note': self.note or '',
+            'member': reservation.member_id.name or '',
+            'destination': reservation.destination_id.name or '',
+            'reservation_total': '',
+            'reservation_paid': '',
+            'reservation_remaining': '',
+            'amount': f"{self.amount:,.3f} DT",
+        }
+        values['references'] = any(values[key] for key in (
+            'reservation', 'invoice_number', 'sale_order', 'invoice', 'quote_number', 'note'
+        ))
+        if reservation:
+            values.update({
+                'reservation_total': f"{reservation.total_price:,.3f} DT",
+                'reservation_paid': f"{reservation.total_price - reservation.remaining_to_pay:,.3f} DT",
+                'reservation_remaining': f"{reservation.remaining_to_pay:,.3f} DT",
+            })
+        return values
+
+    def _render_text_receipt(self, receipt_output='text'):
+        """
+        Rendre le reçu sans QWeb: texte brut ou flux ESC/POS.
+
+        Returns:
+            bytes: contenu à envoyer à l'imprimante
+        """
+        self.ensure_one()
+        values = self._get_receipt_values()
+        width = self.cash_register_id.receipt_width
+        if receipt_output == 'escpos':
+            return render_receipt_escpos(values, width)
+        return render_receipt_text(values, width).encode()
+
+    def _action_download_text_receipt(self, receipt_output):
+        """Archiver le reçu texte (remplace le précédent) et le télécharger."""
+        content = self._render_text_receipt(receipt_output)
+        extension, mimetype = ('bin', 'application/octet-stream') if receipt_output == 'escpos' \
+            else ('txt', 'text/plain')
+        name = f"Recu_Caisse_{self.name}.{extension}"
+        Attachment = self.env['ir.attachment']
+        Attachment.search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('name', '=', name),
+        ]).unlink()
+        attachment = Attachment.create({
+            'name': name,
+            'type': 'binary',
+            'datas': base64.b64encode(content),
+            'res_model': self._name,
+            'res_id': self.id,
+            'mimetype': mimetype,
+        })
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f"/web/content/{attachment.id}?download=true",
+            'target': 'self',
+        }
+
     def action_cancel(self):
         """Annuler l'opération."""
         self.ensure_one()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+
+class CashRegisterSession(models.Model):
+    """
+    Session de caisse (de l'ouverture à la fermeture).
+
+    Les totaux recettes/dépenses sont stockés et mis à jour de façon
+    incrémentale à chaque confirmation ou annulation d'opération, sans
+    relire l'historique des opérations. Une session fermée est un
+    instantané immuable utilisé par le bordereau et les audits.
+    """
+    _name = 'cash.register.session'
+    _description = 'Session de Caisse'
+    _order = 'opening_date desc, id desc'
+
+    name = fields.Char(string='Référence', required=True, readonly=True)
+    cash_register_id = fields.Many2one('cash.register', string='Caisse', required=True,
+                                       readonly=True, ondelete='cascade', index=True)
+    is_main = fields.Boolean(related='cash_register_id.is_main', string='Caisse Principale')
+    company_id = fields.Many2one('res.company', string='Société',
+                                 related='cash_register_id.company_id', store=True, readonly=True)
+    state = fields.Selection([
+        ('opened', 'Ouverte'),
+        ('closed', 'Fermée'),
+    ], string='État', default='opened', required=True, readonly=True)
+
+    opening_date = fields.Datetime(string='Date d\'Ouverture', required=True, readonly=True)
+    opening_user_id = fields.Many2one('res.users', string='Ouvert par', readonly=True)
+    opening_balance = fields.Float(string='Solde d\'Ouverture', readonly=True)
+
+    closing_date = fields.Datetime(string='Date de Fermeture', readonly=True)
+    closing_user_id = fields.Many2one('res.users', string='Fermé par', readonly=True)
+    closing_balance = fields.Float(string='Solde de Fermeture', readonly=True)
+
+    # Totaux maintenus par cash.register.operation (voir _apply_session_deltas)
+    total_receipts = fields.Float(string='Total Recettes', readonly=True)
+    total_expenses = fields.Float(string='Total Dépenses', readonly=True)
+    balance = fields.Float(string='Solde', compute='_compute_balance', store=True)
+
+    operation_ids = fields.One2many('cash.register.operation', 'session_id', string='Opérations')
+
+    @api.depends('opening_balance', 'total_receipts', 'total_expenses')
+    def _compute_balance(self):
+        """Calculer le solde de la session."""
+        for session in self:
+            session.balance = session.opening_balance + session.total_receipts - session.total_expenses
+
+    @api.model
+    def _open_for(self, cash_registers, opening_balances):
+        """
+        Ouvrir une session pour chaque caisse donnée.
+
+        Args:
+            cash_registers (recordset): Caisses à ouvrir
+            opening_balances (dict): {cash_register_id: solde d'ouverture}
+
+        Returns:
+            recordset: Sessions créées
+        """
+        now = fields.Datetime.now()
+        return self.create([{
+            'name': f"{cash.code}/{fields.Datetime.to_string(now)}",
+            'cash_register_id': cash.id,
+            'opening_date': now,
+            'opening_user_id': self.env.user.id,
+            'opening_balance': opening_balances.get(cash.id, 0.0),
+        } for cash in cash_registers])
+
+    def _close(self, closing_balance):
+        """Fermer la session: elle devient un instantané immuable."""
+        self.write({
+            'state': 'closed',
+            'closing_date': fields.Datetime.now(),
+            'closing_user_id': self.env.user.id,
+            'closing_balance': closing_balance,
+        })
+
+    def write(self, vals):
+        """Une session fermée ne peut plus être modifiée."""
+        if self.filtered(lambda s: s.state == 'closed'):
+            raise UserError("Une session de caisse fermée ne peut pas être modifiée.")
+        return super().write(vals)
+
+    @api.ondelete(at_uninstall=False)
+    def _unlink_except_closed(self):
+        """Conserver les sessions fermées pour le bordereau et les audits."""
+        if self.filtered(lambda s: s.state == 'closed'):
+            raise UserError("Une session de caisse fermée ne peut pas être supprimée.")
@@ -24,7 +24,9 @@ class TravelCompany(models.Model):
     """
     _name = 'travel.company'
     _description = 'Société Cliente'
-    _inherit = ['mail.thread', 'mail.activity.mixin', 'email.validation.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'email.validation.mixin', 'record.count.mixin',
+                'trigram.search.mixin']
+    _trigram_fields = ['name', 'vat']
     _order = 'name'
 
     # ===== CONTRAINTES SQL =====
@@ -112,8 +114,7 @@ class TravelCompany(models.Model):
 
     @api.depends('member_ids')
     def _compute_member_count(self):
-        for rec in self:
-            rec.member_count = len(rec.member_ids)
+        self._compute_record_count('member_count', 'travel.member', 'company_id')
     
     @api.depends('member_ids')
     def _compute_selected_member_ids(self):
@@ -136,7 +137,7 @@ class TravelCompany(models.Model):
 
     @api.model
     def _name_search(self, name='', args=None, operator='ilike', limit=100, order=None):
-        """Recherche par nom et matricule fiscale"""
+        """Recherche par nom et matricule fiscale (ilike servis par les index trigrammes)"""
         args = args or []
         domain = []
         if name:
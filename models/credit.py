@@ -1,15 +1,71 @@
-from odoo import api, fields, models
+import logging
+import random
+import time
+
+from psycopg2 import OperationalError
+
+from odoo import SUPERUSER_ID, api, fields, models, tools
+from odoo.exceptions import UserError
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+from odoo.tools import float_compare, float_round
+
+_logger = logging.getLogger(__name__)
+
+# Nombre de tentatives et délai de base (secondes) en cas de conflit de sérialisation
+CREDIT_MAX_TRIES = 5
+CREDIT_RETRY_BASE_DELAY = 0.05
+
+
+def run_credit_transaction(registry, uid, context, func, *args, **kwargs):
+    """
+    Exécuter func(env, ...) dans une transaction dédiée, rejouée en cas de conflit.
+
+    Chaque tentative ouvre son propre curseur sur le registre, avec son propre
+    snapshot, et un délai exponentiel aléatoire sépare deux tentatives.
+    L'appelant n'a pas besoin de curseur (threads des tests de charge).
+
+    Returns:
+        Le résultat de func
+    """
+    for attempt in range(1, CREDIT_MAX_TRIES + 1):
+        try:
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                return func(env, *args, **kwargs)
+        except OperationalError as e:
+            if e.pgcode not in PG_CONCURRENCY_ERRORS_TO_RETRY or attempt == CREDIT_MAX_TRIES:
+                raise
+            delay = random.uniform(0.0, CREDIT_RETRY_BASE_DELAY * 2 ** attempt)
+            _logger.info(
+                "Conflit de concurrence sur le crédit (%s), tentative %s/%s dans %.3fs",
+                e.pgcode, attempt, CREDIT_MAX_TRIES, delay
+            )
+            time.sleep(delay)
 
 
 class TravelCreditHistory(models.Model):
+    """
+    Registre (ledger) du crédit membre.
+
+    L'historique est en ajout seul: chaque ligne stocke le solde du membre
+    après son application (balance_after). Le solde d'un membre se lit donc
+    sur sa dernière ligne, sans sommer tout l'historique. Une erreur se
+    corrige par une nouvelle ligne, jamais en modifiant ou supprimant une
+    ligne existante.
+    """
     _name = 'travel.credit.history'
     _description = 'Historique Crédit Membre'
     _inherit = ['mail.thread', 'mail.activity.mixin']
-    _order = 'date desc'
+    _order = 'date desc, id desc'
+
+    # Champs figés une fois la ligne enregistrée
+    _LEDGER_FIELDS = {'member_id', 'amount', 'balance_after'}
 
     member_id = fields.Many2one('travel.member', 'Membre', required=True, ondelete='cascade')
     date = fields.Datetime('Date', default=fields.Datetime.now, required=True)
     amount = fields.Float('Montant (TND)', required=True, digits=(16, 2))
+    balance_after = fields.Float('Solde après (TND)', digits=(16, 2), readonly=True, copy=False,
+                                 help="Solde crédit du membre après application de cette ligne")
     type = fields.Selection([
         ('recharge', 'Recharge manuelle'),
         ('refund', 'Remboursement annulation'),
@@ -18,23 +74,190 @@ class TravelCreditHistory(models.Model):
     reservation_id = fields.Many2one('travel.reservation', 'Réservation')
     note = fields.Text('Note')
 
+    def init(self):
+        # Lecture de la dernière ligne d'un membre (DISTINCT ON member_id ORDER BY id DESC)
+        tools.create_index(
+            self._cr, 'travel_credit_history_member_id_id_idx', self._table, ['member_id', 'id']
+        )
+
+    @api.model
+    def _get_last_balances(self, member_ids):
+        """
+        Retourner le solde courant de chaque membre depuis sa dernière ligne.
+
+        Args:
+            member_ids (tuple): IDs des membres
+
+        Returns:
+            dict: {member_id: solde}
+        """
+        if not member_ids:
+            return {}
+        self.flush_model(['member_id', 'balance_after'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (member_id) member_id, COALESCE(balance_after, 0)
+              FROM travel_credit_history
+             WHERE member_id IN %s
+          ORDER BY member_id, id DESC
+        """, (tuple(member_ids),))
+        return dict(self.env.cr.fetchall())
+
+    @api.model
+    def _lock_members(self, member_ids):
+        """
+        Verrouiller les membres (SELECT ... FOR UPDATE) pour la section critique du crédit.
+
+        Les lignes sont verrouillées par ordre d'ID pour éviter les interblocages.
+        Une transaction concurrente qui a modifié le solde d'un de ces membres
+        provoque une erreur de sérialisation: la transaction doit alors être
+        rejouée (automatique pour les requêtes HTTP, voir run_credit_transaction
+        pour les traitements hors requête).
+        """
+        if not member_ids:
+            return
+        self.env.cr.execute("""
+            SELECT id FROM travel_member WHERE id IN %s ORDER BY id FOR UPDATE
+        """, (tuple(member_ids),))
+
+    @api.model
+    def _run_credit_transaction(self, func, *args, **kwargs):
+        """
+        Exécuter func(env, ...) dans une transaction dédiée, rejouée en cas de conflit.
+
+        Utilisé par les traitements hors requête HTTP (crons, scripts) qui
+        consomment du crédit. Voir run_credit_transaction.
+
+        Returns:
+            Le résultat de func
+        """
+        return run_credit_transaction(
+            self.pool, self.env.uid or SUPERUSER_ID, dict(self.env.context), func, *args, **kwargs
+        )
+
     @api.model_create_multi
     def create(self, vals_list):
-        """Créer l'historique et recalculer le solde crédit du membre."""
+        """Créer les lignes en calculant le solde courant et mettre à jour le solde des membres."""
+        vals_list = [self._add_missing_default_values(vals) for vals in vals_list]
+        member_ids = {vals['member_id'] for vals in vals_list if vals.get('member_id')}
+        # Section critique: le solde courant est lu et prolongé sous verrou
+        self._lock_members(member_ids)
+        running = self._get_last_balances(member_ids)
+        for vals in vals_list:
+            member_id = vals.get('member_id')
+            if member_id:
+                balance = running.get(member_id, 0.0) + (vals.get('amount') or 0.0)
+                running[member_id] = float_round(balance, precision_digits=2)
+                vals['balance_after'] = running[member_id]
+
         records = super().create(vals_list)
-        
-        # Récupérer tous les membres concernés
-        member_ids = set(record.member_id.id for record in records if record.member_id)
-        
-        # Recalculer le solde pour chaque membre
-        for member_id in member_ids:
-            member = self.env['travel.member'].browse(member_id)
-            if member.exists():
-                member._compute_credit_balance()
-                member.flush_recordset(['credit_balance'])
-        
+
+        # Un seul recalcul (lecture de la dernière ligne) pour tous les membres concernés
+        members = records.mapped('member_id')
+        if members:
+            members._compute_credit_balance()
+            members.flush_recordset(['credit_balance'])
+
         return records
 
+    def write(self, vals):
+        """Interdire la modification des montants: le registre est en ajout seul."""
+        if self._LEDGER_FIELDS & set(vals):
+            raise UserError(
+                "L'historique crédit ne peut pas être modifié.\n"
+                "Ajoutez une nouvelle ligne (recharge ou utilisation) pour corriger le solde."
+            )
+        return super().write(vals)
+
+    @api.ondelete(at_uninstall=False)
+    def _unlink_except_ledger(self):
+        """Interdire la suppression d'une ligne: elle casserait les soldes courants suivants."""
+        raise UserError(
+            "L'historique crédit ne peut pas être supprimé.\n"
+            "Ajoutez une ligne de correction à la place."
+        )
+
+    # ===== VÉRIFICATION DU REGISTRE =====
+    @api.model
+    def _check_ledger_consistency(self, member_ids=None, fix=False):
+        """
+        Recalculer hors ligne les soldes courants et les comparer aux valeurs stockées.
+
+        Le solde attendu de chaque ligne est la somme cumulée des montants du
+        membre, dans l'ordre d'insertion (id).
+
+        Args:
+            member_ids (list): Membres à vérifier (tous si None)
+            fix (bool): Réécrire les soldes incorrects (lignes et membres)
+
+        Returns:
+            list: IDs des membres dont le registre était incohérent
+        """
+        self.flush_model()
+        self.env['travel.member'].flush_model(['credit_balance'])
+        where = "WHERE h.member_id IN %s" if member_ids else ""
+        params = (tuple(member_ids),) if member_ids else ()
+        self.env.cr.execute(f"""
+            WITH expected AS (
+                SELECT h.id, h.member_id, h.balance_after,
+                       ROUND(SUM(h.amount) OVER (PARTITION BY h.member_id ORDER BY h.id)::numeric, 2) AS running
+                  FROM travel_credit_history h
+                  {where}
+            )
+            SELECT id, member_id, running
+              FROM expected
+             WHERE balance_after IS NULL OR ROUND(balance_after::numeric, 2) != running
+        """, params)
+        bad_rows = self.env.cr.fetchall()
+        bad_members = {member_id for _id, member_id, _running in bad_rows}
+
+        # Solde membre différent de la somme de son historique
+        member_where = "WHERE m.id IN %s" if member_ids else ""
+        self.env.cr.execute(f"""
+            SELECT m.id, m.credit_balance, COALESCE(ledger.total, 0)
+              FROM travel_member m
+         LEFT JOIN (SELECT member_id, SUM(amount) AS total
+                      FROM travel_credit_history
+                  GROUP BY member_id) ledger ON ledger.member_id = m.id
+              {member_where}
+        """, params)
+        for member_id, stored, expected in self.env.cr.fetchall():
+            if float_compare(stored or 0.0, float(expected), precision_digits=2):
+                bad_members.add(member_id)
+
+        if bad_members:
+            _logger.warning(
+                "Registre crédit incohérent pour %s membre(s): %s",
+                len(bad_members), sorted(bad_members)[:50]
+            )
+        if fix and bad_members:
+            self._rebuild_ledger(list(bad_members))
+        return sorted(bad_members)
+
+    @api.model
+    def _rebuild_ledger(self, member_ids):
+        """Réécrire en SQL les soldes courants puis le solde des membres donnés."""
+        if not member_ids:
+            return
+        self.env.cr.execute("""
+            UPDATE travel_credit_history h
+               SET balance_after = r.running
+              FROM (SELECT id, ROUND(SUM(amount) OVER (PARTITION BY member_id ORDER BY id)::numeric, 2) AS running
+                      FROM travel_credit_history
+                     WHERE member_id IN %s) r
+             WHERE h.id = r.id
+        """, (tuple(member_ids),))
+        self.invalidate_model(['balance_after'])
+        members = self.env['travel.member'].browse(member_ids)
+        members._compute_credit_balance()
+        members.flush_recordset(['credit_balance'])
+        _logger.info("Registre crédit reconstruit pour %s membre(s)", len(member_ids))
+
+    @api.model
+    def cron_check_credit_ledger(self):
+        """Cron de vérification nocturne du registre crédit (correction automatique)."""
+        self._check_ledger_consistency(fix=True)
+
+
 class TravelCreditRecharge(models.TransientModel):
     _name = 'travel.credit.recharge'
     _description = 'Recharger Crédit Membre'
@@ -49,4 +272,4 @@ class TravelCreditRecharge(models.TransientModel):
             'type': 'recharge',
             'note': f'Recharge manuelle de {self.amount} TND',
         })
-        return {'type': 'ir.actions.act_window_close'}
\ No newline at end of file
+        return {'type': 'ir.actions.act_window_close'}
@@ -3,7 +3,7 @@ from odoo import api, fields, models
 
 
 class AccountMove(models.Model):
-    _inherit = 'account.move'
+    _inherit = ['account.move', 'record.count.mixin']
 
     reservation_id = fields.Many2one('travel.reservation', string='Réservation', tracking=True)
     member_id = fields.Many2one('travel.member', string='Client', related='reservation_id.member_id', store=True)
@@ -15,17 +15,30 @@ class AccountMove(models.Model):
         compute='_compute_cash_operation_count'
     )
 
-    @api.depends('reservation_id', 'reservation_id.cash_operation_ids')
+    @api.depends('reservation_id', 'reservation_id.cash_operation_ids.invoice_id',
+                 'reservation_id.cash_operation_ids.state')
     def _compute_cash_operation_count(self):
-        """Calculer le nombre d'opérations de caisse liées."""
-        for invoice in self:
-            if invoice.reservation_id:
-                operations = invoice.reservation_id.cash_operation_ids.filtered(
-                    lambda o: o.invoice_id.id == invoice.id and o.state == 'confirmed'
-                )
-                invoice.cash_operation_count = len(operations)
-            else:
-                invoice.cash_operation_count = 0
+        """Calculer le nombre d'opérations de caisse confirmées liées (réservation de la facture)."""
+        with_reservation = self.filtered('reservation_id')
+        (self - with_reservation).cash_operation_count = 0
+        if not with_reservation:
+            return
+        # Groupé par (facture, réservation): seule la paire de la réservation propre
+        # à chaque facture compte
+        groups = self.env['cash.register.operation']._read_group(
+            [('invoice_id', 'in', with_reservation._origin.ids),
+             ('reservation_id', 'in', with_reservation.reservation_id._origin.ids),
+             ('state', '=', 'confirmed')],
+            ['invoice_id', 'reservation_id'],
+            ['invoice_id', 'reservation_id'],
+            lazy=False,
+        )
+        counts = {
+            (group['invoice_id'][0], group['reservation_id'][0]): group['__count']
+            for group in groups
+        }
+        for move in with_reservation:
+            move.cash_operation_count = counts.get((move._origin.id, move.reservation_id._origin.id), 0)
 
     def action_view_cash_operations(self):
         """Voir les opérations de caisse liées à cette facture."""
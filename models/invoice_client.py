@@ -6,20 +6,84 @@ Gère les factures clients de l'agence de voyage avec calcul
 automatique de la TVA, remises, retenues et montants en lettres.
 """
 import logging
-import re
+import threading
 
-from num2words import num2words
+from dateutil.relativedelta import relativedelta
 
 from odoo import api, fields, models
 from odoo.exceptions import UserError, ValidationError
+from odoo.tools import date_utils
 
 _logger = logging.getLogger(__name__)
 
+# Colonnes des lignes nécessaires au calcul des montants
+LINE_AMOUNT_FIELDS = [
+    'price_ttc', 'is_ticket', 'tax_rate', 'tax_rate_custom',
+    'member_count', 'ticket_price', 'commission',
+]
+
+# Champs déclenchant la mise à jour des lignes de TVA stockées
+LINE_TAX_FIELDS = set(LINE_AMOUNT_FIELDS) | {'invoice_id'}
+INVOICE_TAX_FIELDS = {'discount_type', 'discount_rate', 'discount_fixed', 'currency_id'}
+
+# États de facture comptés dans le chiffre d'affaires
+REVENUE_INVOICE_STATES = ('confirmed', 'paid')
+
+# Facturation mensuelle consolidée: lignes créées par lot, progression journalisée
+MONTHLY_INVOICING_CHUNK_SIZE = 500
+MONTHLY_INVOICING_LOG_STEP = 20
+
+# Clé et libellé de regroupement par taux de TVA standard
+TAX_RATE_LABELS = {
+    '7': ('7%', 'TVA 7%'),
+    '13': ('13%', 'TVA 13%'),
+    '19': ('19%', 'TVA 19%'),
+    '0': ('0%', 'Sans TVA'),
+}
+
+
+def tax_rate_value(tax_rate, tax_rate_custom):
+    """Valeur numérique (en %) du taux de TVA d'une ligne."""
+    if tax_rate == 'custom':
+        return tax_rate_custom or 0.0
+    return float(tax_rate or '7')
+
+
+def effective_quantity(member_count):
+    """Quantité facturée: nombre de membres saisi, 1 par défaut."""
+    if member_count and member_count > 0:
+        return float(member_count)
+    return 1.0
+
+
+def compute_line_amounts(price_ttc, is_ticket, tax_rate, tax_rate_custom,
+                         member_count, ticket_price, commission):
+    """
+    Calculer le HT, la TVA et la base taxable d'une ligne à partir de ses valeurs brutes.
+
+    Partagé par le calcul des lignes et le calcul groupé des factures
+    afin de garantir des montants identiques au millime.
+
+    Returns:
+        tuple: (montant HT, montant TVA, base soumise à TVA)
+    """
+    tax_percent = tax_rate_value(tax_rate, tax_rate_custom) / 100.0
+    quantity = effective_quantity(member_count)
+    if is_ticket:
+        # Billet: TVA uniquement sur la commission
+        total_ticket = quantity * (ticket_price or 0.0)
+        total_commission = quantity * (commission or 0.0)
+        return total_ticket + total_commission, total_commission * tax_percent, total_commission
+    # HT = TTC / (1 + TVA), TVA = HT * taux
+    total_ttc = quantity * (price_ttc or 0.0)
+    subtotal = total_ttc / (1 + tax_percent) if (1 + tax_percent) else 0.0
+    return subtotal, subtotal * tax_percent, subtotal
+
 
 class TravelInvoiceClient(models.Model):
     _name = 'travel.invoice.client'
     _description = 'Facture Client Travel'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'amount.words.mixin']
     _rec_name = 'name'
 
     name = fields.Char('Numéro Facture', default='Nouveau', readonly=True, copy=False)
@@ -115,6 +179,8 @@ class TravelInvoiceClient(models.Model):
     tax_custom_amount = fields.Monetary('TVA Autre', compute='_compute_amounts', store=False, currency_field='currency_id')
     tax_details = fields.Text('Détails TVA', compute='_compute_amounts', store=False,
                              help="Détail des montants TVA par taux")
+    tax_ids = fields.One2many('travel.invoice.client.tax', 'invoice_id', string='Récapitulatif TVA',
+                              readonly=True, help="Une ligne par taux de TVA, mise à jour avec les lignes de facture")
     
     fiscal_stamp = fields.Monetary('Timbre Fiscal', default=1.0, currency_field='currency_id')
     amount_total = fields.Monetary('Total TTC', compute='_compute_amounts', store=False, currency_field='currency_id')
@@ -148,6 +214,10 @@ class TravelInvoiceClient(models.Model):
         ('paid', 'Payée'),
         ('cancel', 'Annulée')
     ], default='draft', tracking=True, string='État')
+
+    # Facturation mensuelle consolidée (cron): premier jour du mois facturé
+    billing_period = fields.Date('Période Facturée', readonly=True, copy=False, index=True,
+                                 help="Renseigné sur les factures consolidées générées automatiquement")
     
     # Notes
     note = fields.Text('Notes')
@@ -155,20 +225,13 @@ class TravelInvoiceClient(models.Model):
 
     def _format_amount_in_words(self, amount):
         """Formater le montant en lettres français avec corrections."""
-        try:
-            amount_int = int(round(amount))
-            text = num2words(amount_int, lang='fr')
-            # Corrections spécifiques pour les erreurs courantes
-            # Remplacer "Mlle" (abréviation erronée) par "mille"
-            text = re.sub(r'\bMlle\b', 'mille', text, flags=re.IGNORECASE)
-            text = re.sub(r'\bMLLE\b', 'mille', text)
-            # Capitaliser la première lettre
-            if text:
-                text = text[0].upper() + text[1:] if len(text) > 1 else text.upper()
-            return text
-        except Exception as e:
-            _logger.error("Erreur conversion montant %s en lettres: %s", amount, str(e))
+        text = self._amount_in_words(amount, lang='fr')
+        if text is False:
             return f"{amount:.0f}"
+        # Capitaliser la première lettre
+        if text:
+            text = text[0].upper() + text[1:] if len(text) > 1 else text.upper()
+        return text
     
     @api.depends('amount_total', 'currency_id')
     def _compute_amount_in_words_fr(self):
@@ -207,66 +270,99 @@ class TravelInvoiceClient(models.Model):
     
 
     
-    @api.depends('invoice_line_ids.price_ttc', 'invoice_line_ids.tax_rate', 'invoice_line_ids.tax_rate_custom',
-                 'invoice_line_ids.member_count',
-                 'invoice_line_ids.service_id', 'invoice_line_ids.passenger_id',
-                 'fiscal_stamp',
-                 'discount_type', 'discount_rate', 'discount_fixed')
-    def _compute_amounts(self):
+    def init(self):
+        # Une seule facture consolidée active par société et par mois (relance idempotente)
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS travel_invoice_client_billing_period_uniq
+                ON travel_invoice_client (travel_company_id, billing_period)
+             WHERE billing_period IS NOT NULL AND state != 'cancel'
+        """)
+
+    def _read_lines_amount_data(self):
+        """
+        Charger en une passe les colonnes numériques des lignes de toutes les factures.
+
+        Les factures enregistrées sont lues par une seule requête SQL; les factures
+        non enregistrées (onchange) sont lues depuis le cache des lignes.
+
+        Returns:
+            dict: {invoice.id: [(price_ttc, is_ticket, tax_rate, tax_rate_custom,
+                   member_count, ticket_price, commission), ...]} dans l'ordre des lignes
+        """
+        data = {}
+        stored_ids = tuple(rid for rid in self._ids if isinstance(rid, int))
+        if stored_ids:
+            self.env['travel.invoice.client.line'].flush_model(LINE_AMOUNT_FIELDS + ['invoice_id', 'sequence'])
+            self.env.cr.execute("""
+                SELECT invoice_id, price_ttc, is_ticket, tax_rate, tax_rate_custom,
+                       member_count, ticket_price, commission
+                  FROM travel_invoice_client_line
+                 WHERE invoice_id IN %s
+              ORDER BY sequence, id
+            """, (stored_ids,))
+            for row in self.env.cr.fetchall():
+                data.setdefault(row[0], []).append(row[1:])
+        for invoice in self:
+            if isinstance(invoice.id, int):
+                continue
+            data[invoice.id] = [
+                (line.price_ttc, line.is_ticket, line.tax_rate, line.tax_rate_custom,
+                 line.member_count, line.ticket_price, line.commission)
+                for line in invoice.invoice_line_ids
+            ]
+        return data
+
+    def _get_tax_summaries(self):
+        """
+        Calculer en une passe le HT, la remise et la TVA par taux de chaque facture.
+
+        Source unique des totaux de facture (_compute_amounts) et des lignes
+        de TVA stockées (_sync_tax_lines).
+
+        Returns:
+            dict: {invoice.id: {'amount_untaxed', 'discount_amount', 'discount_ratio',
+                   'taxes': {rate_key: {'label', 'rate', 'base', 'amount'}}}}
+                  Les bases et montants de TVA sont après remise.
+        """
+        lines_data = self._read_lines_amount_data()
+        summaries = {}
         for invoice in self:
             # Calcul des montants directement depuis les champs source pour éviter
             # les écarts quand member_count change.
             amount_untaxed = 0.0
 
-            # Calculer la TVA par taux depuis les lignes
-            # Grouper les TVA par taux
+            # Grouper les TVA par taux (un groupe par taux personnalisé)
             tax_by_rate = {}
-            tax_details_list = []
-            
-            for line in invoice.invoice_line_ids:
-                if not (line.price_ttc or line.is_ticket):
-                    continue
 
-                tax_percent = line._get_tax_rate_value() / 100.0
-                total_ttc = line._get_effective_quantity() * line.price_ttc
-                
-                if line.is_ticket:
-                    total_commission = line._get_effective_quantity() * line.commission
-                    total_ticket = line._get_effective_quantity() * line.ticket_price
-                    line_tax = total_commission * tax_percent
-                    line_subtotal = total_ticket + total_commission
-                else:
-                    line_subtotal = total_ttc / (1 + tax_percent) if (1 + tax_percent) else 0.0
-                    line_tax = line_subtotal * tax_percent
+            for price_ttc, is_ticket, tax_rate, tax_rate_custom, member_count, ticket_price, commission \
+                    in lines_data.get(invoice.id, ()):
+                if not (price_ttc or is_ticket):
+                    continue
 
+                line_subtotal, line_tax, line_base = compute_line_amounts(
+                    price_ttc, is_ticket, tax_rate, tax_rate_custom,
+                    member_count, ticket_price, commission,
+                )
                 amount_untaxed += line_subtotal
 
-                if line_tax > 0:
+                # Les bases exonérées ou à 0% ont aussi leur ligne (TVA nulle):
+                # le chiffre d'affaires exonéré figure dans la déclaration de TVA
+                if line_base > 0:
                     # Obtenir le taux et son libellé
-                    if line.tax_rate == '7':
-                        rate_key = '7%'
-                        rate_label = 'TVA 7%'
-                    elif line.tax_rate == '13':
-                        rate_key = '13%'
-                        rate_label = 'TVA 13%'
-                    elif line.tax_rate == '19':
-                        rate_key = '19%'
-                        rate_label = 'TVA 19%'
-                    elif line.tax_rate == '0':
-                        rate_key = '0%'
-                        rate_label = 'Sans TVA'
-                    else:  # custom
-                        rate_key = f"{line.tax_rate_custom}%"
-                        rate_label = f"TVA {line.tax_rate_custom}%"
-                    
+                    rate_key, rate_label = TAX_RATE_LABELS.get(tax_rate) or (
+                        f"{tax_rate_custom}%", f"TVA {tax_rate_custom}%"
+                    )
                     # Ajouter au total par taux
                     if rate_key not in tax_by_rate:
                         tax_by_rate[rate_key] = {
                             'label': rate_label,
-                            'amount': 0.0
+                            'rate': tax_rate_value(tax_rate, tax_rate_custom),
+                            'base': 0.0,
+                            'amount': 0.0,
                         }
+                    tax_by_rate[rate_key]['base'] += line_base
                     tax_by_rate[rate_key]['amount'] += line_tax
-            
+
             # Calcul de la remise selon le type (sur le Total HT)
             discount_amount = 0.0
             if invoice.discount_type == 'percent' and invoice.discount_rate > 0:
@@ -275,28 +371,53 @@ class TravelInvoiceClient(models.Model):
             elif invoice.discount_type == 'fixed' and invoice.discount_fixed > 0:
                 # Remise fixe (ne peut pas dépasser le Total HT)
                 discount_amount = min(invoice.discount_fixed, amount_untaxed)
-            
-            # Total HT après remise (MT HT)
-            amount_after_discount = amount_untaxed - discount_amount
-            
+
             # Calculer le ratio de remise pour appliquer proportionnellement à la TVA
             if amount_untaxed > 0:
-                discount_ratio = amount_after_discount / amount_untaxed
+                discount_ratio = (amount_untaxed - discount_amount) / amount_untaxed
             else:
                 discount_ratio = 1.0
-            
+
             # Appliquer la remise proportionnellement à chaque taux de TVA
+            for tax_info in tax_by_rate.values():
+                tax_info['base'] *= discount_ratio
+                tax_info['amount'] *= discount_ratio
+
+            summaries[invoice.id] = {
+                'amount_untaxed': amount_untaxed,
+                'discount_amount': discount_amount,
+                'discount_ratio': discount_ratio,
+                'taxes': tax_by_rate,
+            }
+        return summaries
+
+    @api.depends('invoice_line_ids.price_ttc', 'invoice_line_ids.tax_rate', 'invoice_line_ids.tax_rate_custom',
+                 'invoice_line_ids.member_count', 'invoice_line_ids.is_ticket',
+                 'invoice_line_ids.ticket_price', 'invoice_line_ids.commission',
+                 'invoice_line_ids.service_id', 'invoice_line_ids.passenger_id',
+                 'fiscal_stamp',
+                 'discount_type', 'discount_rate', 'discount_fixed')
+    def _compute_amounts(self):
+        summaries = self._get_tax_summaries()
+        for invoice in self:
+            summary = summaries[invoice.id]
+            amount_untaxed = summary['amount_untaxed']
+            discount_amount = summary['discount_amount']
+
+            # Total HT après remise (MT HT)
+            amount_after_discount = amount_untaxed - discount_amount
+
             total_tax_after_discount = 0.0
             tax_7_amount = 0.0
             tax_13_amount = 0.0
             tax_19_amount = 0.0
             tax_custom_amount = 0.0
-            
-            for rate_key, tax_info in tax_by_rate.items():
-                tax_amount_before_discount = tax_info['amount']
-                tax_amount_after_discount = tax_amount_before_discount * discount_ratio
+            tax_details_list = []
+
+            for rate_key, tax_info in summary['taxes'].items():
+                tax_amount_after_discount = tax_info['amount']
                 total_tax_after_discount += tax_amount_after_discount
-                
+
                 # Stocker par type pour affichage
                 if rate_key == '7%':
                     tax_7_amount = tax_amount_after_discount
@@ -306,12 +427,14 @@ class TravelInvoiceClient(models.Model):
                     tax_19_amount = tax_amount_after_discount
                 else:
                     tax_custom_amount += tax_amount_after_discount
-                
-                # Ajouter au détail
+
+                # Ajouter au détail (les taux sans TVA n'y figurent pas)
+                if not tax_amount_after_discount:
+                    continue
                 tax_details_list.append(
                     f"{tax_info['label']}: {tax_amount_after_discount:.3f} DT"
                 )
-            
+
             invoice.amount_untaxed = amount_untaxed
             invoice.discount_amount = discount_amount
             invoice.amount_after_discount = amount_after_discount
@@ -323,7 +446,43 @@ class TravelInvoiceClient(models.Model):
             invoice.tax_details = "\n".join(tax_details_list) if tax_details_list else ""
             # Montant total = MT HT + TVA (après remise) + Timbre Fiscal
             invoice.amount_total = amount_after_discount + total_tax_after_discount + invoice.fiscal_stamp
-    
+
+    def _sync_tax_lines(self):
+        """
+        Mettre à jour les lignes de TVA stockées des factures données.
+
+        Seules les factures touchées sont recalculées; les lignes existantes
+        sont mises à jour sur place, créées ou supprimées selon les taux présents.
+        """
+        invoices = self.browse([rid for rid in self._ids if isinstance(rid, int)]).exists()
+        if not invoices:
+            return
+        Tax = self.env['travel.invoice.client.tax'].sudo()
+        summaries = invoices._get_tax_summaries()
+        existing = {
+            (tax.invoice_id.id, tax.rate_key): tax
+            for tax in Tax.search([('invoice_id', 'in', invoices.ids)])
+        }
+        to_create = []
+        for invoice in invoices:
+            for sequence, (rate_key, tax_info) in enumerate(summaries[invoice.id]['taxes'].items()):
+                vals = {
+                    'sequence': sequence,
+                    'name': tax_info['label'],
+                    'rate': tax_info['rate'],
+                    'base': invoice.currency_id.round(tax_info['base']),
+                    'amount': invoice.currency_id.round(tax_info['amount']),
+                }
+                tax = existing.pop((invoice.id, rate_key), None)
+                if tax is None:
+                    to_create.append(dict(vals, invoice_id=invoice.id, rate_key=rate_key))
+                elif any(tax[fname] != value for fname, value in vals.items()):
+                    tax.write(vals)
+        if existing:
+            Tax.browse([tax.id for tax in existing.values()]).unlink()
+        if to_create:
+            Tax.create(to_create)
+
     @api.depends('amount_total', 'amount_tax', 'fiscal_stamp', 'apply_withholding_tax', 'apply_vat_withholding')
     def _compute_withholding(self):
         for invoice in self:
@@ -353,7 +512,7 @@ class TravelInvoiceClient(models.Model):
         for invoice in self:
             if invoice.net_to_pay:
                 # Conversion en lettres (à adapter selon les besoins)
-                amount_text = invoice.currency_id.amount_to_text(invoice.net_to_pay)
+                amount_text = invoice._currency_amount_to_text(invoice.currency_id, invoice.net_to_pay)
                 invoice.amount_in_words = amount_text
             else:
                 invoice.amount_in_words = ''
@@ -388,6 +547,12 @@ class TravelInvoiceClient(models.Model):
         if vals.get('name', 'Nouveau') == 'Nouveau':
             vals['name'] = self.env['ir.sequence'].next_by_code('travel.invoice.client') or 'FAC-00001'
         return super(TravelInvoiceClient, self).create(vals)
+
+    def write(self, vals):
+        res = super(TravelInvoiceClient, self).write(vals)
+        if INVOICE_TAX_FIELDS.intersection(vals):
+            self._sync_tax_lines()
+        return res
     
     def action_confirm(self):
         self.ensure_one()
@@ -407,6 +572,18 @@ class TravelInvoiceClient(models.Model):
         self.ensure_one()
         self.state = 'draft'
     
+    def _get_pdf_cache_version(self):
+        """
+        Version du document pour le cache PDF: la facture et ses lignes.
+
+        Les ids des lignes en font partie: supprimer une ligne plus
+        ancienne que la dernière modifiée ne change pas la date maximale.
+        """
+        self.ensure_one()
+        dates = [self.write_date] + self.invoice_line_ids.mapped('write_date')
+        line_ids = ','.join(str(line_id) for line_id in sorted(self.invoice_line_ids.ids))
+        return f"{max(d for d in dates if d)}|{line_ids}"
+
     def action_print_invoice(self):
         """Imprimer la facture selon le type de template choisi"""
         self.ensure_one()
@@ -588,6 +765,136 @@ class TravelInvoiceClient(models.Model):
             'context': context,
         }
     
+    @api.model
+    def _prepare_reservation_lines(self, reservations):
+        """
+        Valeurs des lignes de facture pour des réservations (une ligne par réservation).
+
+        Les voyages et hôtels sont préchargés en une requête chacun.
+        """
+        reservations.destination_id.mapped('name')
+        reservations.hotel_service_id.mapped('name')
+
+        lines = []
+        for reservation in reservations:
+            # Utiliser total_price ou price selon ce qui est disponible
+            price = reservation.total_price if reservation.total_price > 0 else (reservation.price or 0.0)
+            if price <= 0:
+                continue
+
+            description = f"Réservation {reservation.name or 'N/A'}"
+            if reservation.destination_id:
+                description += f" - {reservation.destination_id.name}"
+            if reservation.check_in and reservation.check_out:
+                description += f" ({reservation.check_in} au {reservation.check_out})"
+
+            lines.append({
+                'passenger_id': reservation.member_id.id,
+                'reference': f"R-{str(reservation.id).zfill(5)}",
+                'description': description,
+                'destination_id': reservation.destination_id.id if reservation.destination_id else False,
+                'hotel_id': reservation.hotel_service_id.id if reservation.hotel_service_id else False,
+                'member_count': reservation.participants or 1,
+                'reservation_id': reservation.id,
+                'quantity': 1.0,
+                'price_ttc': price,  # Le prix de la réservation est TTC
+                'tax_rate': '7',  # Par défaut 7%, peut être modifié
+            })
+        return lines
+
+    @api.model
+    def _get_billing_period(self, period_date=None):
+        """Premier et dernier jour du mois précédant period_date (aujourd'hui par défaut)."""
+        today = period_date or fields.Date.context_today(self)
+        date_to = date_utils.start_of(today, 'month') - relativedelta(days=1)
+        return date_utils.start_of(date_to, 'month'), date_to
+
+    @api.model
+    def _generate_monthly_invoice(self, company, date_from, date_to):
+        """
+        Créer la facture consolidée d'une société pour la période.
+
+        Toutes les réservations confirmées ou terminées des membres de la
+        société, débutant au plus tard en fin de période et non encore
+        facturées, sont reprises (y compris les retardataires des mois
+        précédents). Les lignes sont créées par lots.
+
+        Returns:
+            record: Facture créée, ou facture vide si rien à facturer / déjà générée
+        """
+        if self.search_count([
+            ('travel_company_id', '=', company.id),
+            ('billing_period', '=', date_from),
+            ('state', '!=', 'cancel'),
+        ]):
+            return self.browse()
+
+        reservations = self.env['travel.reservation'].search([
+            ('member_id.company_id', '=', company.id),
+            ('status', 'in', ['confirmed', 'done']),
+            ('total_price', '>', 0),
+            ('check_in', '<=', date_to),
+            ('is_invoiced', '=', False),
+        ], order='member_id, check_in, id')
+        if not reservations:
+            return self.browse()
+
+        invoice = self.create({
+            'travel_company_id': company.id,
+            'member_ids': [(6, 0, reservations.member_id.ids)],
+            'date_invoice': date_to,
+            'billing_period': date_from,
+            'company_address': company.address or '',
+            'company_phone': company.phone or '',
+            'company_mobile': company.mobile or '',
+            'company_email': company.email or '',
+            'company_vat_number': company.vat or '',
+            'company_website': company.website or '',
+        })
+        for start in range(0, len(reservations), MONTHLY_INVOICING_CHUNK_SIZE):
+            chunk = reservations[start:start + MONTHLY_INVOICING_CHUNK_SIZE]
+            invoice.write({
+                'invoice_line_ids': [(0, 0, vals) for vals in self._prepare_reservation_lines(chunk)],
+            })
+        return invoice
+
+    @api.model
+    def cron_generate_monthly_invoices(self, period_date=None):
+        """
+        Cron de facturation mensuelle consolidée: une facture par société.
+
+        Chaque société est traitée dans son propre savepoint puis validée
+        (commit) hors tests: une erreur n'annule pas les autres sociétés et
+        une relance reprend là où le traitement s'est arrêté. Une facture
+        déjà générée pour la société et la période n'est jamais recréée.
+
+        Returns:
+            dict: Compteurs 'created', 'skipped' et 'failed'
+        """
+        date_from, date_to = self._get_billing_period(period_date)
+        companies = self.env['travel.company'].search([])
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        result = {'created': 0, 'skipped': 0, 'failed': 0}
+
+        for index, company in enumerate(companies, start=1):
+            try:
+                with self.env.cr.savepoint():
+                    invoice = self._generate_monthly_invoice(company, date_from, date_to)
+                result['created' if invoice else 'skipped'] += 1
+            except Exception:
+                result['failed'] += 1
+                _logger.exception(
+                    "Facturation mensuelle %s: échec pour la société %s", date_from, company.display_name
+                )
+            if auto_commit:
+                self.env.cr.commit()
+            if index % MONTHLY_INVOICING_LOG_STEP == 0 or index == len(companies):
+                _logger.info(
+                    "Facturation mensuelle %s: %d/%d sociétés (%d factures, %d ignorées, %d échecs)",
+                    date_from, index, len(companies), result['created'], result['skipped'], result['failed'],
+                )
+        return result
+
     def action_fill_lines_from_selected_members(self):
         """Remplir automatiquement les lignes de facture pour les membres sélectionnés"""
         self.ensure_one()
@@ -599,43 +906,23 @@ class TravelInvoiceClient(models.Model):
         
         # Utiliser les membres sélectionnés
         members = self.member_ids
-        
-        # Récupérer les réservations déjà facturées
-        existing_reservation_ids = self.invoice_line_ids.mapped('reservation_id').ids
-        
+
+        # Réservations facturables de tous les membres en une seule recherche
+        # (hors réservations déjà facturées sur une facture non annulée ou sur celle-ci)
+        reservations = self.env['travel.reservation'].search([
+            ('member_id', 'in', members.ids),
+            ('status', 'in', ['confirmed', 'done']),
+            ('total_price', '>', 0),
+            ('is_invoiced', '=', False),
+            ('id', 'not in', self.invoice_line_ids.reservation_id.ids),
+        ], order='id')
+
+        # Conserver l'ordre des membres sélectionnés
+        member_position = {member_id: index for index, member_id in enumerate(members.ids)}
+        reservations = reservations.sorted(lambda r: member_position[r.member_id.id])
+
         # Créer les lignes de facture pour les membres sélectionnés
-        lines = []
-        for member in members:
-            # Récupérer les réservations confirmées du membre qui ne sont pas déjà facturées
-            reservations = member.reservation_ids.filtered(
-                lambda r: r.status in ['confirmed', 'done'] 
-                and r.total_price > 0 
-                and r.id not in existing_reservation_ids
-            )
-            
-            for reservation in reservations:
-                # Utiliser total_price ou price selon ce qui est disponible
-                price = reservation.total_price if reservation.total_price > 0 else (reservation.price or 0.0)
-                
-                if price > 0:
-                    description = f"Réservation {reservation.name or 'N/A'}"
-                    if reservation.destination_id:
-                        description += f" - {reservation.destination_id.name}"
-                    if reservation.check_in and reservation.check_out:
-                        description += f" ({reservation.check_in} au {reservation.check_out})"
-                    
-                    lines.append((0, 0, {
-                        'passenger_id': member.id,
-                        'reference': f"R-{str(reservation.id).zfill(5)}",
-                        'description': description,
-                        'destination_id': reservation.destination_id.id if reservation.destination_id else False,
-                        'hotel_id': reservation.hotel_service_id.id if reservation.hotel_service_id else False,
-                        'member_count': reservation.participants or 1,
-                        'reservation_id': reservation.id,
-                        'quantity': 1.0,
-                        'price_ttc': price,  # Le prix de la réservation est TTC
-                        'tax_rate': '7',  # Par défaut 7%, peut être modifié
-                    }))
+        lines = [(0, 0, vals) for vals in self._prepare_reservation_lines(reservations)]
         
         if lines:
             # Ajouter les nouvelles lignes aux lignes existantes
@@ -688,7 +975,7 @@ class TravelInvoiceClientLine(models.Model):
     uom = fields.Char('Unité', default='d', help='Unité de mesure (ex: j pour jour)')
     price_ttc = fields.Monetary('Prix TTC Saisi', required=True, currency_field='currency_id', 
                                 help="Prix TTC (Total avec taxe) saisi dans la réservation")
-    price_unit = fields.Monetary('PU HT', compute='_compute_price_ht', store=False, currency_field='currency_id',
+    price_unit = fields.Monetary('PU HT', compute='_compute_price_ht', store=True, currency_field='currency_id',
                                  help="Prix HT calculé = Prix TTC - 7%")
     
     # Billet
@@ -709,13 +996,46 @@ class TravelInvoiceClientLine(models.Model):
                                    digits=(16, 2))
     
     # Totaux
-    price_subtotal = fields.Monetary('Total HT', compute='_compute_price', store=False, currency_field='currency_id')
-    price_tax = fields.Monetary('Montant TVA', compute='_compute_price', store=False, currency_field='currency_id')
-    price_total = fields.Monetary('Total TTC', compute='_compute_price', store=False, currency_field='currency_id')
+    price_subtotal = fields.Monetary('Total HT', compute='_compute_price', store=True, currency_field='currency_id')
+    price_tax = fields.Monetary('Montant TVA', compute='_compute_price', store=True, currency_field='currency_id')
+    price_total = fields.Monetary('Total TTC', compute='_compute_price', store=True, currency_field='currency_id')
     
     currency_id = fields.Many2one('res.currency', related='invoice_id.currency_id', store=True, readonly=True)
 
+    # Champs de la facture stockés sur la ligne pour les analyses (read_group)
+    travel_company_id = fields.Many2one('travel.company', string='Société',
+                                        related='invoice_id.travel_company_id', store=True, readonly=True)
+    date_invoice = fields.Date(string='Date Facture', related='invoice_id.date_invoice', store=True, readonly=True)
+    invoice_state = fields.Selection(string='État Facture', related='invoice_id.state', store=True, readonly=True)
+
+    # Une réservation ne peut figurer que sur une seule facture non annulée
+    # (contrainte d'exclusion = index unique partiel, appliqué par PostgreSQL)
+    _sql_constraints = [
+        ('reservation_invoiced_once',
+         "EXCLUDE USING btree (reservation_id WITH =) WHERE (reservation_id IS NOT NULL AND invoice_state != 'cancel')",
+         "Cette réservation est déjà facturée sur une autre facture client non annulée."),
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super(TravelInvoiceClientLine, self).create(vals_list)
+        lines.invoice_id._sync_tax_lines()
+        return lines
+
     def write(self, vals):
+        invoices = self.invoice_id
+        res = self._write_keep_member_count(vals)
+        if LINE_TAX_FIELDS.intersection(vals):
+            (invoices | self.invoice_id)._sync_tax_lines()
+        return res
+
+    def unlink(self):
+        invoices = self.invoice_id
+        res = super(TravelInvoiceClientLine, self).unlink()
+        invoices._sync_tax_lines()
+        return res
+
+    def _write_keep_member_count(self, vals):
         if 'member_count' not in vals:
             return super(TravelInvoiceClientLine, self).write(vals)
 
@@ -764,10 +1084,7 @@ class TravelInvoiceClientLine(models.Model):
     def _get_tax_rate_value(self):
         """Obtenir la valeur numérique du taux TVA"""
         self.ensure_one()
-        if self.tax_rate == 'custom':
-            return self.tax_rate_custom or 0.0
-        else:
-            return float(self.tax_rate or '7')
+        return tax_rate_value(self.tax_rate, self.tax_rate_custom)
 
     def _get_effective_quantity(self):
         """Quantité effective de facturation.
@@ -775,9 +1092,7 @@ class TravelInvoiceClientLine(models.Model):
         L'utilisateur saisit manuellement le nombre de membres.
         """
         self.ensure_one()
-        if self.member_count and self.member_count > 0:
-            return float(self.member_count)
-        return 1.0
+        return effective_quantity(self.member_count)
     
     @api.depends('member_count', 'price_ttc', 'tax_rate', 'tax_rate_custom', 'is_ticket', 'ticket_price', 'commission')
     def _compute_price_ht(self):
@@ -792,7 +1107,7 @@ class TravelInvoiceClientLine(models.Model):
                 if line.is_ticket:
                     line.price_unit = line.ticket_price + line.commission
                 else:
-                    tax_percent = line._get_tax_rate_value() / 100.0
+                    tax_percent = tax_rate_value(line.tax_rate, line.tax_rate_custom) / 100.0
                     line.price_unit = line.price_ttc / (1 + tax_percent)
             else:
                 line.price_unit = 0.0
@@ -808,20 +1123,10 @@ class TravelInvoiceClientLine(models.Model):
         """
         for line in self:
             if line.is_ticket or line.price_ttc:
-                tax_percent = line._get_tax_rate_value() / 100.0
-                total_ttc = line._get_effective_quantity() * line.price_ttc
-                
-                if line.is_ticket:
-                    total_ticket = line._get_effective_quantity() * line.ticket_price
-                    total_commission = line._get_effective_quantity() * line.commission
-                    tax_amount = total_commission * tax_percent
-                    subtotal = total_ticket + total_commission
-                else:
-                    # HT = TTC / (1 + TVA)
-                    subtotal = total_ttc / (1 + tax_percent)
-                    # TVA = HT * taux
-                    tax_amount = subtotal * tax_percent
-                
+                subtotal, tax_amount, _base = compute_line_amounts(
+                    line.price_ttc, line.is_ticket, line.tax_rate, line.tax_rate_custom,
+                    line.member_count, line.ticket_price, line.commission,
+                )
                 line.price_subtotal = subtotal
                 line.price_tax = tax_amount
                 line.price_total = subtotal + tax_amount
@@ -830,6 +1135,28 @@ class TravelInvoiceClientLine(models.Model):
                 line.price_tax = 0.0
                 line.price_total = 0.0
     
+    @api.model
+    def _get_revenue_by(self, groupby, domain=None):
+        """
+        Chiffre d'affaires des factures validées, agrégé en SQL.
+
+        Args:
+            groupby (str): Champ de regroupement ('tax_rate', 'destination_id',
+                'travel_company_id', 'date_invoice:month', ...)
+            domain (list): Filtre additionnel sur les lignes
+
+        Returns:
+            list: Groupes read_group avec price_subtotal, price_tax et price_total
+        """
+        domain = list(domain or []) + [('invoice_state', 'in', REVENUE_INVOICE_STATES)]
+        return self.read_group(
+            domain,
+            ['price_subtotal:sum', 'price_tax:sum', 'price_total:sum'],
+            [groupby],
+            orderby=groupby.split(':')[0],
+            lazy=False,
+        )
+
     @api.onchange('passenger_id')
     def _onchange_passenger_id(self):
         """Remplir automatiquement le voyage et le prix depuis les réservations du membre"""
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models, tools
+
+from .invoice_client import REVENUE_INVOICE_STATES
+
+
+class TravelInvoiceClientTax(models.Model):
+    """
+    Récapitulatif TVA d'une facture client: une ligne par taux, y compris
+    les bases à 0% (TVA nulle) déclarées comme chiffre d'affaires exonéré.
+
+    Les lignes sont maintenues par travel.invoice.client._sync_tax_lines à
+    chaque modification des lignes de facture ou de la remise. Les bases et
+    montants sont après remise, tels qu'affichés sur la facture, et servent
+    à la déclaration mensuelle de TVA.
+    """
+    _name = 'travel.invoice.client.tax'
+    _description = 'Ligne TVA Facture Client'
+    _order = 'invoice_id, sequence, id'
+
+    invoice_id = fields.Many2one('travel.invoice.client', string='Facture', required=True,
+                                 readonly=True, ondelete='cascade', index=True)
+    sequence = fields.Integer('Séquence', default=10, readonly=True)
+    rate_key = fields.Char('Clé Taux', required=True, readonly=True)
+    name = fields.Char('Taux', required=True, readonly=True)
+    rate = fields.Float('Taux (%)', digits=(16, 2), readonly=True)
+    base = fields.Monetary('Base HT', currency_field='currency_id', readonly=True)
+    amount = fields.Monetary('Montant TVA', currency_field='currency_id', readonly=True)
+
+    currency_id = fields.Many2one('res.currency', related='invoice_id.currency_id', store=True, readonly=True)
+    travel_company_id = fields.Many2one('travel.company', string='Société',
+                                        related='invoice_id.travel_company_id', store=True, readonly=True)
+    date_invoice = fields.Date(string='Date Facture', related='invoice_id.date_invoice', store=True, readonly=True)
+    invoice_state = fields.Selection(string='État Facture', related='invoice_id.state', store=True, readonly=True)
+
+    _sql_constraints = [
+        ('invoice_rate_unique', 'UNIQUE(invoice_id, rate_key)',
+         'Une seule ligne de TVA par taux et par facture.'),
+    ]
+
+    def init(self):
+        # Déclaration de TVA: filtre sur la période et l'état de la facture
+        tools.create_index(
+            self._cr, 'travel_invoice_client_tax_declaration_idx', self._table,
+            ['date_invoice', 'invoice_state', 'rate_key']
+        )
+
+    @api.model
+    def _get_vat_declaration(self, date_from, date_to):
+        """
+        Déclaration de TVA de la période, agrégée par taux en une requête.
+
+        Args:
+            date_from (date): Premier jour de la période
+            date_to (date): Dernier jour de la période
+
+        Returns:
+            list: [{'rate_key', 'name', 'rate', 'base', 'amount', 'invoice_count'}] par taux croissant
+        """
+        self.flush_model(['rate_key', 'name', 'rate', 'base', 'amount', 'date_invoice', 'invoice_state'])
+        self.env.cr.execute("""
+            SELECT rate_key, name, rate,
+                   SUM(base) AS base,
+                   SUM(amount) AS amount,
+                   COUNT(DISTINCT invoice_id) AS invoice_count
+              FROM travel_invoice_client_tax
+             WHERE date_invoice >= %s
+               AND date_invoice <= %s
+               AND invoice_state IN %s
+          GROUP BY rate_key, name, rate
+          ORDER BY rate, rate_key
+        """, (date_from, date_to, REVENUE_INVOICE_STATES))
+        return self.env.cr.dictfetchall()
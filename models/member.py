@@ -7,13 +7,69 @@ incluant leurs informations personnelles, leur solde crédit
 et leurs réservations.
 """
 import logging
+import re
+import unicodedata
 
 from odoo import api, fields, models
-from odoo.exceptions import ValidationError
+from odoo.exceptions import UserError, ValidationError
 from odoo.osv import expression
 
 _logger = logging.getLogger(__name__)
 
+# Caractères ignorés dans un numéro de téléphone (validation, comparaison)
+PHONE_STRIP_TABLE = str.maketrans('', '', ' -.+')
+PHONE_MIN_DIGITS = 8
+
+
+def clean_phone(phone):
+    """Numéro de téléphone sans espaces, tirets, points ni '+'."""
+    return (phone or '').translate(PHONE_STRIP_TABLE)
+
+
+# Codes Soundex des consonnes (voyelles, h, w et y sont ignorés)
+SOUNDEX_CODES = {
+    letter: str(code)
+    for code, letters in enumerate(('bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r'), start=1)
+    for letter in letters
+}
+NAME_WORD_PATTERN = re.compile(r'[a-z]+')
+
+# Enregistrements liés à un membre par (modèle, res_id), repris par le
+# membre conservé lors d'une fusion: table, colonne du modèle, filtre
+# (les pièces jointes des champs binaires restent au doublon)
+MERGE_RES_ID_TABLES = (
+    ('mail_message', 'model', ''),
+    ('mail_activity', 'res_model', ''),
+    ('ir_attachment', 'res_model', 'AND res_field IS NULL'),
+)
+# Contacts fusionnés par appel au wizard de fusion de contacts (limite de base.partner.merge)
+MERGE_PARTNER_CHUNK = 2
+
+
+def _soundex(word):
+    """Code Soundex d'un mot en minuscules sans accents (ex: 'robert' -> 'r163')."""
+    digits = []
+    previous = SOUNDEX_CODES.get(word[0], '')
+    for letter in word[1:]:
+        code = SOUNDEX_CODES.get(letter, '')
+        if code and code != previous:
+            digits.append(code)
+        if letter not in 'hw':
+            previous = code
+    return (word[0] + ''.join(digits) + '000')[:4]
+
+
+def name_phonetic_key(name):
+    """
+    Clé phonétique d'un nom: Soundex de chaque mot, triés.
+
+    Insensible aux accents, à la casse, à la ponctuation, à l'ordre des
+    mots et aux fautes de frappe sur les voyelles
+    (ex: 'Ben Salah Ahmed' et 'ahmad ben-saleh' -> 'a530 b500 s400').
+    """
+    ascii_name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode().lower()
+    return ' '.join(sorted({_soundex(word) for word in NAME_WORD_PATTERN.findall(ascii_name)}))
+
 
 class TravelMember(models.Model):
     """
@@ -25,7 +81,9 @@ class TravelMember(models.Model):
     """
     _name = 'travel.member'
     _description = 'Voyageur (Membre)'
-    _inherit = ['mail.thread', 'mail.activity.mixin', 'email.validation.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'email.validation.mixin', 'record.count.mixin',
+                'trigram.search.mixin']
+    _trigram_fields = ['name', 'matricule']
     _order = 'name'
 
     # ===== CONTRAINTES SQL =====
@@ -104,9 +162,19 @@ class TravelMember(models.Model):
     )
     
     # Statistiques de paiement
-    total_paid = fields.Float('Total Payé (TND)', compute='_compute_payment_stats', digits=(16, 2))
-    total_remaining = fields.Float('Reste à Payer (TND)', compute='_compute_payment_stats', digits=(16, 2))
-    payment_count = fields.Integer('Nombre de Paiements', compute='_compute_payment_stats')
+    # Stockées pour le tri et le filtrage; recalculées (une requête groupée)
+    # à la confirmation ou l'annulation d'une opération de caisse
+    total_paid = fields.Float('Total Payé (TND)', compute='_compute_payment_stats', store=True, digits=(16, 2))
+    total_remaining = fields.Float('Reste à Payer (TND)', compute='_compute_payment_stats', store=True,
+                                   digits=(16, 2))
+    payment_count = fields.Integer('Nombre de Paiements', compute='_compute_payment_stats', store=True)
+
+    # Empreintes normalisées pour la détection des doublons (travel.member.duplicate)
+    email_normalized = fields.Char('Email Normalisé', compute='_compute_fingerprint', store=True,
+                                   index='btree_not_null')
+    phone_normalized = fields.Char('Téléphone Normalisé', compute='_compute_fingerprint', store=True,
+                                   index='btree_not_null')
+    name_key = fields.Char('Clé Phonétique du Nom', compute='_compute_fingerprint', store=True, index=True)
 
     # ===== VALIDATIONS =====
     # La validation email est héritée de email.validation.mixin
@@ -117,80 +185,146 @@ class TravelMember(models.Model):
         for record in self:
             if record.phone:
                 # Nettoyer le numéro (supprimer espaces et caractères spéciaux)
-                cleaned = record.phone.replace(' ', '').replace('-', '').replace('.', '').replace('+', '')
-                if len(cleaned) < 8:
+                if len(clean_phone(record.phone)) < PHONE_MIN_DIGITS:
                     raise ValidationError(
                         f"Numéro de téléphone trop court: {record.phone}\n"
                         "Le numéro doit contenir au moins 8 chiffres."
                     )
 
     # ===== COMPUTED FIELDS =====
+    @api.depends('name', 'email', 'phone')
+    def _compute_fingerprint(self):
+        """Email en minuscules, téléphone nettoyé, clé phonétique du nom."""
+        for rec in self:
+            rec.email_normalized = (rec.email or '').strip().lower() or False
+            rec.phone_normalized = clean_phone(rec.phone) or False
+            rec.name_key = name_phonetic_key(rec.name) or False
+
     @api.depends('reservation_ids')
     def _compute_reservation_count(self):
         """Calculer le nombre de réservations du membre."""
-        for rec in self:
-            rec.reservation_count = len(rec.reservation_ids)
+        self._compute_record_count('reservation_count', 'travel.reservation', 'member_id')
 
-    @api.depends('credit_history_ids.amount')
+    @api.depends('credit_history_ids.amount', 'credit_history_ids.balance_after')
     def _compute_credit_balance(self):
-        """Calculer le solde crédit depuis l'historique."""
+        """
+        Lire le solde crédit sur la dernière ligne du registre.
+
+        Une seule requête pour tout le recordset, quel que soit le nombre
+        de lignes d'historique de chaque membre.
+        """
+        stored_ids = tuple(rid for rid in self._ids if isinstance(rid, int))
+        balances = self.env['travel.credit.history']._get_last_balances(stored_ids)
         for rec in self:
-            rec.credit_balance = sum(h.amount for h in rec.credit_history_ids)
+            if isinstance(rec.id, int):
+                rec.credit_balance = balances.get(rec.id, 0.0)
+            else:
+                rec.credit_balance = sum(h.amount for h in rec.credit_history_ids)
+
+    @api.model
+    def _read_payment_stats(self, member_ids):
+        """
+        Statistiques de paiement par membre en une requête groupée.
 
-    @api.depends('reservation_ids.cash_operation_ids', 'reservation_ids.cash_operation_ids.state', 
-                 'reservation_ids.cash_operation_ids.amount', 'reservation_ids.cash_operation_ids.type',
-                 'reservation_ids.remaining_to_pay')
+        Les opérations confirmées sont d'abord agrégées par réservation, puis
+        par membre avec le reste à payer de ses réservations.
+
+        Returns:
+            dict: {member_id: (total payé, reste à payer, nombre de recettes)}
+        """
+        if not member_ids:
+            return {}
+        self.env['travel.reservation'].flush_model(['member_id', 'remaining_to_pay'])
+        self.env['cash.register.operation'].flush_model(['reservation_id', 'state', 'type', 'signed_amount'])
+        self.env.cr.execute("""
+            WITH reservation AS (
+                SELECT id, member_id, remaining_to_pay
+                  FROM travel_reservation
+                 WHERE member_id IN %s
+            ), payment AS (
+                SELECT op.reservation_id,
+                       SUM(op.signed_amount) AS paid,
+                       COUNT(*) FILTER (WHERE op.type = 'receipt') AS receipt_count
+                  FROM cash_register_operation op
+                  JOIN reservation ON reservation.id = op.reservation_id
+                 WHERE op.state = 'confirmed'
+              GROUP BY op.reservation_id
+            )
+            SELECT reservation.member_id,
+                   COALESCE(SUM(payment.paid), 0),
+                   COALESCE(SUM(reservation.remaining_to_pay), 0),
+                   COALESCE(SUM(payment.receipt_count), 0)
+              FROM reservation
+              LEFT JOIN payment ON payment.reservation_id = reservation.id
+          GROUP BY reservation.member_id
+        """, (tuple(member_ids),))
+        return {member_id: (paid, remaining, count) for member_id, paid, remaining, count in self.env.cr.fetchall()}
+
+    @api.depends('reservation_ids', 'reservation_ids.remaining_to_pay', 'reservation_ids.cash_operation_ids',
+                 'reservation_ids.cash_operation_ids.state', 'reservation_ids.cash_operation_ids.type',
+                 'reservation_ids.cash_operation_ids.signed_amount')
     def _compute_payment_stats(self):
-        """Calculer les statistiques de paiement basées sur les réservations."""
+        """
+        Calculer les statistiques de paiement basées sur les réservations.
+
+        Total payé = recettes - dépenses (remboursements caisse) confirmées,
+        reste à payer = somme des restes des réservations, nombre de
+        paiements = nombre de recettes confirmées.
+        """
+        stats = self._read_payment_stats(tuple(rid for rid in self._ids if isinstance(rid, int)))
         for rec in self:
+            if isinstance(rec.id, int):
+                rec.total_paid, rec.total_remaining, rec.payment_count = stats.get(rec.id, (0.0, 0.0, 0))
+                continue
             reservations = rec.reservation_ids
-            # Récupérer toutes les opérations confirmées liées aux réservations du membre
             all_ops = reservations.mapped('cash_operation_ids').filtered(lambda o: o.state == 'confirmed')
             receipts = all_ops.filtered(lambda o: o.type == 'receipt')
-            expenses = all_ops.filtered(lambda o: o.type == 'expense')
-            
-            # Total payé = Recettes - Dépenses (remboursements caisse)
-            rec.total_paid = sum(receipts.mapped('amount')) - sum(expenses.mapped('amount'))
-            # Reste à payer = somme des restes à payer de toutes les réservations
+            rec.total_paid = sum(all_ops.mapped('signed_amount'))
             rec.total_remaining = sum(reservations.mapped('remaining_to_pay'))
-            # Nombre d'opérations de type recette
             rec.payment_count = len(receipts)
 
     # ===== CRUD METHODS =====
-    @api.model
-    def create(self, vals):
+    @api.model_create_multi
+    def create(self, vals_list):
         """
-        Créer un nouveau membre.
+        Créer des membres.
         
         Si aucun partner_id n'est fourni, crée automatiquement un
-        contact res.partner avec les informations du membre.
+        contact res.partner avec les informations du membre. Les contacts
+        de tous les membres du lot sont créés en un seul appel.
         """
-        if not vals.get('partner_id'):
-            # Créer le partner avec les informations du membre
-            partner_vals = {
-                'name': vals.get('name', 'Client'),
-                'customer_rank': 1,
-            }
-            # Ajouter email et phone seulement s'ils sont fournis
-            if vals.get('email'):
-                partner_vals['email'] = vals.get('email')
-            if vals.get('phone'):
-                partner_vals['phone'] = vals.get('phone')
-            
+        missing_partner = [vals for vals in vals_list if not vals.get('partner_id')]
+        if missing_partner:
+            partner_vals_list = []
+            for vals in missing_partner:
+                # Créer le partner avec les informations du membre
+                partner_vals = {
+                    'name': vals.get('name', 'Client'),
+                    'customer_rank': 1,
+                }
+                # Ajouter email et phone seulement s'ils sont fournis
+                if vals.get('email'):
+                    partner_vals['email'] = vals.get('email')
+                if vals.get('phone'):
+                    partner_vals['phone'] = vals.get('phone')
+                partner_vals_list.append(partner_vals)
+
             # Le company_id sera géré automatiquement par Odoo si nécessaire
             # Ne pas le forcer pour éviter les problèmes de contrainte
-            partner = self.env['res.partner'].with_context(
+            partners = self.env['res.partner'].with_context(
                 default_company_id=False
-            ).create(partner_vals)
-            vals['partner_id'] = partner.id
-            
+            ).create(partner_vals_list)
+            for vals, partner in zip(missing_partner, partners):
+                vals['partner_id'] = partner.id
+
             _logger.info(
-                "Partner créé automatiquement pour le membre '%s': ID %s",
-                vals.get('name'),
-                partner.id
+                "%s partner(s) créé(s) automatiquement pour les membres: %s",
+                len(partners),
+                ', '.join(str(vals.get('name')) for vals in missing_partner[:5])
+                + (', ...' if len(missing_partner) > 5 else '')
             )
         
-        return super().create(vals)
+        return super().create(vals_list)
 
     def write(self, vals):
         """
@@ -296,6 +430,151 @@ class TravelMember(models.Model):
             },
         }
 
+    # ===== FUSION DES DOUBLONS =====
+    @api.model
+    def _get_member_reference_fields(self):
+        """
+        Champs stockés pointant vers un membre, tous modèles confondus.
+
+        Yields:
+            tuple: (modèle, champ many2one ou many2many)
+        """
+        for model_name in self.env.registry:
+            Model = self.env[model_name]
+            if Model._abstract or Model._transient or not Model._auto:
+                continue
+            for field in Model._fields.values():
+                if field.type in ('many2one', 'many2many') and field.comodel_name == self._name and field.store:
+                    yield Model, field
+
+    def _merge_into(self, master):
+        """
+        Fusionner les membres de self dans master puis supprimer les doublons.
+
+        Les références (réservations, historique crédit, lignes de facture,
+        commandes POS...) sont reportées en SQL, une requête par champ
+        quel que soit le nombre de lignes; les opérations de caisse suivent
+        leurs réservations. Les messages, activités, pièces jointes et
+        abonnés des doublons passent au membre conservé, et leurs contacts
+        sont fusionnés dans le sien (base.partner.merge). Les champs calculés
+        qui en dépendent puis le registre crédit du membre conservé sont
+        recalculés une seule fois.
+
+        Returns:
+            travel.member: master
+        """
+        duplicates = self - master
+        if not duplicates:
+            return master
+        duplicates.check_access_rights('unlink')
+        duplicates.check_access_rule('unlink')
+        master.check_access_rule('write')
+        self.env.flush_all()
+        CreditHistory = self.env['travel.credit.history']
+        CreditHistory._lock_members(tuple((master | duplicates).ids))
+
+        cr = self.env.cr
+        duplicate_ids = tuple(duplicates.ids)
+        repointed = []
+        for Model, field in self._get_member_reference_fields():
+            if field.type == 'many2one':
+                cr.execute(f"""
+                    UPDATE "{Model._table}" SET "{field.name}" = %s
+                     WHERE "{field.name}" IN %s
+                 RETURNING id
+                """, (master.id, duplicate_ids))
+                ids = [row[0] for row in cr.fetchall()]
+                if ids:
+                    repointed.append((Model, field.name, ids))
+                continue
+            # Many2many: lier master aux mêmes enregistrements, sans doublon de lien
+            cr.execute(f"""
+                INSERT INTO "{field.relation}" ("{field.column1}", "{field.column2}")
+                SELECT DISTINCT "{field.column1}", %s FROM "{field.relation}" WHERE "{field.column2}" IN %s
+                ON CONFLICT DO NOTHING
+            """, (master.id, duplicate_ids))
+            cr.execute(f'DELETE FROM "{field.relation}" WHERE "{field.column2}" IN %s', (duplicate_ids,))
+        self._merge_res_id_records(master, duplicate_ids)
+
+        self.env.invalidate_all()
+        for Model, field_name, ids in repointed:
+            Model.browse(ids).modified([field_name])
+
+        # Coordonnées manquantes du membre conservé reprises des doublons
+        missing = {
+            field_name: next((value for value in duplicates.mapped(field_name) if value), False)
+            for field_name in ('email', 'phone', 'matricule', 'company_id')
+            if not master[field_name]
+        }
+        missing = {field_name: value for field_name, value in missing.items() if value}
+        summary = ', '.join(duplicates.mapped('display_name'))
+        duplicate_partners = duplicates.partner_id - master.partner_id
+        duplicates.with_context(tracking_disable=True).unlink()
+        if missing:
+            if 'company_id' in missing:
+                missing['company_id'] = missing['company_id'].id
+            master.write(missing)
+        self._merge_partners(master.partner_id, duplicate_partners)
+        CreditHistory._rebuild_ledger([master.id])
+        master.message_post(body=f"Fusion des doublons: {summary}")
+        _logger.info("Membres %s fusionnés dans le membre %s", list(duplicate_ids), master.id)
+        return master
+
+    @api.model
+    def _merge_res_id_records(self, master, duplicate_ids):
+        """Reporter sur master les messages, activités, pièces jointes et abonnés des doublons."""
+        cr = self.env.cr
+        for table, model_column, condition in MERGE_RES_ID_TABLES:
+            cr.execute(f"""
+                UPDATE "{table}" SET res_id = %s
+                 WHERE "{model_column}" = %s AND res_id IN %s {condition}
+            """, (master.id, self._name, duplicate_ids))
+        # Un contact ne suit qu'une fois un enregistrement (contrainte unique)
+        cr.execute("""
+            DELETE FROM mail_followers follower
+             WHERE follower.res_model = %(model)s
+               AND follower.res_id IN %(duplicates)s
+               AND EXISTS (SELECT 1 FROM mail_followers other
+                            WHERE other.res_model = %(model)s
+                              AND other.partner_id = follower.partner_id
+                              AND (other.res_id = %(master)s
+                                   OR (other.res_id IN %(duplicates)s AND other.id < follower.id)))
+        """, {'model': self._name, 'master': master.id, 'duplicates': duplicate_ids})
+        cr.execute("""
+            UPDATE mail_followers SET res_id = %s
+             WHERE res_model = %s AND res_id IN %s
+        """, (master.id, self._name, duplicate_ids))
+
+    @api.model
+    def _merge_partners(self, master_partner, partners):
+        """
+        Fusionner les contacts des doublons dans celui du membre conservé.
+
+        Les contacts d'utilisateurs ne sont pas fusionnés: ils restent
+        orphelins de membre mais gardent leur utilisateur.
+        """
+        partners = partners.exists().filtered(lambda partner: not partner.user_ids)
+        if not partners:
+            return
+        PartnerMerge = self.env['base.partner.merge.automatic.wizard'].sudo()
+        for start in range(0, len(partners), MERGE_PARTNER_CHUNK):
+            chunk = partners[start:start + MERGE_PARTNER_CHUNK]
+            PartnerMerge._merge((master_partner | chunk).ids, master_partner, extra_checks=False)
+
+    def action_merge_members(self):
+        """Fusionner les membres sélectionnés dans le plus ancien."""
+        if len(self) < 2:
+            raise UserError("Sélectionnez au moins deux membres à fusionner.")
+        master = self.sorted('id')[:1]
+        self._merge_into(master)
+        return {
+            'name': master.name,
+            'type': 'ir.actions.act_window',
+            'res_model': 'travel.member',
+            'view_mode': 'form',
+            'res_id': master.id,
+        }
+
     # ===== SEARCH METHODS =====
     @api.model
     def _name_search(self, name='', args=None, operator='ilike', limit=100, order=None):
@@ -303,6 +582,7 @@ class TravelMember(models.Model):
         Recherche par nom et matricule.
         
         Permet de trouver un membre en tapant soit son nom soit son matricule.
+        Les deux ilike sont servis par les index trigrammes (trigram.search.mixin).
         """
         args = args or []
         domain = []
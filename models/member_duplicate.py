@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Détection et fusion des membres en double.
+
+La détection regroupe en SQL les membres qui partagent une empreinte
+normalisée (email, téléphone, ou clé phonétique du nom dans la même
+société), servie par les index de travel.member; les groupes qui se
+recoupent sont réunis en Python. Seuls les membres candidats sont
+chargés: le traitement reste en quelques requêtes pour 100 000 membres.
+"""
+import logging
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Au-delà, une empreinte partagée est une valeur générique (ex: téléphone
+# de l'agence saisi pour tous les membres d'une société), pas un doublon
+DUPLICATE_MAX_GROUP_SIZE = 20
+
+# Critères du plus fiable au moins fiable
+DUPLICATE_REASONS = [
+    ('email', 'Même email'),
+    ('phone', 'Même téléphone'),
+    ('name', 'Même nom (phonétique) et société'),
+]
+
+
+class TravelMemberDuplicate(models.Model):
+    """Groupe de membres probablement identiques."""
+    _name = 'travel.member.duplicate'
+    _description = 'Doublons de Membres'
+    _order = 'state, member_count desc, id'
+
+    name = fields.Char('Groupe', readonly=True)
+    reason = fields.Selection(DUPLICATE_REASONS, string='Critère', readonly=True,
+                              help="Critère le plus fiable reliant les membres du groupe")
+    member_ids = fields.Many2many('travel.member', 'travel_member_duplicate_rel', 'duplicate_id', 'member_id',
+                                  string='Membres', readonly=True)
+    member_count = fields.Integer('Nombre de Membres', readonly=True)
+    master_id = fields.Many2one('travel.member', string='Membre Conservé', ondelete='set null',
+                                domain="[('id', 'in', member_ids)]",
+                                help="Les autres membres du groupe sont fusionnés dans celui-ci")
+    state = fields.Selection([
+        ('open', 'À traiter'),
+        ('merged', 'Fusionné'),
+        ('ignored', 'Ignoré'),
+    ], string='État', default='open', readonly=True, index=True)
+
+    @api.model
+    def _read_fingerprint_groups(self):
+        """
+        Groupes de membres partageant une empreinte (une requête).
+
+        Returns:
+            list: [(critère, [member_ids])]
+        """
+        self.env['travel.member'].flush_model(['email_normalized', 'phone_normalized', 'name_key', 'company_id'])
+        self.env.cr.execute("""
+            SELECT 'email', array_agg(id ORDER BY id)
+              FROM travel_member
+             WHERE email_normalized IS NOT NULL
+          GROUP BY email_normalized
+            HAVING COUNT(*) BETWEEN 2 AND %(max_size)s
+         UNION ALL
+            SELECT 'phone', array_agg(id ORDER BY id)
+              FROM travel_member
+             WHERE phone_normalized IS NOT NULL
+          GROUP BY phone_normalized
+            HAVING COUNT(*) BETWEEN 2 AND %(max_size)s
+         UNION ALL
+            SELECT 'name', array_agg(id ORDER BY id)
+              FROM travel_member
+             WHERE name_key IS NOT NULL
+          GROUP BY name_key, company_id
+            HAVING COUNT(*) BETWEEN 2 AND %(max_size)s
+        """, {'max_size': DUPLICATE_MAX_GROUP_SIZE})
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _cluster_groups(self, groups):
+        """
+        Réunir les groupes qui partagent un membre (union-find).
+
+        Returns:
+            list: [(critère le plus fiable, [member_ids triés])]
+        """
+        parent = {}
+
+        def find(member_id):
+            root = member_id
+            while parent.setdefault(root, root) != root:
+                root = parent[root]
+            while parent[member_id] != root:
+                parent[member_id], member_id = root, parent[member_id]
+            return root
+
+        for _reason, member_ids in groups:
+            root = find(member_ids[0])
+            for member_id in member_ids[1:]:
+                parent[find(member_id)] = root
+
+        rank = {reason: index for index, (reason, _label) in enumerate(DUPLICATE_REASONS)}
+        clusters = {}
+        for reason, member_ids in groups:
+            cluster = clusters.setdefault(find(member_ids[0]), {'reason': reason, 'ids': set()})
+            cluster['ids'].update(member_ids)
+            if rank[reason] < rank[cluster['reason']]:
+                cluster['reason'] = reason
+        return [(cluster['reason'], sorted(cluster['ids'])) for cluster in clusters.values()]
+
+    @api.model
+    def detect_duplicates(self):
+        """
+        Recalculer les groupes de doublons à traiter.
+
+        Les groupes ouverts sont remplacés; un groupe ignoré n'est pas
+        recréé tant que ses membres restent les mêmes.
+
+        Returns:
+            int: Nombre de groupes à traiter
+        """
+        clusters = self._cluster_groups(self._read_fingerprint_groups())
+        self.search([('state', '=', 'open')]).unlink()
+        ignored = {frozenset(group.member_ids.ids) for group in self.search([('state', '=', 'ignored')])}
+        clusters = [(reason, ids) for reason, ids in clusters if frozenset(ids) not in ignored]
+
+        names = dict(self.env['travel.member'].browse([ids[0] for _reason, ids in clusters]).name_get())
+        self.create([{
+            'name': names.get(ids[0]),
+            'reason': reason,
+            'member_ids': [(6, 0, ids)],
+            'member_count': len(ids),
+            'master_id': ids[0],
+        } for reason, ids in clusters])
+        _logger.info("Détection des doublons de membres: %d groupe(s) à traiter", len(clusters))
+        return len(clusters)
+
+    @api.model
+    def cron_detect_duplicates(self):
+        """Cron hebdomadaire de détection des doublons."""
+        self.detect_duplicates()
+
+    def action_merge(self):
+        """Fusionner chaque groupe dans son membre conservé."""
+        for group in self:
+            if group.state != 'open':
+                raise UserError(f"Le groupe {group.name} n'est plus à traiter.")
+            if not group.master_id or group.master_id not in group.member_ids:
+                raise UserError(f"Choisissez le membre conservé du groupe {group.name}.")
+            members = group.member_ids
+            members._merge_into(group.master_id)
+            group.write({'state': 'merged', 'member_count': len(members)})
+        return True
+
+    def action_ignore(self):
+        """Marquer les groupes comme faux doublons."""
+        self.filtered(lambda group: group.state == 'open').write({'state': 'ignored'})
+        return True
+
+    def action_reopen(self):
+        """Remettre des groupes ignorés à traiter."""
+        self.filtered(lambda group: group.state == 'ignored').write({'state': 'open'})
+        return True
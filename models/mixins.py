@@ -5,14 +5,45 @@ Mixins réutilisables pour le module TravelPro.
 Ce fichier contient des classes abstraites (mixins) qui peuvent être
 héritées par d'autres modèles pour éviter la duplication de code.
 """
+import functools
 import logging
 import re
 
-from odoo import api, fields, models
+import psycopg2
+
+from odoo import api, fields, models, tools
 from odoo.exceptions import ValidationError
+from odoo.tools.sql import escape_psql
 
 _logger = logging.getLogger(__name__)
 
+# Nombre de montants distincts gardés en cache par processus
+AMOUNT_WORDS_CACHE_SIZE = 4096
+
+# Correction de l'abréviation erronée "Mlle" parfois produite pour "mille"
+MLLE_PATTERN = re.compile(r'\bMlle\b', re.IGNORECASE)
+
+# Longueur minimale d'un terme pour exploiter un index trigramme
+TRIGRAM_MIN_LENGTH = 3
+
+
+@functools.lru_cache(maxsize=AMOUNT_WORDS_CACHE_SIZE)
+def amount_to_words(amount, lang='fr'):
+    """
+    Convertir un montant (déjà arrondi) en lettres, avec cache LRU borné.
+
+    num2words est importé à la première conversion seulement.
+
+    Args:
+        amount (int|float): Montant arrondi (clé du cache)
+        lang (str): Langue num2words
+
+    Returns:
+        str: Montant en lettres
+    """
+    from num2words import num2words
+    return MLLE_PATTERN.sub('mille', num2words(amount, lang=lang))
+
 
 class SupplierAutoMixin(models.AbstractModel):
     """
@@ -266,5 +297,219 @@ class SequenceGeneratorMixin(models.AbstractModel):
         return vals
 
 
+class AmountInWordsMixin(models.AbstractModel):
+    """
+    Mixin pour convertir les montants en lettres avec mise en cache.
+
+    Les conversions sont partagées entre tous les modèles héritant du mixin
+    et mémorisées par montant arrondi et langue: l'affichage d'une liste ou
+    l'impression d'un lot de factures ne rappelle num2words que pour les
+    montants encore jamais convertis.
 
+    Usage:
+        class MonModel(models.Model):
+            _name = 'mon.model'
+            _inherit = ['amount.words.mixin']
+
+        def ma_methode(self):
+            text = self._amount_in_words(1250, lang='fr')
+    """
+    _name = 'amount.words.mixin'
+    _description = 'Mixin Montants en Lettres'
+
+    def _amount_in_words(self, amount, lang='fr', digits=0):
+        """
+        Montant en lettres via le convertisseur partagé.
+
+        Args:
+            amount (float): Montant à convertir
+            lang (str): Langue num2words
+            digits (int): Nombre de décimales conservées (0 = entier)
+
+        Returns:
+            str: Montant en lettres, ou False si la conversion échoue
+        """
+        rounded = int(round(amount)) if not digits else round(amount, digits)
+        try:
+            return amount_to_words(rounded, lang)
+        except Exception as e:
+            _logger.error("Erreur conversion montant %s en lettres: %s", amount, str(e))
+            return False
+
+    def _currency_amount_to_text(self, currency, amount):
+        """
+        Équivalent mis en cache de res.currency.amount_to_text.
+
+        La clé inclut la date de modification de la devise pour suivre
+        les changements de libellés.
+        """
+        return self._currency_amount_to_text_cached(
+            currency.id, str(currency.write_date), currency.round(amount), self.env.lang,
+        )
+
+    @tools.ormcache('currency_id', 'currency_version', 'amount', 'lang')
+    def _currency_amount_to_text_cached(self, currency_id, currency_version, amount, lang):
+        currency = self.env['res.currency'].browse(currency_id).with_context(lang=lang)
+        return currency.amount_to_text(amount)
+
+
+class RecordCountMixin(models.AbstractModel):
+    """
+    Mixin pour les compteurs de boutons intelligents (smart buttons).
+
+    Compte les enregistrements liés de tout le recordset avec un seul
+    read_group groupé sur le champ inverse, au lieu de charger chaque
+    One2many et d'en filtrer le contenu en Python.
+
+    Usage:
+        class MonModel(models.Model):
+            _name = 'mon.model'
+            _inherit = ['record.count.mixin']
+
+            ligne_count = fields.Integer(compute='_compute_ligne_count')
+
+            @api.depends('ligne_ids.state')
+            def _compute_ligne_count(self):
+                self._compute_record_count('ligne_count', 'mon.model.ligne', 'parent_id',
+                                           [('state', '=', 'done')])
+    """
+    _name = 'record.count.mixin'
+    _description = 'Mixin Compteurs Groupés'
+
+    def _read_group_counts(self, comodel_name, inverse_field, domain=None):
+        """
+        Compter les enregistrements liés par enregistrement du recordset.
+
+        Args:
+            comodel_name (str): Modèle des enregistrements comptés
+            inverse_field (str): Many2one du modèle compté vers ce modèle
+            domain (list): Filtre supplémentaire (ex: état)
+
+        Returns:
+            dict: {id: nombre}, les enregistrements sans lien sont absents
+        """
+        ids = [record_id for record_id in self._origin.ids if record_id]
+        if not ids:
+            return {}
+        groups = self.env[comodel_name]._read_group(
+            [(inverse_field, 'in', ids)] + (domain or []),
+            [inverse_field],
+            [inverse_field],
+        )
+        return {group[inverse_field][0]: group[f'{inverse_field}_count'] for group in groups}
+
+    def _compute_record_count(self, field_name, comodel_name, inverse_field, domain=None):
+        """Affecter à field_name le nombre d'enregistrements liés (un seul read_group)."""
+        counts = self._read_group_counts(comodel_name, inverse_field, domain)
+        for record in self:
+            record[field_name] = counts.get(record._origin.id, 0)
+
+
+class TrigramSearchMixin(models.AbstractModel):
+    """
+    Mixin pour la recherche textuelle indexée par trigrammes (pg_trgm).
+
+    Crée un index GIN gin_trgm_ops sur chaque colonne de _trigram_fields,
+    utilisé par PostgreSQL pour les recherches ilike '%terme%' (autocomplétion
+    des many2one). Si l'extension pg_trgm est absente et ne peut pas être
+    créée (droits insuffisants), aucun index n'est créé et la recherche
+    reste fonctionnelle, sans index.
+
+    _search_ranked() retourne les meilleurs résultats classés par
+    similarité (ou par préfixe puis longueur, sans pg_trgm).
+
+    Usage:
+        class MonModel(models.Model):
+            _name = 'mon.model'
+            _inherit = ['trigram.search.mixin']
+            _trigram_fields = ['name', 'code']
+    """
+    _name = 'trigram.search.mixin'
+    _description = 'Mixin Recherche Trigrammes'
+
+    # Colonnes Char indexées par trigrammes et parcourues par _search_ranked
+    _trigram_fields = []
+
+    def init(self):
+        super().init()
+        if self._abstract or not self._trigram_fields:
+            return
+        if not self._ensure_pg_trgm():
+            _logger.warning(
+                "Extension pg_trgm indisponible: recherche de %s sans index trigramme", self._name
+            )
+            return
+        for field_name in self._trigram_fields:
+            tools.create_index(
+                self._cr, f'{self._table}_{field_name}_trgm_idx', self._table,
+                [f'"{field_name}" gin_trgm_ops'], method='gin',
+            )
+
+    def _ensure_pg_trgm(self):
+        """Créer l'extension pg_trgm si besoin (savepoint: un refus n'interrompt pas la mise à jour)."""
+        if self._has_pg_trgm():
+            return True
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        except psycopg2.Error as e:
+            _logger.info("Création de l'extension pg_trgm refusée: %s", e)
+            return False
+        self.clear_caches()
+        return True
+
+    @tools.ormcache()
+    def _has_pg_trgm(self):
+        self.env.cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return bool(self.env.cr.fetchone())
+
+    @api.model
+    def _search_ranked(self, term, limit=10):
+        """
+        Meilleurs enregistrements lisibles contenant le terme, classés par pertinence.
+
+        La requête passe par _where_calc et _apply_ir_rules: droits d'accès,
+        règles d'enregistrement et filtre active s'appliquent. Un terme plus
+        court qu'un trigramme n'est pas classé (parcours arrêté à la limite).
+
+        Args:
+            term (str): Texte recherché
+            limit (int): Nombre maximal de résultats
+
+        Returns:
+            list: [(id, score)] par score décroissant, score entre 0 et 1
+        """
+        term = (term or '').strip()
+        if not term or not self._trigram_fields:
+            return []
+        self.check_access_rights('read')
+        self._flush_search([], fields=self._trigram_fields)
+        query = self._where_calc([])
+        self._apply_ir_rules(query, 'read')
 
+        columns = [f'"{self._table}"."{field_name}"' for field_name in self._trigram_fields]
+        contains = f'%{escape_psql(term)}%'
+        prefix = f'{escape_psql(term)}%'
+        query.add_where(
+            '(' + ' OR '.join(f'{column} ILIKE %s' for column in columns) + ')',
+            [contains] * len(columns),
+        )
+        if self._has_pg_trgm():
+            # Préfixe en tête, puis similarité trigramme du meilleur champ
+            scores = [f"CASE WHEN {column} ILIKE %s THEN 1.0 ELSE similarity({column}, %s) END"
+                      for column in columns]
+            score_params = [prefix, term] * len(columns)
+        else:
+            # Sans pg_trgm: préfixe en tête, puis part du terme dans le champ
+            scores = [f"CASE WHEN {column} ILIKE %s THEN 1.0 "
+                      f"ELSE %s::float / GREATEST(length({column}), 1) END" for column in columns]
+            score_params = [prefix, len(term)] * len(columns)
+        score = f"GREATEST({', '.join(scores)})"
+        if len(term) >= TRIGRAM_MIN_LENGTH:
+            query.order = f'score DESC, "{self._table}".id'
+        else:
+            query.order = f'"{self._table}".id'
+        query.limit = limit
+        query_str, where_params = query.select(f'"{self._table}".id', f'{score} AS score')
+        self.env.cr.execute(query_str, score_params + where_params)
+        return [(record_id, float(score or 0.0)) for record_id, score in self.env.cr.fetchall()]
@@ -3,7 +3,7 @@ from odoo.exceptions import UserError
 
 
 class ResPartner(models.Model):
-    _inherit = 'res.partner'
+    _inherit = ['res.partner', 'record.count.mixin']
 
     # Services liés à ce fournisseur (créés avec ce fournisseur)
     travel_service_ids = fields.One2many('travel.service', 'supplier_id', string='Services Créés')
@@ -63,8 +63,7 @@ class ResPartner(models.Model):
     @api.depends('travel_service_ids')
     def _compute_travel_service_count(self):
         """Calculer le nombre de services pour ce fournisseur"""
-        for partner in self:
-            partner.travel_service_count = len(partner.travel_service_ids)
+        self._compute_record_count('travel_service_count', 'travel.service', 'supplier_id')
     
     def action_load_services(self):
         """Charger les services liés à ce fournisseur dans le tableau de facturation"""
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentation des boutons (méthodes action_*) des modèles TravelPro.
+
+Au chargement du registre, les méthodes publiques action_* des modèles
+listés dans PERF_MODELS sont enveloppées. Une fraction configurable des
+appels (paramètre système travel_pro_version1.perf_sample_rate, de 0 à 1)
+est mesurée: durée, nombre de requêtes SQL et lignes écrites. Les mesures
+sont conservées dans travel.perf.sample, bornée comme un tampon circulaire.
+
+Désactivée (taux à 0, valeur par défaut), l'enveloppe ne coûte qu'une
+lecture du paramètre en cache.
+"""
+import logging
+import random
+import threading
+import time
+
+from odoo import api, fields, models, tools
+
+_logger = logging.getLogger(__name__)
+
+# Modèles dont les méthodes action_* sont instrumentées
+PERF_MODELS = [
+    'travel.reservation',
+    'travel.invoice.client',
+    'travel.purchase',
+    'travel.member',
+    'travel.member.duplicate',
+    'travel.company',
+    'travel.credit.recharge',
+    'travel.report.batch',
+    'cash.register',
+    'cash.register.operation',
+    'cash.register.session',
+    'invoice.reservations.wizard',
+]
+
+PERF_SAMPLE_RATE_PARAM = 'travel_pro_version1.perf_sample_rate'
+PERF_SAMPLE_LIMIT_PARAM = 'travel_pro_version1.perf_sample_limit'
+PERF_SAMPLE_DEFAULT_LIMIT = 50000
+# Le tampon est élagué toutes les PERF_TRIM_STEP mesures
+PERF_TRIM_STEP = 100
+
+# Profondeur d'appel par thread: seule l'action la plus externe est mesurée
+_local = threading.local()
+
+
+def _make_instrumented_action(name):
+    """Envelopper une méthode action_* pour l'échantillonner."""
+
+    def action(self, *args, **kwargs):
+        depth = getattr(_local, 'depth', 0)
+        if depth or not self.env['travel.perf.sample']._should_sample():
+            return action.origin(self, *args, **kwargs)
+
+        Sample = self.env['travel.perf.sample']
+        cr = self.env.cr
+        rows_before = Sample._rows_written()
+        queries_before = cr.sql_log_count
+        started = time.perf_counter()
+        _local.depth = depth + 1
+        try:
+            result = action.origin(self, *args, **kwargs)
+            self.env.flush_all()
+        finally:
+            _local.depth = depth
+        duration_ms = (time.perf_counter() - started) * 1000.0
+        query_count = cr.sql_log_count - queries_before
+        Sample._record(self._name, name, len(self), duration_ms, query_count,
+                       Sample._rows_written() - rows_before)
+        return result
+
+    action._travel_perf = True
+    return action
+
+
+class TravelPerfSample(models.Model):
+    """Mesure d'un appel de bouton (action_*)."""
+    _name = 'travel.perf.sample'
+    _description = 'Mesure de Performance'
+    _order = 'id desc'
+    _log_access = False
+
+    date = fields.Datetime('Date', readonly=True, index=True)
+    user_id = fields.Many2one('res.users', string='Utilisateur', readonly=True)
+    model_name = fields.Char('Modèle', readonly=True, index=True)
+    action = fields.Char('Action', readonly=True)
+    record_count = fields.Integer('Enregistrements', readonly=True)
+    duration_ms = fields.Float('Durée (ms)', readonly=True, digits=(16, 2), group_operator='avg')
+    query_count = fields.Integer('Requêtes SQL', readonly=True, group_operator='avg')
+    rows_written = fields.Integer('Lignes Écrites', readonly=True, group_operator='avg')
+
+    def _register_hook(self):
+        """Envelopper les méthodes action_* des modèles instrumentés."""
+        super()._register_hook()
+        for model_name in PERF_MODELS:
+            Model = self.env.get(model_name)
+            if Model is None:
+                continue
+            cls = type(Model)
+            for name in dir(cls):
+                if not name.startswith('action_'):
+                    continue
+                method = getattr(cls, name, None)
+                if not callable(method) or getattr(method, '_travel_perf', False):
+                    continue
+                action = _make_instrumented_action(name)
+                action.origin = method
+                setattr(cls, name, api.propagate(method, action))
+
+    @api.model
+    def _should_sample(self):
+        """Tirer au sort l'échantillonnage d'un appel selon le taux configuré."""
+        rate = self._get_sample_rate()
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    @api.model
+    def _get_sample_rate(self):
+        try:
+            return float(self.env['ir.config_parameter'].sudo().get_param(PERF_SAMPLE_RATE_PARAM, 0))
+        except ValueError:
+            return 0.0
+
+    @api.model
+    def _rows_written(self):
+        """Lignes insérées, modifiées ou supprimées par la transaction courante."""
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)
+              FROM pg_stat_xact_user_tables
+        """)
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _record(self, model_name, action, record_count, duration_ms, query_count, rows_written):
+        """Insérer une mesure (SQL direct, sans passer par l'ORM) et borner le tampon."""
+        self.env.cr.execute("""
+            INSERT INTO travel_perf_sample
+                   (date, user_id, model_name, action, record_count,
+                    duration_ms, query_count, rows_written)
+            VALUES (now() at time zone 'UTC', %s, %s, %s, %s, %s, %s, %s)
+            RETURNING id
+        """, (self.env.uid, model_name, action, record_count, duration_ms, query_count, rows_written))
+        sample_id = self.env.cr.fetchone()[0]
+        if sample_id % PERF_TRIM_STEP == 0:
+            self._trim(sample_id)
+
+    @api.model
+    def _trim(self, last_id):
+        """Ne conserver que les dernières mesures (tampon circulaire)."""
+        limit = int(self.env['ir.config_parameter'].sudo().get_param(
+            PERF_SAMPLE_LIMIT_PARAM, PERF_SAMPLE_DEFAULT_LIMIT
+        ))
+        self.env.cr.execute("DELETE FROM travel_perf_sample WHERE id <= %s", (last_id - limit,))
+
+
+class TravelPerfSummary(models.Model):
+    """Percentiles de durée et de requêtes par action (vue SQL)."""
+    _name = 'travel.perf.summary'
+    _description = 'Synthèse des Performances'
+    _auto = False
+    _order = 'p95_ms desc'
+
+    model_name = fields.Char('Modèle', readonly=True)
+    action = fields.Char('Action', readonly=True)
+    sample_count = fields.Integer('Appels Mesurés', readonly=True)
+    avg_ms = fields.Float('Moyenne (ms)', readonly=True, digits=(16, 2))
+    p50_ms = fields.Float('p50 (ms)', readonly=True, digits=(16, 2))
+    p95_ms = fields.Float('p95 (ms)', readonly=True, digits=(16, 2))
+    max_ms = fields.Float('Max (ms)', readonly=True, digits=(16, 2))
+    p50_queries = fields.Float('p50 Requêtes', readonly=True, digits=(16, 0))
+    p95_queries = fields.Float('p95 Requêtes', readonly=True, digits=(16, 0))
+    avg_rows_written = fields.Float('Lignes Écrites (moy.)', readonly=True, digits=(16, 1))
+    last_date = fields.Datetime('Dernier Appel', readonly=True)
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute(f"""
+            CREATE VIEW {self._table} AS (
+                SELECT MIN(id) AS id,
+                       model_name,
+                       action,
+                       COUNT(*) AS sample_count,
+                       AVG(duration_ms) AS avg_ms,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY duration_ms) AS p50_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms) AS p95_ms,
+                       MAX(duration_ms) AS max_ms,
+                       percentile_cont(0.5) WITHIN GROUP (ORDER BY query_count) AS p50_queries,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY query_count) AS p95_queries,
+                       AVG(rows_written) AS avg_rows_written,
+                       MAX(date) AS last_date
+                  FROM travel_perf_sample
+              GROUP BY model_name, action
+            )
+        """)
@@ -7,8 +7,6 @@ automatique de la TVA, retenues à la source et montants servis.
 """
 import logging
 
-from num2words import num2words
-
 from odoo import api, fields, models
 from odoo.exceptions import UserError, ValidationError
 
@@ -18,7 +16,7 @@ _logger = logging.getLogger(__name__)
 class TravelPurchase(models.Model):
     _name = 'travel.purchase'
     _description = 'Facture Fournisseur Travel'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'amount.words.mixin']
     _order = 'date_creation desc, id desc'
 
     name = fields.Char('Numéro Facture', readonly=True, default='Nouveau', copy=False)
@@ -120,15 +118,11 @@ class TravelPurchase(models.Model):
         """Convertir le montant total en lettres (Français)."""
         for record in self:
             if record.amount_total:
-                try:
-                    text = num2words(record.amount_total, lang='fr')
-                    record.amount_in_words = f"{text} Dinars".capitalize()
-                except Exception as e:
-                    _logger.error(
-                        "Erreur conversion montant en lettres pour achat %s: %s",
-                        record.name, str(e)
-                    )
+                text = record._amount_in_words(record.amount_total, lang='fr', digits=3)
+                if text is False:
                     record.amount_in_words = f"{record.amount_total:.3f} Dinars"
+                else:
+                    record.amount_in_words = f"{text} Dinars".capitalize()
             else:
                 record.amount_in_words = ''
     
@@ -224,6 +218,18 @@ class TravelPurchase(models.Model):
         self.ensure_one()
         self.state = 'draft'
     
+    def _get_pdf_cache_version(self):
+        """
+        Version de la facture fournisseur pour le cache PDF: la facture et ses services.
+
+        Les ids des services en font partie: retirer un service plus ancien
+        que le dernier modifié ne change pas la date maximale.
+        """
+        self.ensure_one()
+        dates = [self.write_date] + self.service_ids.mapped('write_date')
+        service_ids = ','.join(str(service_id) for service_id in sorted(self.service_ids.ids))
+        return f"{max(d for d in dates if d)}|{service_ids}"
+
     def action_print_purchase(self):
         """Imprimer la facture fournisseur"""
         self.ensure_one()
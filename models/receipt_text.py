@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Reçus de caisse en texte brut et ESC/POS pour imprimantes thermiques.
+
+Le gabarit est compilé une fois par largeur de ticket en une liste de
+chaînes de format (alignements et largeurs déjà calculés); le rendu d'un
+reçu n'est ensuite qu'une série de str.format, sans QWeb ni wkhtmltopdf.
+"""
+import functools
+
+# En-tête de l'agence (identique au reçu PDF)
+RECEIPT_HEADER = (
+    'Agence WE CAN TRAVEL',
+    'rue bachir aljaziri manzel gabes - Gabes',
+    'Tel: +216 25 100 035',
+    'sales@we-cantravel.com',
+)
+
+RECEIPT_TITLE = 'RECU DE CAISSE'
+RECEIPT_FOOTER = 'Merci de votre confiance.'
+
+# Largeurs usuelles: 42 caractères (rouleau 80 mm), 32 caractères (58 mm)
+RECEIPT_DEFAULT_WIDTH = 42
+RECEIPT_MIN_WIDTH = 24
+
+# Gabarit: (section, style, type de ligne, libellé ou texte, clé de valeur)
+# Une section n'est rendue que si sa clé est renseignée dans les valeurs.
+RECEIPT_TEMPLATE = (
+    [(None, 'normal', 'center', text, None) for text in RECEIPT_HEADER]
+    + [
+        (None, 'normal', 'rule', '=', None),
+        (None, 'bold', 'center', RECEIPT_TITLE, None),
+        (None, 'normal', 'center_value', None, 'name'),
+        (None, 'normal', 'rule', '-', None),
+        (None, 'normal', 'pair', 'Date', 'date'),
+        (None, 'normal', 'pair', 'Caisse', 'cash'),
+        (None, 'normal', 'pair', 'Caissier', 'cashier'),
+        (None, 'normal', 'pair', 'Type', 'type'),
+        (None, 'normal', 'pair', 'Paiement', 'payment_method'),
+        ('references', 'normal', 'rule', '-', None),
+        ('reservation', 'normal', 'pair', 'Reservation', 'reservation'),
+        ('invoice_number', 'normal', 'pair', 'No Facture', 'invoice_number'),
+        ('sale_order', 'normal', 'pair', 'Devis', 'sale_order'),
+        ('invoice', 'normal', 'pair', 'Facture', 'invoice'),
+        ('quote_number', 'normal', 'pair', 'No Devis', 'quote_number'),
+        ('note', 'normal', 'text', None, 'note'),
+        ('reservation', 'normal', 'rule', '-', None),
+        ('reservation', 'normal', 'pair', 'Client', 'member'),
+        ('reservation', 'normal', 'pair', 'Destination', 'destination'),
+        ('reservation', 'normal', 'pair', 'Total Reservation', 'reservation_total'),
+        ('reservation', 'normal', 'pair', 'Deja Paye', 'reservation_paid'),
+        ('reservation', 'normal', 'pair', 'Reste a Payer', 'reservation_remaining'),
+        (None, 'normal', 'rule', '=', None),
+        (None, 'bold', 'pair', 'MONTANT', 'amount'),
+        (None, 'normal', 'rule', '=', None),
+        (None, 'normal', 'blank', None, None),
+        (None, 'normal', 'center', 'Signature Caissier', None),
+        (None, 'normal', 'blank', None, None),
+        (None, 'normal', 'center', '____________________', None),
+        (None, 'normal', 'blank', None, None),
+        (None, 'normal', 'center', RECEIPT_FOOTER, None),
+    ]
+)
+
+# Commandes ESC/POS
+ESCPOS_INIT = b'\x1b@'
+ESCPOS_CODEPAGE = b'\x1bt\x13'  # Table 19: CP858 (Latin-1 + €)
+ESCPOS_BOLD_ON = b'\x1bE\x01'
+ESCPOS_BOLD_OFF = b'\x1bE\x00'
+ESCPOS_FEED_CUT = b'\x1dV\x41\x03'  # Avance de 3 lignes puis coupe partielle
+ESCPOS_ENCODING = 'cp858'
+
+
+def _wrap(text, width):
+    """Replier un texte libre sur la largeur du ticket."""
+    lines = []
+    for paragraph in text.splitlines() or ['']:
+        # Espaces finaux retirés avant repli: aucune ligne, dernière comprise, n'en garde
+        paragraph = paragraph.rstrip()
+        while len(paragraph) > width:
+            cut = paragraph.rfind(' ', 0, width + 1)
+            cut = cut if cut > 0 else width
+            lines.append(paragraph[:cut].rstrip())
+            paragraph = paragraph[cut:].lstrip()
+        lines.append(paragraph)
+    return lines
+
+
+@functools.lru_cache(maxsize=8)
+def compile_receipt_template(width):
+    """
+    Compiler le gabarit pour une largeur de ticket.
+
+    Les valeurs ne sont jamais tronquées: une valeur plus longue que la
+    place disponible est reportée au rendu sur les lignes suivantes.
+
+    Returns:
+        tuple: (section, style, chaîne de format ou None, clé de valeur, libellé)
+               une chaîne None désigne un texte libre replié sur la largeur;
+               le libellé (None hors lignes de valeur, '' pour une valeur
+               centrée) sert au report d'une valeur trop longue
+    """
+    width = max(width, RECEIPT_MIN_WIDTH)
+    compiled = []
+    for section, style, kind, text, key in RECEIPT_TEMPLATE:
+        label = None
+        if kind == 'center':
+            compiled.extend(
+                (section, style, line.center(width).rstrip().replace('{', '{{').replace('}', '}}'), key, None)
+                for line in _wrap(text, width)
+            )
+            continue
+        if kind == 'center_value':
+            fmt = '{%s:^%d}' % (key, width)
+            label = ''
+        elif kind == 'rule':
+            fmt = text * width
+        elif kind == 'blank':
+            fmt = ''
+        elif kind == 'pair':
+            label = f"{text}: "
+            fmt = label + '{%s:>%d}' % (key, width - len(label))
+        else:
+            fmt = None
+        compiled.append((section, style, fmt, key, label))
+    return tuple(compiled)
+
+
+def _overflow_lines(label, value, width):
+    """Valeur trop longue: libellé seul, puis valeur alignée (à droite, ou centrée sans libellé) et repliée."""
+    lines = [label.rstrip()] if label else []
+    for part in _wrap(value, width):
+        lines.append(part.rjust(width) if label else part.center(width).rstrip())
+    return lines
+
+
+def render_receipt_lines(values, width=RECEIPT_DEFAULT_WIDTH):
+    """
+    Rendre un reçu à partir de valeurs déjà formatées (chaînes).
+
+    Returns:
+        list: (style, ligne)
+    """
+    width = max(width, RECEIPT_MIN_WIDTH)
+    lines = []
+    for section, style, fmt, key, label in compile_receipt_template(width):
+        if section and not values.get(section):
+            continue
+        if fmt is None:
+            lines.extend((style, line) for line in _wrap(values.get(key) or '', width))
+            continue
+        line = fmt.format_map(values).rstrip()
+        if label is not None and len(line) > width:
+            lines.extend((style, part) for part in _overflow_lines(label, str(values.get(key) or ''), width))
+        else:
+            lines.append((style, line))
+    return lines
+
+
+def render_receipt_text(values, width=RECEIPT_DEFAULT_WIDTH):
+    """Reçu en texte brut, une ligne par ligne de ticket."""
+    return '\n'.join(line for _style, line in render_receipt_lines(values, width)) + '\n'
+
+
+def render_receipt_escpos(values, width=RECEIPT_DEFAULT_WIDTH):
+    """Reçu en flux ESC/POS: initialisation, table CP858, gras, coupe."""
+    chunks = [ESCPOS_INIT, ESCPOS_CODEPAGE]
+    for style, line in render_receipt_lines(values, width):
+        encoded = line.encode(ESCPOS_ENCODING, 'replace') + b'\n'
+        chunks.append(ESCPOS_BOLD_ON + encoded + ESCPOS_BOLD_OFF if style == 'bold' else encoded)
+    chunks.append(ESCPOS_FEED_CUT)
+    return b''.join(chunks)
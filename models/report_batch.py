@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Impression en lot des documents PDF (factures, reçus, devis).
+
+Un lot rend les PDF d'un domaine d'enregistrements par paquets et les
+archive en pièces jointes, nommées d'après l'enregistrement et sa date de
+modification. Un lot interrompu reprend là où il s'est arrêté: les
+documents dont la pièce jointe existe déjà pour la version courante de
+l'enregistrement ne sont pas rendus à nouveau.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import odoo
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger(__name__)
+
+# Modèles dont les rapports peuvent être imprimés en lot
+BATCH_REPORT_MODELS = [
+    'travel.invoice.client',
+    'travel.purchase',
+    'cash.register.operation',
+    'travel.reservation',
+]
+
+
+def batch_attachment_name(report, record):
+    """Nom de la pièce jointe d'un document: rapport, enregistrement et version."""
+    version = fields.Datetime.to_datetime(record.write_date).strftime('%Y%m%d%H%M%S')
+    return f"{report.report_name.split('.')[-1]}_{record.id}_{version}.pdf"
+
+
+def render_batch_attachments(env, report_id, res_ids):
+    """
+    Rendre et archiver les PDF d'une liste d'enregistrements.
+
+    Chaque document est rendu dans son propre savepoint: une erreur n'empêche
+    pas l'archivage des autres.
+
+    Returns:
+        tuple: (nombre de documents archivés, nombre d'échecs, dernière erreur)
+    """
+    report = env['ir.actions.report'].browse(report_id)
+    records = env[report.model].browse(res_ids).exists()
+    done, failed, last_error = 0, len(res_ids) - len(records), False
+    for record in records:
+        try:
+            with env.cr.savepoint():
+                pdf, _report_type = env['ir.actions.report']._render_qweb_pdf(report, [record.id])
+                env['ir.attachment'].create({
+                    'name': batch_attachment_name(report, record),
+                    'type': 'binary',
+                    'raw': pdf,
+                    'res_model': report.model,
+                    'res_id': record.id,
+                    'mimetype': 'application/pdf',
+                })
+            done += 1
+        except Exception as e:
+            failed += 1
+            last_error = f"{record.display_name}: {e}"
+            _logger.exception("Impression en lot: échec du rendu de %s", record.display_name)
+    return done, failed, last_error
+
+
+class TravelReportBatch(models.Model):
+    _name = 'travel.report.batch'
+    _description = 'Impression PDF en Lot'
+    _order = 'create_date desc, id desc'
+
+    name = fields.Char('Libellé', required=True)
+    report_id = fields.Many2one('ir.actions.report', string='Rapport', required=True, ondelete='cascade',
+                                domain=[('model', 'in', BATCH_REPORT_MODELS), ('report_type', '=', 'qweb-pdf')])
+    model = fields.Char(related='report_id.model', string='Modèle')
+    domain = fields.Char('Filtre', default='[]', required=True,
+                         help="Domaine des enregistrements à imprimer")
+    chunk_size = fields.Integer('Taille des Paquets', default=50, required=True)
+    workers = fields.Integer('Rendus Parallèles', default=4, required=True,
+                             help="Nombre de rendus wkhtmltopdf lancés en parallèle (une transaction chacun)")
+
+    state = fields.Selection([
+        ('draft', 'Brouillon'),
+        ('running', 'En cours'),
+        ('done', 'Terminé'),
+        ('failed', 'Terminé avec erreurs'),
+    ], string='État', default='draft', required=True, readonly=True)
+    total_count = fields.Integer('Documents', readonly=True)
+    done_count = fields.Integer('Rendus', readonly=True)
+    skipped_count = fields.Integer('Déjà Archivés', readonly=True)
+    failed_count = fields.Integer('Échecs', readonly=True)
+    last_error = fields.Text('Dernière Erreur', readonly=True)
+
+    date_start = fields.Datetime('Début', readonly=True)
+    date_end = fields.Datetime('Fin', readonly=True)
+    render_seconds = fields.Float('Durée de Rendu (s)', readonly=True, digits=(16, 2))
+    throughput = fields.Float('Documents / seconde', compute='_compute_throughput', store=True, digits=(16, 2))
+
+    @api.depends('done_count', 'render_seconds')
+    def _compute_throughput(self):
+        """Débit de rendu (documents rendus par seconde de traitement)."""
+        for batch in self:
+            batch.throughput = batch.done_count / batch.render_seconds if batch.render_seconds else 0.0
+
+    def _get_records(self):
+        """Enregistrements du domaine, dans un ordre stable (reprise par id)."""
+        self.ensure_one()
+        return self.env[self.model].search(safe_eval(self.domain or '[]'), order='id')
+
+    def action_start(self):
+        """Planifier le lot: le rendu est fait par le cron, hors des workers HTTP."""
+        for batch in self:
+            if not batch._get_records():
+                raise UserError("Aucun document ne correspond au filtre.")
+        self.write({'state': 'running', 'last_error': False})
+        self.env.ref('travel_pro_version1.cron_process_report_batches')._trigger()
+
+    def action_reset(self):
+        """Remettre le lot en brouillon pour le relancer."""
+        self.write({
+            'state': 'draft',
+            'done_count': 0,
+            'skipped_count': 0,
+            'failed_count': 0,
+            'render_seconds': 0.0,
+            'date_start': False,
+            'date_end': False,
+            'last_error': False,
+        })
+
+    def action_view_attachments(self):
+        """Afficher les PDF archivés par ce lot."""
+        self.ensure_one()
+        records = self._get_records()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': 'PDF Archivés',
+            'res_model': 'ir.attachment',
+            'view_mode': 'tree,form',
+            'domain': [
+                ('res_model', '=', self.model),
+                ('res_id', 'in', records.ids),
+                ('mimetype', '=', 'application/pdf'),
+            ],
+        }
+
+    @api.model
+    def cron_process_report_batches(self):
+        """Cron: traiter les lots en cours (reprend les lots interrompus)."""
+        for batch in self.search([('state', '=', 'running')], order='id'):
+            batch._process()
+
+    def _pending_ids(self, records):
+        """IDs des enregistrements sans pièce jointe pour leur version courante."""
+        names = {record.id: batch_attachment_name(self.report_id, record) for record in records}
+        archived = self.env['ir.attachment'].search_read([
+            ('res_model', '=', self.model),
+            ('res_id', 'in', records.ids),
+            ('name', 'in', list(names.values())),
+        ], ['res_id', 'name'])
+        archived_keys = {(att['res_id'], att['name']) for att in archived}
+        return [rid for rid, name in names.items() if (rid, name) not in archived_keys]
+
+    def _render_parallel(self, res_ids):
+        """
+        Rendre un paquet: découpé entre plusieurs threads, chacun avec sa
+        propre transaction. wkhtmltopdf tourne dans des processus séparés,
+        les rendus progressent donc réellement en parallèle.
+        """
+        workers = max(1, self.workers)
+        if workers == 1 or len(res_ids) == 1 or getattr(threading.current_thread(), 'testing', False):
+            return render_batch_attachments(self.env, self.report_id.id, res_ids)
+
+        dbname, uid, context = self.env.cr.dbname, self.env.uid, dict(self.env.context)
+        report_id = self.report_id.id
+
+        def run(slice_ids):
+            with odoo.registry(dbname).cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                return render_batch_attachments(env, report_id, slice_ids)
+
+        slices = [res_ids[i::workers] for i in range(workers) if res_ids[i::workers]]
+        with ThreadPoolExecutor(max_workers=len(slices)) as executor:
+            results = list(executor.map(run, slices))
+        errors = [error for _done, _failed, error in results if error]
+        return sum(r[0] for r in results), sum(r[1] for r in results), errors[-1] if errors else False
+
+    def _process(self):
+        """
+        Rendre le lot paquet par paquet, en validant l'avancement après
+        chaque paquet (hors tests) pour permettre la reprise.
+
+        Les compteurs portent sur l'exécution en cours: skipped_count compte
+        les documents déjà archivés avant elle, done_count et failed_count
+        ceux rendus (ou en échec) par elle. Une reprise ne compte donc pas
+        deux fois un document rendu avant l'interruption.
+        """
+        self.ensure_one()
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        records = self._get_records()
+        self.write({
+            'total_count': len(records),
+            'done_count': 0,
+            'skipped_count': 0,
+            'failed_count': 0,
+            'render_seconds': 0.0,
+            'date_start': self.date_start or fields.Datetime.now(),
+        })
+
+        chunk_size = max(1, self.chunk_size)
+        for start in range(0, len(records), chunk_size):
+            chunk = records[start:start + chunk_size]
+            pending_ids = self._pending_ids(chunk)
+            vals = {'skipped_count': self.skipped_count + len(chunk) - len(pending_ids)}
+            if pending_ids:
+                started = time.perf_counter()
+                done, failed, last_error = self._render_parallel(pending_ids)
+                vals.update({
+                    'done_count': self.done_count + done,
+                    'failed_count': self.failed_count + failed,
+                    'render_seconds': self.render_seconds + time.perf_counter() - started,
+                })
+                if last_error:
+                    vals['last_error'] = last_error
+            self.write(vals)
+            if auto_commit:
+                self.env.cr.commit()
+            _logger.info(
+                "Impression en lot %s: %d/%d documents (%.2f doc/s)",
+                self.name, min(start + chunk_size, len(records)), len(records), self.throughput,
+            )
+
+        self.write({
+            'state': 'failed' if self.failed_count else 'done',
+            'date_end': fields.Datetime.now(),
+        })
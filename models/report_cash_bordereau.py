@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from odoo import api, models
+
+
+class ReportCashBordereau(models.AbstractModel):
+    """
+    Fournisseur de données du bordereau de caisse.
+
+    Les totaux par mode de paiement et les lignes ordonnées sont obtenus en
+    une seule requête groupée; le template ne reçoit que des lignes simples.
+    """
+    _name = 'report.travel_pro_version1.report_cash_bordereau'
+    _description = 'Rapport Bordereau de Caisse'
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        cashes = self.env['cash.register'].browse(docids)
+        method_labels = dict(
+            self.env['cash.register.operation']._fields['payment_method']._description_selection(self.env)
+        )
+
+        bordereaux = {}
+        for cash in cashes:
+            methods = []
+            for row in cash._get_bordereau_rows():
+                if not methods or methods[-1]['method'] != row['payment_method']:
+                    methods.append({
+                        'method': row['payment_method'],
+                        'label': method_labels.get(row['payment_method'], row['payment_method']),
+                        'total': row['method_total'],
+                        'rows': [],
+                    })
+                methods[-1]['rows'].append(row)
+            bordereaux[cash.id] = methods
+
+        return {
+            'doc_ids': docids,
+            'doc_model': 'cash.register',
+            'docs': cashes,
+            'bordereaux': bordereaux,
+        }
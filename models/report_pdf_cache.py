@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Cache des PDF des documents validés.
+
+Une réimpression d'une facture, d'une facture fournisseur ou d'un reçu
+confirmé ne relance ni QWeb ni wkhtmltopdf: le PDF est relu depuis une
+pièce jointe dont le nom dérive du rapport, de l'enregistrement, de sa
+version (write_date) et d'une empreinte des templates de rapport.
+"""
+import hashlib
+import logging
+
+from odoo import api, models
+
+_logger = logging.getLogger(__name__)
+
+# Marqueur des pièces jointes de cache (champ description)
+PDF_CACHE_TAG = 'travel_pdf_cache'
+
+# Documents mis en cache: modèle -> états considérés comme figés
+PDF_CACHE_STATES = {
+    'travel.invoice.client': ('confirmed', 'paid'),
+    'travel.purchase': ('confirmed', 'paid'),
+    'cash.register.operation': ('confirmed',),
+}
+
+# Clés de data sans effet sur le rendu: le client web transmet toujours
+# le contexte (/report/download), la langue est prise dans la clé du cache
+PDF_CACHE_IGNORED_DATA_KEYS = {'context'}
+
+# Taille maximale du cache (Mo), paramètre système
+PDF_CACHE_MAX_MB_PARAM = 'travel_pro_version1.pdf_cache_max_mb'
+PDF_CACHE_DEFAULT_MAX_MB = 200
+
+
+class IrActionsReport(models.Model):
+    _inherit = 'ir.actions.report'
+
+    def _render_qweb_pdf(self, report_ref, res_ids=None, data=None):
+        report = self._get_report(report_ref)
+        record = self._get_pdf_cache_record(report, res_ids, data)
+        if not record:
+            return super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+
+        name = self._get_pdf_cache_name(report, record)
+        cached = self._pdf_cache_lookup(record, name)
+        if cached:
+            return cached, 'pdf'
+
+        content, report_type = super()._render_qweb_pdf(report_ref, res_ids=res_ids, data=data)
+        if report_type == 'pdf':
+            self._pdf_cache_store(report, record, name, content)
+        return content, report_type
+
+    @api.model
+    def _get_pdf_cache_record(self, report, res_ids, data):
+        """Document unique et figé pouvant être servi depuis le cache, sinon None."""
+        states = PDF_CACHE_STATES.get(report.model)
+        if data and set(data) - PDF_CACHE_IGNORED_DATA_KEYS:
+            return None
+        if not states or not res_ids or len(res_ids) != 1:
+            return None
+        record = self.env[report.model].browse(res_ids[0]).exists()
+        return record if record and record.state in states else None
+
+    @api.model
+    def _get_pdf_cache_template_hash(self, report):
+        """Empreinte des templates QWeb du module et des mises en page utilisées par les rapports."""
+        self.env.cr.execute("""
+            SELECT md5(string_agg(id || ':' || write_date::text || ':' || active::text, '|' ORDER BY id))
+              FROM ir_ui_view
+             WHERE type = 'qweb'
+               AND (key LIKE %s OR key LIKE 'web.external_layout%%' OR key = 'web.html_container')
+        """, (report.report_name.split('.')[0] + '.%',))
+        return self.env.cr.fetchone()[0] or ''
+
+    @api.model
+    def _get_pdf_cache_name(self, report, record):
+        """Nom de la pièce jointe de cache: rapport + empreinte (xmlid, id, version, langue, templates)."""
+        version = record._get_pdf_cache_version() if hasattr(record, '_get_pdf_cache_version') \
+            else str(record.write_date)
+        xmlid = report.get_external_id().get(report.id) or report.report_name
+        key = '|'.join([
+            xmlid, str(record.id), version, self.env.lang or '', self._get_pdf_cache_template_hash(report),
+        ])
+        return f"pdf_cache_{report.id}_{hashlib.sha256(key.encode()).hexdigest()}.pdf"
+
+    @api.model
+    def _pdf_cache_lookup(self, record, name):
+        """Contenu PDF en cache pour ce nom, ou None."""
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', record._name),
+            ('res_id', '=', record.id),
+            ('description', '=', PDF_CACHE_TAG),
+            ('name', '=', name),
+        ], limit=1)
+        return attachment.raw if attachment else None
+
+    @api.model
+    def _pdf_cache_store(self, report, record, name, content):
+        """Enregistrer le PDF, supprimer les versions précédentes du même rapport, puis borner le cache."""
+        Attachment = self.env['ir.attachment'].sudo()
+        Attachment.search([
+            ('res_model', '=', record._name),
+            ('res_id', '=', record.id),
+            ('description', '=', PDF_CACHE_TAG),
+            ('name', '=like', f"pdf_cache_{report.id}_%"),
+        ]).unlink()
+        Attachment.create({
+            'name': name,
+            'description': PDF_CACHE_TAG,
+            'type': 'binary',
+            'raw': content,
+            'res_model': record._name,
+            'res_id': record.id,
+            'mimetype': 'application/pdf',
+        })
+        self._pdf_cache_evict()
+
+    @api.model
+    def _pdf_cache_evict(self):
+        """Supprimer les entrées les plus anciennes au-delà de la taille maximale du cache."""
+        max_mb = int(self.env['ir.config_parameter'].sudo().get_param(
+            PDF_CACHE_MAX_MB_PARAM, PDF_CACHE_DEFAULT_MAX_MB
+        ))
+        self.env['ir.attachment'].flush_model(['res_model', 'description', 'file_size'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM (SELECT id, SUM(file_size) OVER (ORDER BY id DESC) AS cumulated_size
+                      FROM ir_attachment
+                     WHERE res_model IN %s
+                       AND description = %s) cache
+             WHERE cumulated_size > %s
+        """, (tuple(PDF_CACHE_STATES), PDF_CACHE_TAG, max_mb * 1024 * 1024))
+        evicted_ids = [row[0] for row in self.env.cr.fetchall()]
+        if evicted_ids:
+            self.env['ir.attachment'].sudo().browse(evicted_ids).unlink()
+            _logger.info("Cache PDF: %d entrée(s) évincée(s)", len(evicted_ids))
@@ -1,11 +1,12 @@
 from odoo import api, fields, models
 from odoo.exceptions import UserError
+from odoo.tools import float_compare
 
 
 class TravelReservation(models.Model):
     _name = 'travel.reservation'
     _description = 'Réservation Voyage'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'record.count.mixin']
 
     name = fields.Char('Référence', default='Nouveau', readonly=True)
     member_id = fields.Many2one('travel.member', string='Client', required=True)
@@ -50,6 +51,10 @@ class TravelReservation(models.Model):
     sale_order_id = fields.Many2one('sale.order', string='Devis', readonly=True)
     invoice_ids = fields.One2many('account.move', 'reservation_id', string='Factures')
     invoice_count = fields.Integer(string='Nombre de Factures', compute='_compute_invoice_count')
+    client_invoice_line_ids = fields.One2many('travel.invoice.client.line', 'reservation_id',
+                                              string='Lignes Facture Client')
+    is_invoiced = fields.Boolean('Facturée', compute='_compute_is_invoiced', store=True, index=True,
+                                 help="Présente sur une facture client non annulée")
     cash_operation_ids = fields.One2many('cash.register.operation', 'reservation_id', string='Opérations Caisse')
     cash_operation_count = fields.Integer(string='Opérations Caisse', compute='_compute_cash_operation_count')
     pos_order_ids = fields.One2many('pos.order', 'reservation_id', string='Commandes POS')
@@ -93,60 +98,126 @@ class TravelReservation(models.Model):
             self.purchase_amount = 0.0
         return True
 
+    # ===== AGRÉGATS FINANCIERS (calcul par lot) =====
+    def _get_stored_ids(self):
+        """Retourner les IDs des réservations déjà enregistrées en base.
+
+        Les enregistrements en cours d'édition (onchange) ont des NewId et
+        ne peuvent pas être agrégés en SQL.
+        """
+        return tuple(rid for rid in self._ids if isinstance(rid, int))
+
+    def _read_services_price(self, ids):
+        """Somme des prix des services additionnels par réservation (1 requête)."""
+        if not ids:
+            return {}
+        field = self._fields['service_ids']
+        self.env['travel.service'].flush_model(['price'])
+        self.flush_model(['service_ids'])
+        self.env.cr.execute(f"""
+            SELECT rel.{field.column1}, COALESCE(SUM(s.price), 0)
+              FROM {field.relation} rel
+              JOIN travel_service s ON s.id = rel.{field.column2}
+             WHERE rel.{field.column1} IN %s
+          GROUP BY rel.{field.column1}
+        """, (ids,))
+        return dict(self.env.cr.fetchall())
+
+    def _read_credit_usage(self, ids):
+        """Crédit déjà consommé (montant positif) par réservation (1 requête)."""
+        if not ids:
+            return {}
+        self.env['travel.credit.history'].flush_model(['reservation_id', 'type', 'amount'])
+        self.env.cr.execute("""
+            SELECT reservation_id, -COALESCE(SUM(amount), 0)
+              FROM travel_credit_history
+             WHERE reservation_id IN %s AND type = 'usage'
+          GROUP BY reservation_id
+        """, (ids,))
+        return dict(self.env.cr.fetchall())
+
+    def _read_cash_receipts(self, ids):
+        """Recettes de caisse confirmées par réservation (1 requête)."""
+        if not ids:
+            return {}
+        self.env['cash.register.operation'].flush_model(['reservation_id', 'type', 'state', 'amount'])
+        self.env.cr.execute("""
+            SELECT reservation_id, COALESCE(SUM(amount), 0)
+              FROM cash_register_operation
+             WHERE reservation_id IN %s AND state = 'confirmed' AND type = 'receipt'
+          GROUP BY reservation_id
+        """, (ids,))
+        return dict(self.env.cr.fetchall())
+
     @api.depends('nights', 'price', 'service_ids.price')
     def _compute_total(self):
+        # Calculer le total : prix du voyage + services additionnels
+        services_price = self._read_services_price(self._get_stored_ids())
         for rec in self:
-            # Calculer le total : prix du voyage + services additionnels
-            base_price = rec.price or 0.0
-            
-            # Ajouter les services additionnels (ceux qui ne sont pas dans destination.service_ids)
-            services_price = sum(s.price for s in rec.service_ids if s.price)
-            rec.total_price = base_price + services_price
+            if isinstance(rec.id, int):
+                extra = services_price.get(rec.id, 0.0)
+            else:
+                extra = sum(s.price for s in rec.service_ids if s.price)
+            rec.total_price = (rec.price or 0.0) + extra
 
     @api.depends('use_credit', 'member_id.credit_balance', 'total_price', 'credit_history_ids.amount')
     def _compute_credit_used(self):
+        # Les montants d'usage sont négatifs dans l'historique
+        credit_usage = self._read_credit_usage(self._get_stored_ids())
         for rec in self:
-            if rec.use_credit:
-                # Calculer combien de crédit a déjà été consommé par CETTE réservation
-                # (Les montants d'usage sont négatifs dans l'historique)
+            if not rec.use_credit:
+                rec.credit_used = 0
+                continue
+
+            # Crédit déjà consommé par CETTE réservation
+            if isinstance(rec.id, int):
+                already_used = credit_usage.get(rec.id, 0.0)
+            else:
                 already_used = -sum(rec.credit_history_ids.filtered(lambda h: h.type == 'usage').mapped('amount'))
-                
-                # Le crédit disponible "réel" pour cette réservation est le solde actuel du membre 
-                # PLUS ce que cette réservation a déjà bloqué/consommé.
-                available_credit = rec.member_id.credit_balance + already_used
-                
-                if available_credit > 0:
-                    # On peut utiliser au maximum le disponible total ou le prix total
-                    rec.credit_used = min(available_credit, rec.total_price)
-                else:
-                    # Si aucun crédit disponible, on garde au moins ce qui a déjà été utilisé
-                    rec.credit_used = already_used if already_used > 0 else 0.0
+
+            # Le crédit disponible "réel" pour cette réservation est le solde actuel du membre
+            # PLUS ce que cette réservation a déjà bloqué/consommé.
+            available_credit = rec.member_id.credit_balance + already_used
+
+            if available_credit > 0:
+                # On peut utiliser au maximum le disponible total ou le prix total
+                rec.credit_used = min(available_credit, rec.total_price)
             else:
-                rec.credit_used = 0
+                # Si aucun crédit disponible, on garde au moins ce qui a déjà été utilisé
+                rec.credit_used = already_used if already_used > 0 else 0.0
 
     @api.depends('total_price', 'credit_used', 'cash_operation_ids.amount', 'cash_operation_ids.state', 'cash_operation_ids.type')
     def _compute_remaining(self):
+        cash_receipts = self._read_cash_receipts(self._get_stored_ids())
         for rec in self:
-            cash_paid = sum(op.amount for op in rec.cash_operation_ids if op.state == 'confirmed' and op.type == 'receipt')
+            if isinstance(rec.id, int):
+                cash_paid = cash_receipts.get(rec.id, 0.0)
+            else:
+                cash_paid = sum(op.amount for op in rec.cash_operation_ids if op.state == 'confirmed' and op.type == 'receipt')
             rec.remaining_to_pay = rec.total_price - rec.credit_used - cash_paid
 
     @api.depends('invoice_ids')
     def _compute_invoice_count(self):
         """Calculer le nombre de factures."""
+        self._compute_record_count('invoice_count', 'account.move', 'reservation_id')
+
+    @api.depends('client_invoice_line_ids.invoice_state')
+    def _compute_is_invoiced(self):
+        """Une réservation est facturée si une facture client non annulée la contient."""
         for rec in self:
-            rec.invoice_count = len(rec.invoice_ids)
+            rec.is_invoiced = any(line.invoice_state != 'cancel' for line in rec.client_invoice_line_ids)
 
-    @api.depends('cash_operation_ids')
+    @api.depends('cash_operation_ids.state')
     def _compute_cash_operation_count(self):
-        """Calculer le nombre d'opérations de caisse."""
-        for rec in self:
-            rec.cash_operation_count = len(rec.cash_operation_ids.filtered(lambda o: o.state == 'confirmed'))
+        """Calculer le nombre d'opérations de caisse confirmées."""
+        self._compute_record_count('cash_operation_count', 'cash.register.operation', 'reservation_id',
+                                   [('state', '=', 'confirmed')])
 
-    @api.depends('pos_order_ids')
+    @api.depends('pos_order_ids.state')
     def _compute_pos_order_count(self):
-        """Calculer le nombre de commandes POS."""
-        for rec in self:
-            rec.pos_order_count = len(rec.pos_order_ids.filtered(lambda o: o.state in ['paid', 'done', 'invoiced']))
+        """Calculer le nombre de commandes POS payées."""
+        self._compute_record_count('pos_order_count', 'pos.order', 'reservation_id',
+                                   [('state', 'in', ['paid', 'done', 'invoiced'])])
 
     @api.depends('credit_history_ids.amount', 'credit_history_ids.type')
     def _compute_credit_refund_amount(self):
@@ -291,6 +362,9 @@ class TravelReservation(models.Model):
         
         if not self.member_id.company_id:
             raise UserError("Le membre doit avoir une société associée pour créer une facture.")
+
+        if self.is_invoiced:
+            raise UserError(f"La réservation {self.name} est déjà facturée.")
         
         # Créer la facture client Travel
         invoice_vals = {
@@ -330,6 +404,20 @@ class TravelReservation(models.Model):
             'target': 'current',
         }
 
+    def _check_invoiceable(self):
+        """Vérifier que les réservations sont confirmées, avec un prix et non encore facturées."""
+        invalid_reservations = self.filtered(
+            lambda r: r.status not in ['confirmed', 'done'] or r.total_price <= 0
+        )
+        invoiced_reservations = self.filtered('is_invoiced')
+        if invalid_reservations or invoiced_reservations:
+            message = "Certaines réservations ne peuvent pas être facturées:"
+            if invalid_reservations:
+                message += f"\n- Réservations non confirmées ou sans prix: {', '.join(invalid_reservations.mapped('name'))}"
+            if invoiced_reservations:
+                message += f"\n- Réservations déjà facturées: {', '.join(invoiced_reservations.mapped('name'))}"
+            raise UserError(message)
+
     def action_view_invoices(self):
         """Voir toutes les factures de la réservation."""
         self.ensure_one()
@@ -412,45 +500,70 @@ class TravelReservation(models.Model):
         self.status = 'cancel'
 
     def action_confirm(self):
-        """Confirmer la réservation et déduire le crédit si utilisé."""
-        for rec in self:
-            # Vérifier si le crédit a déjà été débité pour cette réservation
-            existing_credit = self.env['travel.credit.history'].search([
-                ('reservation_id', '=', rec.id),
-                ('type', '=', 'usage')
-            ], limit=1)
-            
-            # Si le crédit est utilisé et n'a pas encore été débité
-            if rec.use_credit and rec.credit_used > 0 and not existing_credit:
-                # Vérifier que le client a suffisamment de crédit
-                if rec.member_id.credit_balance < rec.credit_used:
-                    raise UserError(
-                        f"Le client {rec.member_id.name} n'a pas suffisamment de crédit.\n"
-                        f"Crédit disponible: {rec.member_id.credit_balance:.2f} TND\n"
-                        f"Crédit requis: {rec.credit_used:.2f} TND"
-                    )
-                
-                # Créer l'enregistrement d'utilisation du crédit (montant négatif pour déduire)
-                credit_history = self.env['travel.credit.history'].create({
-                    'member_id': rec.member_id.id,
-                    'amount': -rec.credit_used,  # Montant négatif pour déduire
-                    'type': 'usage',
-                    'reservation_id': rec.id,
-                    'note': f'Utilisation crédit pour réservation {rec.name}',
-                })
-                
-                # Forcer le flush pour s'assurer que l'historique est sauvegardé
-                credit_history.flush_recordset()
-                rec.member_id.flush_recordset(['credit_history_ids'])
-                
-                # Invalider et forcer le recalcul du solde crédit
-                rec.member_id.invalidate_recordset(['credit_balance', 'credit_history_ids'])
-                
-                # Recharger le membre pour forcer le recalcul du champ stocké
-                rec.member_id._compute_credit_balance()
-                rec.member_id.flush_recordset(['credit_balance'])
-            
-            rec.write({'status': 'confirmed'})
+        """Confirmer les réservations et déduire le crédit si utilisé.
+
+        Traitement groupé: le crédit est vérifié par membre sur l'ensemble des
+        réservations sélectionnées, toutes les lignes d'utilisation sont créées
+        en un seul appel et chaque solde membre n'est recalculé qu'une fois.
+        Le résultat est identique à une confirmation une par une: le crédit
+        d'un membre est alloué aux réservations dans l'ordre de la sélection,
+        et une réservation dont le crédit requis dépasse le solde disponible
+        lève la même erreur (aucune réservation n'est alors confirmée).
+        """
+        # Section critique par membre: les membres sont verrouillés avant toute
+        # lecture du crédit, deux agents ne peuvent donc pas consommer le même
+        # crédit (l'un des deux est rejoué après une erreur de sérialisation).
+        credit_history = self.env['travel.credit.history']
+        member_ids = set(self.filtered('use_credit').mapped('member_id').ids)
+        credit_history._lock_members(member_ids)
+
+        # Réservations dont le crédit a déjà été débité (une seule requête)
+        already_debited = set(credit_history.search([
+            ('reservation_id', 'in', self.ids),
+            ('type', '=', 'usage'),
+        ]).mapped('reservation_id').ids)
+
+        to_debit = self.filtered(
+            lambda r: r.use_credit and r.credit_used > 0 and r.id not in already_debited
+        )
+
+        # Solde disponible par membre, relu sous verrou depuis le registre
+        # et consommé au fil des réservations
+        available = credit_history._get_last_balances(member_ids)
+        debited_members = set()
+        usage_vals = []
+        for rec in to_debit:
+            member = rec.member_id
+            balance = available.get(member.id, 0.0)
+            if member.id in debited_members:
+                # Une par une, le crédit utilisé serait recalculé sur le solde
+                # restant après les réservations précédentes (_compute_credit_used)
+                required = min(balance, rec.total_price) if balance > 0 else 0.0
+                if not required:
+                    continue
+            else:
+                required = rec.credit_used
+            if float_compare(balance, required, precision_digits=2) < 0:
+                raise UserError(
+                    f"Le client {member.name} n'a pas suffisamment de crédit.\n"
+                    f"Crédit disponible: {balance:.2f} TND\n"
+                    f"Crédit requis: {required:.2f} TND"
+                )
+            debited_members.add(member.id)
+            available[member.id] = balance - required
+            usage_vals.append({
+                'member_id': member.id,
+                'amount': -required,  # Montant négatif pour déduire
+                'type': 'usage',
+                'reservation_id': rec.id,
+                'note': f'Utilisation crédit pour réservation {rec.name}',
+            })
+
+        if usage_vals:
+            # La création recalcule le solde de chaque membre concerné une seule fois
+            credit_history.create(usage_vals)
+
+        self.write({'status': 'confirmed'})
 
     def action_done(self):
         self.write({'status': 'done'})
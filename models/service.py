@@ -4,7 +4,8 @@ from odoo import api, fields, models
 class Service(models.Model):
     _name = 'travel.service'
     _description = 'Service pour voyage'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'trigram.search.mixin']
+    _trigram_fields = ['name']
 
     name = fields.Char(string='Nom du service', required=True)
     type = fields.Selection([
@@ -4,7 +4,8 @@ from odoo import api, fields, models
 class TravelDestination(models.Model):
     _name = 'travel.destination'
     _description = 'Travel Destination'
-    _inherit = ['mail.thread', 'mail.activity.mixin']
+    _inherit = ['mail.thread', 'mail.activity.mixin', 'record.count.mixin', 'trigram.search.mixin']
+    _trigram_fields = ['name']
 
     name = fields.Char('Nom', required=True, tracking=True)
     description = fields.Text('Description')
@@ -17,8 +18,7 @@ class TravelDestination(models.Model):
 
     @api.depends('reservation_ids')
     def _compute_reservation_count(self):
-        for rec in self:
-            rec.reservation_count = len(rec.reservation_ids)
+        self._compute_record_count('reservation_count', 'travel.reservation', 'destination_id')
 
     def action_create_reservation(self):
         return {
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+Recherche globale classée: membres, sociétés, services et voyages.
+
+Chaque modèle est interrogé par trigram.search.mixin._search_ranked (une
+requête indexée par modèle), puis les résultats sont fusionnés par score.
+"""
+from odoo import api, models
+
+# Modèles parcourus par la recherche globale
+RANKED_SEARCH_MODELS = [
+    'travel.member',
+    'travel.company',
+    'travel.service',
+    'travel.destination',
+]
+
+
+class TravelSearch(models.AbstractModel):
+    """Recherche globale classée par pertinence."""
+    _name = 'travel.search'
+    _description = 'Recherche Globale TravelPro'
+
+    @api.model
+    def search_ranked(self, term, limit=10, model_names=None):
+        """
+        Meilleurs résultats tous modèles confondus.
+
+        Les modèles non lisibles par l'utilisateur sont ignorés.
+
+        Args:
+            term (str): Texte recherché
+            limit (int): Nombre maximal de résultats
+            model_names (list): Restreindre à ces modèles (défaut: RANKED_SEARCH_MODELS)
+
+        Returns:
+            list: [{'model', 'id', 'name', 'score'}] par score décroissant
+        """
+        ranked = []
+        for model_name in model_names or RANKED_SEARCH_MODELS:
+            Model = self.env[model_name]
+            if not Model.check_access_rights('read', raise_exception=False):
+                continue
+            ranked.extend((score, model_name, record_id) for record_id, score in Model._search_ranked(term, limit))
+        ranked.sort(key=lambda item: -item[0])
+        ranked = ranked[:limit]
+
+        names = {}
+        for model_name in {model_name for _score, model_name, _id in ranked}:
+            ids = [record_id for _score, name, record_id in ranked if name == model_name]
+            names.update({(model_name, record_id): display_name
+                          for record_id, display_name in self.env[model_name].browse(ids).name_get()})
+        return [{
+            'model': model_name,
+            'id': record_id,
+            'name': names.get((model_name, record_id), ''),
+            'score': score,
+        } for score, model_name, record_id in ranked]
@@ -4,27 +4,38 @@ Tests unitaires pour le module TravelPro.
 
 Structure des tests:
 - test_member.py: Tests du modèle travel.member
+- test_member_import.py: Tests de l'import en masse de membres
+- test_member_duplicate.py: Tests de la détection et de la fusion des doublons
 - test_company.py: Tests du modèle travel.company
 - test_reservation.py: Tests du modèle travel.reservation
 - test_invoice_client.py: Tests du modèle travel.invoice.client
 - test_cash_register.py: Tests du modèle cash.register
 - test_credit.py: Tests du système de crédit
+- test_report_batch.py: Tests de l'impression PDF en lot
+- test_report_pdf_cache.py: Tests du cache des PDF validés
+- test_perf_sample.py: Tests de l'instrumentation des boutons
+- test_query_count.py: Non-régression du nombre de requêtes SQL (N+1)
+- test_credit_concurrency.py: Test de charge du crédit concurrent (tag travel_stress)
+- test_amount_words_benchmark.py: Benchmark des montants en lettres (tag travel_benchmark)
+- test_receipt_benchmark.py: Benchmark des reçus PDF/texte (tag travel_benchmark)
+- test_scale_benchmark.py: Benchmarks à l'échelle avec référence de requêtes (tag travel_scale)
+- test_index_plans.py: Plans d'exécution et index des requêtes critiques (tag travel_scale)
+- scale_data.py: Générateur de données synthétiques à l'échelle
 """
 from . import test_member
+from . import test_member_import
+from . import test_member_duplicate
 from . import test_company
 from . import test_reservation
 from . import test_invoice_client
 from . import test_cash_register
 from . import test_credit
-
-
-
-
-
-
-
-
-
-
-
-
+from . import test_report_batch
+from . import test_report_pdf_cache
+from . import test_perf_sample
+from . import test_query_count
+from . import test_credit_concurrency
+from . import test_amount_words_benchmark
+from . import test_receipt_benchmark
+from . import test_scale_benchmark
+from . import test_index_plans
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+Générateur de données synthétiques à l'échelle pour TravelPro.
+
+Volumes pour un facteur 1.0 (SCALE_VOLUMES): 1 000 sociétés, 100 000
+membres, 500 000 réservations, 200 000 factures avec leurs lignes,
+1 000 000 d'opérations de caisse et 200 000 lignes d'historique crédit
+(recharges, usages et remboursements liés aux réservations).
+
+Les volumes massifs (membres, réservations, opérations, historique
+crédit) sont insérés en SQL par generate_series, avec les champs calculés
+stockés remplis de façon cohérente (total, reste à payer, soldes crédit,
+statistiques de paiement et empreintes de doublons des membres). Un
+membre sur SCALE_MEMBER_DUPLICATE_EVERY reprend l'email du précédent:
+la détection des doublons a des groupes à former.
+Les factures passent par l'ORM, par paquets, pour que leurs montants et
+lignes de taxes soient ceux du code de production. Les données sont
+reproductibles: mêmes valeurs pour un même facteur et une même graine.
+
+Génération d'une base de référence (validée, réutilisée par les benchmarks):
+    ./odoo-bin shell -d <db>
+    >>> from odoo.addons.travel_pro_version1.tests.scale_data import generate_scale_data
+    >>> generate_scale_data(env, factor=1.0)
+    >>> env.cr.commit()
+"""
+import logging
+import time
+
+from ..models.member import name_phonetic_key
+
+_logger = logging.getLogger(__name__)
+
+SCALE_VOLUMES = {
+    'companies': 1000,
+    'members': 100000,
+    'destinations': 200,
+    'reservations': 500000,
+    'invoices': 200000,
+    'cash_operations': 1000000,
+    'credit_history': 200000,
+}
+
+# Préfixe des sociétés générées: permet de détecter un jeu déjà présent
+SCALE_COMPANY_PREFIX = 'SCALE Company'
+SCALE_INVOICE_BATCH = 500
+SCALE_PARTNER_BATCH = 2000
+SCALE_INVOICE_LINES = 3
+# Un membre sur N partage l'email du membre précédent (doublon)
+SCALE_MEMBER_DUPLICATE_EVERY = 100
+
+# Constante de hachage multiplicatif (Knuth) pour répartir les références
+HASH_MULTIPLIER = 2654435761
+
+GENERATOR_CONTEXT = {
+    'tracking_disable': True,
+    'mail_create_nolog': True,
+    'mail_create_nosubscribe': True,
+    'mail_notrack': True,
+}
+
+
+def scale_volumes(factor):
+    """Volumes à générer pour un facteur d'échelle (au moins 1 par type)."""
+    return {key: max(1, int(count * factor)) for key, count in SCALE_VOLUMES.items()}
+
+
+def scale_data_exists(env):
+    """Un jeu de données à l'échelle est-il déjà présent dans la base ?"""
+    return bool(env['travel.company'].search_count([('name', '=like', f'{SCALE_COMPANY_PREFIX} %')], limit=1))
+
+
+def generate_scale_data(env, factor=0.01, seed=0.42):
+    """
+    Générer le jeu de données synthétiques.
+
+    Args:
+        env: environnement Odoo (les données sont créées dans sa transaction)
+        factor (float): facteur appliqué à SCALE_VOLUMES
+        seed (float): graine de random() PostgreSQL, entre -1 et 1
+
+    Returns:
+        dict: volumes générés par type
+    """
+    env = env(context=dict(env.context, **GENERATOR_CONTEXT))
+    volumes = scale_volumes(factor)
+    cr = env.cr
+    started = time.perf_counter()
+    cr.execute("SELECT setseed(%s)", (seed,))
+
+    def step(label):
+        _logger.info("Données à l'échelle: %s (%.1fs)", label, time.perf_counter() - started)
+
+    companies = _generate_companies(env, volumes['companies'])
+    step(f"{len(companies)} sociétés")
+    member_ids, member_companies = _generate_members(env, companies.ids, volumes['members'])
+    step(f"{len(member_ids)} membres")
+    destinations = env['travel.destination'].create([{
+        'name': f'SCALE Destination {i:04d}',
+        'price': 300.0 + (i * 37) % 2000,
+    } for i in range(1, volumes['destinations'] + 1)])
+    step(f"{len(destinations)} destinations")
+    _generate_reservations(env, member_ids, member_companies, destinations.ids, volumes['reservations'])
+    step(f"{volumes['reservations']} réservations")
+    _generate_credit_history(env, member_ids, volumes['credit_history'])
+    step(f"{volumes['credit_history']} lignes de crédit")
+    _generate_cash_operations(env, volumes['cash_operations'])
+    step(f"{volumes['cash_operations']} opérations de caisse")
+    _fill_member_payment_stats(env, member_ids)
+    step("statistiques de paiement des membres")
+    _generate_invoices(env, companies.ids, volumes['invoices'])
+    step(f"{volumes['invoices']} factures")
+
+    env.invalidate_all()
+    return volumes
+
+
+def _generate_companies(env, count):
+    return env['travel.company'].create([{
+        'name': f'{SCALE_COMPANY_PREFIX} {i:05d}',
+        'email': f'contact{i}@scale-company.tn',
+        'vat': f'{i:07d}S',
+    } for i in range(1, count + 1)])
+
+
+def _scale_member_email_number(i):
+    """Numéro utilisé dans l'email du membre i (celui du précédent pour un doublon)."""
+    return i - 1 if i % SCALE_MEMBER_DUPLICATE_EVERY == 0 else i
+
+
+def _generate_members(env, company_ids, count):
+    """
+    Contacts par l'ORM (par paquets), membres en SQL avec leurs empreintes
+    (email_normalized, phone_normalized, name_key) calculées comme
+    travel.member._compute_fingerprint.
+    """
+    partner_ids = []
+    Partner = env['res.partner'].with_context(default_company_id=False)
+    for start in range(1, count + 1, SCALE_PARTNER_BATCH):
+        stop = min(start + SCALE_PARTNER_BATCH, count + 1)
+        partner_ids += Partner.create([{
+            'name': f'Scale Member {i:06d}',
+            'email': f'member{_scale_member_email_number(i)}@scale.tn',
+            'phone': f'+216 {20000000 + i}',
+            'customer_rank': 1,
+        } for i in range(start, stop)]).ids
+        env.invalidate_all()
+
+    env.cr.execute("""
+        INSERT INTO travel_member
+               (name, company_id, email, phone, matricule, partner_id, currency_id, credit_balance,
+                email_normalized, phone_normalized, name_key,
+                create_uid, create_date, write_uid, write_date)
+        SELECT name, company_id, email, phone, matricule, partner_id, %(currency)s, 0.0,
+               lower(email), translate(phone, ' -.+', ''), (%(name_keys)s::varchar[])[g],
+               %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+          FROM (SELECT g,
+                       'Scale Member ' || lpad(g::text, 6, '0') AS name,
+                       (%(companies)s::int[])[1 + (g - 1) %% %(company_count)s] AS company_id,
+                       'member' || CASE WHEN g %% %(duplicate_every)s = 0 THEN g - 1 ELSE g END
+                                || '@scale.tn' AS email,
+                       '+216 ' || (20000000 + g) AS phone,
+                       'SCALE-' || lpad(g::text, 6, '0') AS matricule,
+                       (%(partners)s::int[])[g] AS partner_id
+                  FROM generate_series(1, %(count)s) g) src
+         ORDER BY g
+     RETURNING id, company_id
+    """, {
+        'companies': company_ids,
+        'company_count': len(company_ids),
+        'partners': partner_ids,
+        'duplicate_every': SCALE_MEMBER_DUPLICATE_EVERY,
+        'name_keys': [name_phonetic_key(f'Scale Member {i:06d}') for i in range(1, count + 1)],
+        'currency': env.company.currency_id.id,
+        'uid': env.uid,
+        'count': count,
+    })
+    rows = env.cr.fetchall()
+    return [row[0] for row in rows], [row[1] for row in rows]
+
+
+def _generate_reservations(env, member_ids, member_companies, destination_ids, count):
+    """Réservations réparties entre les membres: 20% brouillon, 50% confirmées, 20% terminées, 10% annulées."""
+    env.cr.execute("""
+        INSERT INTO travel_reservation
+               (name, member_id, company_id, destination_id, trip_type, check_in, check_out, nights,
+                adults, children, infants, participants, local_or_foreign, room_category, room_type,
+                price, purchase_amount, total_price, currency_id, status, use_credit, credit_used,
+                remaining_to_pay, is_invoiced, credit_refund_amount,
+                create_uid, create_date, write_uid, write_date)
+        SELECT 'SCALE/R' || lpad(g::text, 7, '0'),
+               (%(members)s::int[])[k],
+               (%(member_companies)s::int[])[k],
+               (%(destinations)s::int[])[1 + g %% %(destination_count)s],
+               (ARRAY['hotel', 'voyage_organise', 'billetrie', 'autre'])[1 + g %% 4],
+               date '2024-01-01' + (g %% 730),
+               date '2024-01-01' + (g %% 730) + 1 + (g %% 7),
+               1 + (g %% 7),
+               1 + (g %% 3), g %% 2, 0, 1 + (g %% 3) + (g %% 2),
+               'local', 'standard', 'double',
+               price, round((price * 0.8)::numeric, 2), price, %(currency)s,
+               CASE WHEN g %% 10 < 2 THEN 'draft'
+                    WHEN g %% 10 < 7 THEN 'confirmed'
+                    WHEN g %% 10 < 9 THEN 'done'
+                    ELSE 'cancel' END,
+               false, 0.0, price, false, 0.0,
+               %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+          FROM (SELECT g,
+                       1 + ((g::bigint * %(hash)s) %% %(member_count)s)::int AS k,
+                       round((150 + random() * 4850)::numeric, 2)::float AS price
+                  FROM generate_series(1, %(count)s) g) src
+    """, {
+        'members': member_ids,
+        'member_companies': member_companies,
+        'member_count': len(member_ids),
+        'destinations': destination_ids,
+        'destination_count': len(destination_ids),
+        'currency': env.company.currency_id.id,
+        'hash': HASH_MULTIPLIER,
+        'uid': env.uid,
+        'count': count,
+    })
+
+
+def _generate_credit_history(env, member_ids, count):
+    """
+    Historique crédit: 50% de recharges sans réservation, 20% d'usages sur
+    des réservations confirmées ou terminées (chacun précédé d'une recharge
+    du même montant, le solde reste positif), 10% de remboursements de
+    réservations annulées. Soldes courants calculés par fenêtre puis
+    reportés sur les membres et les réservations.
+    """
+    cr = env.cr
+    usage_count = count // 5
+    refund_count = count // 10
+    recharge_count = count - 2 * usage_count - refund_count
+    cr.execute("""
+        INSERT INTO travel_credit_history
+               (member_id, date, amount, type, note, create_uid, create_date, write_uid, write_date)
+        SELECT (%(members)s::int[])[1 + ((g::bigint * %(hash)s) %% %(member_count)s)::int],
+               timestamp '2024-01-01' + (g %% 730) * interval '1 day',
+               round((50 + random() * 950)::numeric, 2),
+               'recharge', 'Recharge synthétique',
+               %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+          FROM generate_series(1, %(count)s) g
+    """, {
+        'members': member_ids,
+        'member_count': len(member_ids),
+        'hash': HASH_MULTIPLIER,
+        'uid': env.uid,
+        'count': recharge_count,
+    })
+    for statuses, rows_sql, row_count in (
+        (('confirmed', 'done'), """
+            VALUES (1, 'recharge', src.amount, NULL::int, 'Recharge synthétique'),
+                   (2, 'usage', -src.amount, src.reservation_id, 'Utilisation synthétique')
+        """, usage_count),
+        (('cancel',), """
+            VALUES (1, 'refund', src.amount, src.reservation_id, 'Remboursement synthétique')
+        """, refund_count),
+    ):
+        cr.execute("""
+            SELECT id, member_id, total_price FROM travel_reservation
+             WHERE name LIKE 'SCALE/R%%' AND status IN %s
+          ORDER BY id
+        """, (statuses,))
+        reservations = cr.fetchall()
+        if not reservations or not row_count:
+            continue
+        cr.execute(f"""
+            INSERT INTO travel_credit_history
+                   (member_id, date, amount, type, reservation_id, note,
+                    create_uid, create_date, write_uid, write_date)
+            SELECT src.member_id,
+                   timestamp '2024-01-01' + (src.g %% 730) * interval '1 day',
+                   entry.amount, entry.type, entry.reservation_id, entry.note,
+                   %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+              FROM (SELECT g,
+                           (%(reservations)s::int[])[k] AS reservation_id,
+                           (%(reservation_members)s::int[])[k] AS member_id,
+                           round(((%(prices)s::float[])[k] * (0.05 + random() * 0.15))::numeric, 2)::float AS amount
+                      FROM (SELECT g, 1 + ((g::bigint * %(hash)s) %% %(reservation_count)s)::int AS k
+                              FROM generate_series(1, %(count)s) g) picked) src
+             CROSS JOIN LATERAL ({rows_sql}) AS entry(position, type, amount, reservation_id, note)
+          ORDER BY src.g, entry.position
+        """, {
+            'reservations': [row[0] for row in reservations],
+            'reservation_members': [row[1] for row in reservations],
+            'prices': [row[2] for row in reservations],
+            'reservation_count': len(reservations),
+            'hash': HASH_MULTIPLIER,
+            'uid': env.uid,
+            'count': row_count,
+        })
+    cr.execute("""
+        UPDATE travel_credit_history history
+           SET balance_after = running.balance
+          FROM (SELECT id, SUM(amount) OVER (PARTITION BY member_id ORDER BY id) AS balance
+                  FROM travel_credit_history
+                 WHERE member_id = ANY(%s)) running
+         WHERE history.id = running.id
+    """, (member_ids,))
+    cr.execute("""
+        UPDATE travel_member member
+           SET credit_balance = last.balance_after
+          FROM (SELECT DISTINCT ON (member_id) member_id, balance_after
+                  FROM travel_credit_history
+                 WHERE member_id = ANY(%s)
+              ORDER BY member_id, id DESC) last
+         WHERE member.id = last.member_id
+    """, (member_ids,))
+    # Crédit consommé ou remboursé reporté sur les réservations
+    cr.execute("""
+        UPDATE travel_reservation reservation
+           SET use_credit = credit.used > 0,
+               credit_used = credit.used,
+               credit_refund_amount = credit.refunded,
+               remaining_to_pay = reservation.total_price - credit.used
+          FROM (SELECT reservation_id,
+                       COALESCE(-SUM(amount) FILTER (WHERE type = 'usage'), 0) AS used,
+                       COALESCE(SUM(amount) FILTER (WHERE type = 'refund'), 0) AS refunded
+                  FROM travel_credit_history
+                 WHERE reservation_id IS NOT NULL
+              GROUP BY reservation_id) credit
+         WHERE reservation.id = credit.reservation_id
+           AND reservation.name LIKE 'SCALE/R%'
+    """)
+
+
+def _generate_cash_operations(env, count):
+    """
+    Opérations historiques (sans session) sur la caisse principale et ses
+    sous-caisses, puis report des recettes confirmées sur le reste à payer.
+    """
+    cr = env.cr
+    registers = _get_scale_cash_registers(env)
+    cr.execute("""
+        SELECT id, total_price FROM travel_reservation
+         WHERE name LIKE 'SCALE/R%' AND status IN ('confirmed', 'done')
+      ORDER BY id
+    """)
+    reservations = cr.fetchall()
+    if not reservations:
+        return
+    cr.execute("""
+        INSERT INTO cash_register_operation
+               (name, cash_register_id, date, type, amount, signed_amount, payment_method,
+                note, user_id, company_id, state, reservation_id,
+                create_uid, create_date, write_uid, write_date)
+        SELECT 'SCALE/OP' || lpad(g::text, 8, '0'),
+               (%(registers)s::int[])[1 + g %% %(register_count)s],
+               timestamp '2024-01-01' + (g %% 730) * interval '1 day' + (g %% 600) * interval '1 minute',
+               CASE WHEN g %% 20 = 0 THEN 'expense' ELSE 'receipt' END,
+               amount,
+               CASE WHEN g %% 20 = 0 THEN -amount ELSE amount END,
+               (ARRAY['cash', 'check', 'convention', 'traite', 'transfer'])[1 + g %% 5],
+               'Opération synthétique', %(uid)s, %(company)s,
+               CASE WHEN g %% 10 = 0 THEN 'cancelled' ELSE 'confirmed' END,
+               (%(reservations)s::int[])[k],
+               %(uid)s, now() at time zone 'UTC', %(uid)s, now() at time zone 'UTC'
+          FROM (SELECT g,
+                       1 + ((g::bigint * %(hash)s) %% %(reservation_count)s)::int AS k,
+                       round(((%(prices)s::float[])[1 + ((g::bigint * %(hash)s) %% %(reservation_count)s)::int]
+                              * (0.1 + random() * 0.3))::numeric, 2)::float AS amount
+                  FROM generate_series(1, %(count)s) g) src
+    """, {
+        'registers': registers.ids,
+        'register_count': len(registers),
+        'reservations': [row[0] for row in reservations],
+        'prices': [row[1] for row in reservations],
+        'reservation_count': len(reservations),
+        'company': env.company.id,
+        'hash': HASH_MULTIPLIER,
+        'uid': env.uid,
+        'count': count,
+    })
+    cr.execute("""
+        UPDATE travel_reservation reservation
+           SET remaining_to_pay = reservation.total_price - reservation.credit_used - paid.amount
+          FROM (SELECT reservation_id, SUM(amount) AS amount
+                  FROM cash_register_operation
+                 WHERE name LIKE 'SCALE/OP%' AND state = 'confirmed' AND type = 'receipt'
+              GROUP BY reservation_id) paid
+         WHERE reservation.id = paid.reservation_id
+    """)
+
+
+def _fill_member_payment_stats(env, member_ids):
+    """Statistiques de paiement stockées des membres, comme travel.member._read_payment_stats."""
+    env.cr.execute("""
+        UPDATE travel_member member
+           SET total_paid = stats.paid,
+               total_remaining = stats.remaining,
+               payment_count = stats.receipt_count
+          FROM (SELECT reservation.member_id,
+                       COALESCE(SUM(payment.paid), 0) AS paid,
+                       COALESCE(SUM(reservation.remaining_to_pay), 0) AS remaining,
+                       COALESCE(SUM(payment.receipt_count), 0) AS receipt_count
+                  FROM travel_reservation reservation
+                  LEFT JOIN (SELECT reservation_id,
+                                    SUM(signed_amount) AS paid,
+                                    COUNT(*) FILTER (WHERE type = 'receipt') AS receipt_count
+                               FROM cash_register_operation
+                              WHERE state = 'confirmed'
+                           GROUP BY reservation_id) payment ON payment.reservation_id = reservation.id
+                 WHERE reservation.member_id = ANY(%s)
+              GROUP BY reservation.member_id) stats
+         WHERE member.id = stats.member_id
+    """, (member_ids,))
+
+
+def _get_scale_cash_registers(env):
+    """Caisse principale de la société courante (créée si besoin) et deux sous-caisses."""
+    CashRegister = env['cash.register']
+    main = CashRegister.search([('is_main', '=', True), ('company_id', '=', env.company.id)], limit=1)
+    if not main:
+        main = CashRegister.create({
+            'name': 'SCALE Caisse Principale',
+            'code': 'SCALE-MAIN',
+            'is_main': True,
+            'user_id': env.uid,
+        })
+    subs = main.sub_cash_ids
+    for i in range(len(subs) + 1, 3):
+        subs |= CashRegister.create({
+            'name': f'SCALE Sous-Caisse {i}',
+            'code': f'SCALE-SUB-{i}',
+            'is_main': False,
+            'main_cash_id': main.id,
+            'user_id': env.uid,
+        })
+    return main | subs
+
+
+def _generate_invoices(env, company_ids, count):
+    """Factures par l'ORM, par paquets; 70% confirmées, le reste en brouillon."""
+    Invoice = env['travel.invoice.client']
+    tax_rates = ['7', '13', '19', '0']
+    for start in range(0, count, SCALE_INVOICE_BATCH):
+        numbers = range(start, min(start + SCALE_INVOICE_BATCH, count))
+        invoices = Invoice.create([{
+            'travel_company_id': company_ids[n % len(company_ids)],
+            'invoice_line_ids': [(0, 0, {
+                'description': f'Prestation synthétique {n}-{line}',
+                'price_ttc': 100.0 + (n * 31 + line * 17) % 3000,
+                'tax_rate': tax_rates[(n + line) % len(tax_rates)],
+            }) for line in range(1 + n % SCALE_INVOICE_LINES)],
+        } for n in numbers])
+        invoices.filtered(lambda inv: inv.id % 10 < 7).write({'state': 'confirmed'})
+        env.flush_all()
+        env.invalidate_all()
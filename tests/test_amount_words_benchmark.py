@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark des montants en lettres sur 1 000 factures.
+
+Compare la conversion d'origine (num2words + expressions régulières à
+chaque lecture) au convertisseur partagé mis en cache (amount.words.mixin),
+pour l'affichage des montants en lettres d'un lot de factures.
+
+Non exécuté par défaut. Lancement:
+    ./odoo-bin -d <db> -i travel_pro_version1 --test-tags travel_benchmark
+"""
+import logging
+import random
+import re
+import time
+
+from num2words import num2words
+
+from odoo.tests.common import TransactionCase, tagged
+
+from ..models.mixins import amount_to_words
+
+_logger = logging.getLogger(__name__)
+
+
+def _legacy_amount_in_words(amount):
+    """Conversion telle qu'effectuée avant la mise en cache."""
+    text = num2words(int(round(amount)), lang='fr')
+    text = re.sub(r'\bMlle\b', 'mille', text, flags=re.IGNORECASE)
+    text = re.sub(r'\bMLLE\b', 'mille', text)
+    return text[0].upper() + text[1:]
+
+
+@tagged('-standard', 'post_install', '-at_install', 'travel_benchmark')
+class TestAmountWordsBenchmark(TransactionCase):
+    """Rendu des montants en lettres de 1 000 factures."""
+
+    INVOICES = 1000
+    DISTINCT_PRICES = 150
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        company = cls.env['travel.company'].create({'name': 'Benchmark Words Company'})
+        rng = random.Random(42)
+        prices = [round(rng.uniform(100, 20000), 3) for _i in range(cls.DISTINCT_PRICES)]
+        cls.invoices = cls.env['travel.invoice.client'].create([{
+            'travel_company_id': company.id,
+            'invoice_line_ids': [(0, 0, {
+                'description': 'Benchmark',
+                'price_ttc': rng.choice(prices),
+                'tax_rate': '7',
+            })],
+        } for _i in range(cls.INVOICES)])
+
+    def test_render_amount_in_words(self):
+        """Benchmark: conversion d'origine contre convertisseur en cache."""
+        amounts = self.invoices.mapped('amount_total')
+
+        start = time.perf_counter()
+        legacy = [_legacy_amount_in_words(amount) for amount in amounts]
+        legacy_time = time.perf_counter() - start
+
+        amount_to_words.cache_clear()
+        self.invoices.invalidate_recordset(['amount_in_words_fr'])
+        start = time.perf_counter()
+        cached = self.invoices.mapped('amount_in_words_fr')
+        cached_time = time.perf_counter() - start
+        info = amount_to_words.cache_info()
+
+        _logger.info(
+            "Montants en lettres (%d factures): origine %.3fs, cache %.3fs (x%.1f), "
+            "%d conversions num2words, %d réutilisations",
+            self.INVOICES, legacy_time, cached_time,
+            legacy_time / cached_time if cached_time else 0.0,
+            info.misses, info.hits,
+        )
+        self.assertEqual(cached, [f"{text} Dinars" for text in legacy])
+        self.assertLessEqual(info.misses, self.DISTINCT_PRICES)
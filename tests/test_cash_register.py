@@ -11,6 +11,8 @@ Couvre:
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import UserError, ValidationError
 
+from ..models.receipt_text import RECEIPT_MIN_WIDTH, _wrap, render_receipt_text
+
 
 class TestCashRegister(TransactionCase):
     """Tests pour le modèle cash.register."""
@@ -200,6 +202,136 @@ class TestCashRegister(TransactionCase):
         self.assertEqual(self.main_cash.balance, 400.0)
 
 
+    def test_session_incremental_totals(self):
+        """Test: Les totaux de session suivent les confirmations et annulations."""
+        self.main_cash.action_open_cash()
+        session = self.main_cash.current_session_id
+        self.assertEqual(session.state, 'opened')
+
+        receipt = self.env['cash.register.operation'].create({
+            'cash_register_id': self.main_cash.id,
+            'type': 'receipt',
+            'amount': 300.0,
+            'payment_method': 'cash',
+        })
+        self.assertEqual(session.total_receipts, 0.0)
+
+        receipt.action_confirm()
+        self.assertEqual(receipt.session_id, session)
+        self.assertEqual(session.total_receipts, 300.0)
+        self.assertEqual(self.main_cash.balance, 300.0)
+
+        receipt.action_cancel()
+        self.assertEqual(session.total_receipts, 0.0)
+        self.assertEqual(self.main_cash.balance, 0.0)
+
+    def test_reconfirmed_operation_moves_to_open_session(self):
+        """Test: Une opération reconfirmée après la fermeture de sa session passe dans la session ouverte."""
+        self.main_cash.action_open_cash()
+        first_session = self.main_cash.current_session_id
+        receipt = self.env['cash.register.operation'].create({
+            'cash_register_id': self.main_cash.id,
+            'type': 'receipt',
+            'amount': 150.0,
+            'payment_method': 'cash',
+            'state': 'confirmed',
+        })
+        receipt.action_cancel()
+        self.main_cash.action_close_cash()
+        self.main_cash.action_open_cash()
+        second_session = self.main_cash.current_session_id
+
+        receipt.action_draft()
+        receipt.write({'state': 'confirmed'})
+
+        self.assertEqual(receipt.session_id, second_session)
+        self.assertEqual(first_session.total_receipts, 0.0)
+        self.assertEqual(second_session.total_receipts, 150.0)
+        self.assertEqual(second_session.balance, 150.0)
+        self.assertEqual(self.main_cash.total_receipts, 150.0)
+
+    def test_closed_session_is_immutable(self):
+        """Test: Une session fermée est un instantané immuable."""
+        self.main_cash.action_open_cash()
+        session = self.main_cash.current_session_id
+        self.env['cash.register.operation'].create({
+            'cash_register_id': self.main_cash.id,
+            'type': 'receipt',
+            'amount': 200.0,
+            'payment_method': 'cash',
+            'state': 'confirmed',
+        })
+        self.main_cash.action_close_cash()
+
+        self.assertEqual(session.state, 'closed')
+        self.assertEqual(session.closing_balance, 200.0)
+        with self.assertRaises(UserError):
+            session.write({'total_receipts': 0.0})
+
+        # La réouverture crée une nouvelle session
+        self.main_cash.action_open_cash()
+        self.assertNotEqual(self.main_cash.current_session_id, session)
+        self.assertEqual(self.main_cash.opening_balance, 200.0)
+        self.assertEqual(self.main_cash.total_receipts, 0.0)
+
+
+    def test_bordereau_report_values(self):
+        """Test: Le bordereau regroupe les recettes par mode de paiement (caisse + sous-caisses)."""
+        sub_cash = self.env['cash.register'].create({
+            'name': 'Sub Bordereau',
+            'code': 'SUB-BORD',
+            'is_main': False,
+            'main_cash_id': self.main_cash.id,
+            'user_id': self.env.user.id,
+        })
+        self.main_cash.action_open_cash()
+        for cash, method, amount in [
+            (self.main_cash, 'cash', 100.0),
+            (sub_cash, 'cash', 50.0),
+            (sub_cash, 'check', 70.0),
+        ]:
+            self.env['cash.register.operation'].create({
+                'cash_register_id': cash.id,
+                'type': 'receipt',
+                'amount': amount,
+                'payment_method': method,
+                'state': 'confirmed',
+            })
+
+        values = self.env['report.travel_pro_version1.report_cash_bordereau']._get_report_values(self.main_cash.ids)
+        methods = values['bordereaux'][self.main_cash.id]
+
+        self.assertEqual([m['method'] for m in methods], ['cash', 'check'])
+        self.assertEqual(methods[0]['total'], 150.0)
+        self.assertEqual(len(methods[0]['rows']), 2)
+        self.assertEqual(methods[1]['total'], 70.0)
+
+    def test_bordereau_current_session_only(self):
+        """Test: Le bordereau ne reprend que la session courante et concorde avec ses totaux."""
+        Operation = self.env['cash.register.operation']
+        self.main_cash.action_open_cash()
+        Operation.create({
+            'cash_register_id': self.main_cash.id,
+            'type': 'receipt',
+            'amount': 100.0,
+            'payment_method': 'cash',
+            'state': 'confirmed',
+        })
+        self.main_cash.action_close_cash()
+        self.main_cash.action_open_cash()
+        Operation.create({
+            'cash_register_id': self.main_cash.id,
+            'type': 'receipt',
+            'amount': 30.0,
+            'payment_method': 'cash',
+            'state': 'confirmed',
+        })
+
+        rows = self.main_cash._get_bordereau_rows()
+        self.assertEqual([row['amount'] for row in rows], [30.0])
+        self.assertEqual(rows[0]['method_total'], self.main_cash.current_session_id.total_receipts)
+
+
 class TestCashRegisterOperation(TransactionCase):
     """Tests pour le modèle cash.register.operation."""
 
@@ -298,3 +430,70 @@ class TestCashRegisterOperation(TransactionCase):
 
 
 
+
+    def test_text_receipt(self):
+        """Test: Reçu ESC/POS produit directement à la confirmation."""
+        self.main_cash.write({'receipt_output': 'escpos', 'receipt_width': 32})
+        operation = self.env['cash.register.operation'].create({
+            'cash_register_id': self.main_cash.id,
+            'type': 'receipt',
+            'amount': 1250.5,
+            'payment_method': 'cash',
+            'note': 'Acompte voyage',
+        })
+
+        action = operation.action_confirm()
+        self.assertEqual(action['type'], 'ir.actions.act_url')
+
+        attachment = self.env['ir.attachment'].search([
+            ('res_model', '=', 'cash.register.operation'),
+            ('res_id', '=', operation.id),
+        ])
+        self.assertEqual(len(attachment), 1)
+        self.assertTrue(attachment.raw.startswith(b'\x1b@'))
+        self.assertIn(b'1,250.500 DT', attachment.raw)
+
+        text = operation._render_text_receipt('text').decode()
+        self.assertIn(operation.name, text)
+        self.assertIn('Acompte voyage', text)
+        self.assertTrue(all(len(line) <= 32 for line in text.splitlines()))
+
+    def test_text_receipt_long_amount(self):
+        """Test: Un montant plus long que la place disponible est reporté, jamais tronqué."""
+        values = dict.fromkeys(
+            ['date', 'cash', 'cashier', 'type', 'payment_method', 'member', 'destination',
+             'reservation_paid', 'reservation_remaining'], '-',
+        )
+        values.update({
+            'name': 'REC/2024/00001',
+            'amount': '12,345,678,901.500 DT',
+            'reservation': 'RES/2024/00001',
+            'reservation_total': '1,234,567,890.000 DT',
+        })
+        for width in (RECEIPT_MIN_WIDTH, 32):
+            lines = render_receipt_text(values, width).splitlines()
+            self.assertIn('12,345,678,901.500 DT', '\n'.join(lines))
+            self.assertIn('1,234,567,890.000 DT', '\n'.join(lines))
+            self.assertTrue(all(len(line) <= width for line in lines))
+        lines = render_receipt_text(values, RECEIPT_MIN_WIDTH).splitlines()
+        index = lines.index('Total Reservation:')
+        self.assertEqual(lines[index + 1].strip(), '1,234,567,890.000 DT')
+
+    def test_text_receipt_wrap_trailing_spaces(self):
+        """Test: Aucune ligne repliée, dernière comprise, ne garde d'espace final."""
+        self.assertEqual(_wrap("Acompte voyage   ", 32), ['Acompte voyage'])
+        self.assertEqual(_wrap("Acompte pour le voyage organisé  ", 16), ['Acompte pour le', 'voyage organisé'])
+        self.assertEqual(_wrap("", 16), [''])
+
+    def test_pdf_receipt_by_default(self):
+        """Test: Le reçu PDF reste le format par défaut."""
+        operation = self.env['cash.register.operation'].create({
+            'cash_register_id': self.main_cash.id,
+            'type': 'receipt',
+            'amount': 100.0,
+            'payment_method': 'cash',
+        })
+
+        action = operation.action_confirm()
+        self.assertEqual(self.main_cash.receipt_output, 'pdf')
+        self.assertEqual(action['type'], 'ir.actions.report')
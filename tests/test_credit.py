@@ -8,6 +8,7 @@ Couvre:
 - Utilisation et remboursement
 """
 from odoo.tests.common import TransactionCase
+from odoo.exceptions import UserError
 
 
 class TestCreditSystem(TransactionCase):
@@ -175,3 +176,55 @@ class TestCreditSystem(TransactionCase):
 
 
 
+
+    def test_running_balance_ledger(self):
+        """Test: Chaque ligne stocke le solde courant du membre."""
+        h1 = self.env['travel.credit.history'].create({
+            'member_id': self.member.id,
+            'amount': 300.0,
+            'type': 'recharge',
+        })
+        h2, h3 = self.env['travel.credit.history'].create([
+            {'member_id': self.member.id, 'amount': -120.0, 'type': 'usage'},
+            {'member_id': self.member.id, 'amount': 20.0, 'type': 'refund'},
+        ])
+
+        self.assertEqual(h1.balance_after, 300.0)
+        self.assertEqual(h2.balance_after, 180.0)
+        self.assertEqual(h3.balance_after, 200.0)
+        self.assertEqual(self.member.credit_balance, 200.0)
+
+    def test_ledger_is_append_only(self):
+        """Test: Les montants du registre ne peuvent être ni modifiés ni supprimés."""
+        history = self.env['travel.credit.history'].create({
+            'member_id': self.member.id,
+            'amount': 100.0,
+            'type': 'recharge',
+        })
+
+        with self.assertRaises(UserError):
+            history.write({'amount': 50.0})
+        with self.assertRaises(UserError):
+            history.unlink()
+
+        # La note reste modifiable
+        history.write({'note': 'Correction libellé'})
+
+    def test_ledger_consistency_check(self):
+        """Test: Le vérificateur détecte et reconstruit un solde courant corrompu."""
+        history = self.env['travel.credit.history'].create({
+            'member_id': self.member.id,
+            'amount': 100.0,
+            'type': 'recharge',
+        })
+        self.assertFalse(self.env['travel.credit.history']._check_ledger_consistency([self.member.id]))
+
+        self.env.cr.execute(
+            "UPDATE travel_credit_history SET balance_after = 999 WHERE id = %s", (history.id,)
+        )
+        history.invalidate_recordset(['balance_after'])
+
+        bad = self.env['travel.credit.history']._check_ledger_consistency([self.member.id], fix=True)
+        self.assertEqual(bad, [self.member.id])
+        self.assertEqual(history.balance_after, 100.0)
+        self.assertFalse(self.env['travel.credit.history']._check_ledger_consistency([self.member.id]))
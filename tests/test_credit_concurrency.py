@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+Test de charge de la consommation concurrente du crédit.
+
+Plusieurs workers (threads, chacun avec sa propre transaction) confirment
+des centaines de réservations d'un même membre en parallèle. Le test
+vérifie que le solde ne devient jamais négatif et que le registre crédit
+reste cohérent.
+
+Ce test valide des données réelles (commit) et n'est pas exécuté par
+défaut. Lancement:
+    ./odoo-bin -d <db> -i travel_pro_version1 --test-tags travel_stress
+"""
+import logging
+import threading
+import time
+from datetime import date, timedelta
+
+import odoo
+from odoo import SUPERUSER_ID, api
+from odoo.tests.common import BaseCase, get_db_name, tagged
+
+from ..models.credit import run_credit_transaction
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('-standard', 'post_install', '-at_install', 'travel_stress')
+class TestCreditConcurrency(BaseCase):
+    """Confirmations concurrentes contre un seul membre."""
+
+    WORKERS = 8
+    RESERVATIONS = 200
+    RESERVATION_PRICE = 10.0
+    INITIAL_CREDIT = 1000.0
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.registry = odoo.registry(get_db_name())
+        with cls.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            member = env['travel.member'].create({'name': 'Stress Credit Member'})
+            destination = env['travel.destination'].create({'name': 'Stress Destination'})
+            env['travel.credit.history'].create({
+                'member_id': member.id,
+                'amount': cls.INITIAL_CREDIT,
+                'type': 'recharge',
+            })
+            reservations = env['travel.reservation'].create([{
+                'member_id': member.id,
+                'destination_id': destination.id,
+                'check_in': date.today(),
+                'check_out': date.today() + timedelta(days=1),
+                'price': cls.RESERVATION_PRICE,
+                'use_credit': True,
+            } for _i in range(cls.RESERVATIONS)])
+            cls.member_id = member.id
+            cls.partner_id = member.partner_id.id
+            cls.destination_id = destination.id
+            cls.reservation_ids = reservations.ids
+
+    @classmethod
+    def tearDownClass(cls):
+        # Nettoyage en SQL: le registre crédit interdit la suppression via l'ORM
+        with cls.registry.cursor() as cr:
+            cr.execute("DELETE FROM travel_credit_history WHERE member_id = %s", (cls.member_id,))
+            cr.execute("DELETE FROM travel_reservation WHERE member_id = %s", (cls.member_id,))
+            cr.execute("DELETE FROM travel_member WHERE id = %s", (cls.member_id,))
+            cr.execute("DELETE FROM travel_destination WHERE id = %s", (cls.destination_id,))
+            cr.execute("DELETE FROM res_partner WHERE id = %s", (cls.partner_id,))
+        super().tearDownClass()
+
+    def _confirm(self, env, reservation_id):
+        env['travel.reservation'].browse(reservation_id).action_confirm()
+
+    def _worker(self, reservation_ids, errors):
+        # Une transaction (et un curseur) par confirmation, ouverte par run_credit_transaction
+        try:
+            for reservation_id in reservation_ids:
+                run_credit_transaction(self.registry, SUPERUSER_ID, {}, self._confirm, reservation_id)
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(e)
+
+    def test_concurrent_confirmations_never_overspend(self):
+        """Test: Des confirmations parallèles ne dépensent jamais deux fois le même crédit."""
+        errors = []
+        chunks = [self.reservation_ids[i::self.WORKERS] for i in range(self.WORKERS)]
+        threads = [threading.Thread(target=self._worker, args=(chunk, errors)) for chunk in chunks]
+
+        start = time.time()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.time() - start
+
+        self.assertFalse(errors, f"Erreurs dans les workers: {errors}")
+
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            member = env['travel.member'].browse(self.member_id)
+            reservations = env['travel.reservation'].browse(self.reservation_ids)
+            usages = env['travel.credit.history'].search([
+                ('member_id', '=', self.member_id),
+                ('type', '=', 'usage'),
+            ])
+
+            self.assertEqual(set(reservations.mapped('status')), {'confirmed'})
+            self.assertGreaterEqual(member.credit_balance, 0.0)
+            self.assertGreaterEqual(min(usages.mapped('balance_after')), 0.0)
+            self.assertAlmostEqual(-sum(usages.mapped('amount')), self.INITIAL_CREDIT, places=2)
+            self.assertEqual(len(usages.mapped('reservation_id')), len(usages))
+            self.assertFalse(env['travel.credit.history']._check_ledger_consistency([self.member_id]))
+
+        _logger.info(
+            "%s confirmations / %s workers en %.2fs (%.1f confirmations/s)",
+            self.RESERVATIONS, self.WORKERS, elapsed, self.RESERVATIONS / elapsed,
+        )
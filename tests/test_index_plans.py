@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Plans d'exécution des requêtes critiques sur le jeu de données à l'échelle.
+
+Index candidats (non livrés, doc/INDEX_STRATEGY.md section 2): chaque cas
+exécute EXPLAIN (ANALYZE, BUFFERS) sur une requête de production sans
+l'index, crée l'index dans la transaction du test, rejoue la requête puis
+supprime l'index. Les deux plans et leurs durées sont journalisés: ce sont
+les preuves à consigner dans doc/INDEX_STRATEGY.md avant de livrer un index.
+Le cas échoue si l'index créé n'est pas parcouru.
+
+Index livrés: le cas vérifie que la requête parcourt l'index.
+
+Non exécuté par défaut. Lancement sur la base de référence (facteur 1.0,
+1 000 000 d'opérations de caisse):
+    TRAVEL_SCALE_FACTOR=1.0 ./odoo-bin -d <db> -i travel_pro_version1 --test-tags travel_scale
+"""
+import json
+import logging
+import os
+
+from odoo.tests.common import TransactionCase, tagged
+
+from .scale_data import generate_scale_data, scale_data_exists
+
+_logger = logging.getLogger(__name__)
+
+INDEXED_TABLES = (
+    'travel_member',
+    'travel_reservation',
+    'cash_register_operation',
+    'travel_credit_history',
+    'travel_invoice_client_line',
+)
+
+
+@tagged('-standard', 'post_install', '-at_install', 'travel_scale')
+class TestIndexPlans(TransactionCase):
+    """Index utilisés par les requêtes critiques."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if not scale_data_exists(cls.env):
+            generate_scale_data(cls.env, factor=float(os.environ.get('TRAVEL_SCALE_FACTOR', '0.01')))
+        cls.env.flush_all()
+        for table in INDEXED_TABLES:
+            cls.env.cr.execute(f"ANALYZE {table}")
+
+        cr = cls.env.cr
+        cr.execute("""
+            SELECT reservation_id FROM cash_register_operation
+             WHERE reservation_id IS NOT NULL ORDER BY id DESC LIMIT 1
+        """)
+        cls.reservation_id = cr.fetchone()[0]
+        cr.execute("SELECT member_id, destination_id FROM travel_reservation WHERE id = %s", (cls.reservation_id,))
+        cls.member_id, cls.destination_id = cr.fetchone()
+        cr.execute("SELECT cash_register_id, MAX(date) FROM cash_register_operation GROUP BY cash_register_id LIMIT 1")
+        cls.cash_register_id, cls.last_date = cr.fetchone()
+        cr.execute("""
+            SELECT reservation_id FROM travel_credit_history
+             WHERE reservation_id IS NOT NULL AND type = 'usage' ORDER BY id DESC LIMIT 1
+        """)
+        cls.credit_reservation_id = cr.fetchone()[0]
+        cr.execute("SELECT invoice_id FROM travel_invoice_client_line ORDER BY id DESC LIMIT 1")
+        cls.invoice_id = cr.fetchone()[0]
+        cr.execute("""
+            SELECT reservation_id FROM travel_invoice_client_line
+             WHERE reservation_id IS NOT NULL ORDER BY id DESC LIMIT 1
+        """)
+        cls.invoice_reservation_id = cr.fetchone()[0]
+
+    def _explain(self, query, params):
+        """Plan exécuté (JSON) de la requête."""
+        self.env.cr.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}", params)
+        return self.env.cr.fetchone()[0][0]
+
+    def _plan_indexes(self, node):
+        """Noms des index parcourus par un nœud de plan et ses enfants."""
+        names = {node['Index Name']} if 'Index Name' in node else set()
+        for child in node.get('Plans', []):
+            names |= self._plan_indexes(child)
+        return names
+
+    def assertIndexGain(self, label, index_name, ddl, query, params):
+        """
+        Mesurer la requête sans puis avec l'index candidat (créé le temps du cas).
+
+        Returns:
+            tuple: (durée sans, durée avec) en millisecondes
+        """
+        before = self._explain(query, params)
+        self.env.cr.execute(f"CREATE INDEX {index_name} ON {ddl}")
+        try:
+            after = self._explain(query, params)
+        finally:
+            self.env.cr.execute(f"DROP INDEX {index_name}")
+        indexes = self._plan_indexes(after['Plan'])
+        _logger.info(
+            "Index candidat %s (%s): sans %.3f ms [%s], avec %.3f ms [%s]\nPlan sans:\n%s\nPlan avec:\n%s",
+            index_name, label,
+            before['Execution Time'], before['Plan']['Node Type'],
+            after['Execution Time'], after['Plan']['Node Type'],
+            json.dumps(before['Plan'], indent=2), json.dumps(after['Plan'], indent=2),
+        )
+        self.assertIn(index_name, indexes, f"{label}: index candidat {index_name} non utilisé ({sorted(indexes)})")
+        return before['Execution Time'], after['Execution Time']
+
+    def assertPlanUsesIndex(self, label, index_name, query, params):
+        """Vérifier que le plan exécuté de la requête parcourt index_name."""
+        plan = self._explain(query, params)
+        indexes = self._plan_indexes(plan['Plan'])
+        _logger.info(
+            "Plan %s: %.3f ms, index %s\n%s",
+            label, plan['Execution Time'], sorted(indexes) or 'aucun', json.dumps(plan['Plan'], indent=2),
+        )
+        self.assertIn(index_name, indexes, f"{label}: index {index_name} non utilisé ({sorted(indexes)})")
+
+    def test_reservation_by_member(self):
+        """Réservations d'un membre (statistiques de paiement, compteur)."""
+        self.assertIndexGain(
+            'reservation_by_member', 'travel_reservation__member_id_index',
+            'travel_reservation (member_id)',
+            "SELECT id, remaining_to_pay FROM travel_reservation WHERE member_id IN %s",
+            ((self.member_id,),),
+        )
+
+    def test_reservation_by_destination(self):
+        """Nombre de réservations d'une destination."""
+        self.assertIndexGain(
+            'reservation_by_destination', 'travel_reservation__destination_id_index',
+            'travel_reservation (destination_id)',
+            "SELECT COUNT(*) FROM travel_reservation WHERE destination_id = %s",
+            (self.destination_id,),
+        )
+
+    def test_operation_by_register_date(self):
+        """Opérations confirmées d'une caisse depuis une date (rattachement aux sessions)."""
+        self.assertIndexGain(
+            'operation_by_register_date', 'cash_register_operation_register_state_date_idx',
+            'cash_register_operation (cash_register_id, state, date)',
+            """SELECT id, amount FROM cash_register_operation
+                WHERE cash_register_id IN %s AND state = 'confirmed' AND date >= %s AND type = 'receipt'""",
+            ((self.cash_register_id,), self.last_date),
+        )
+
+    def test_operation_confirmed_receipts(self):
+        """Recettes confirmées par réservation (reste à payer)."""
+        self.assertIndexGain(
+            'operation_confirmed_receipts', 'cash_register_operation_confirmed_receipt_idx',
+            "cash_register_operation (reservation_id) INCLUDE (amount) WHERE state = 'confirmed' AND type = 'receipt'",
+            """SELECT reservation_id, SUM(amount) FROM cash_register_operation
+                WHERE reservation_id IN %s AND state = 'confirmed' AND type = 'receipt'
+             GROUP BY reservation_id""",
+            ((self.reservation_id,),),
+        )
+
+    def test_operation_by_reservation(self):
+        """Opérations d'une réservation, tous états (compteur, statistiques de paiement)."""
+        self.assertIndexGain(
+            'operation_by_reservation', 'cash_register_operation__reservation_id_index',
+            'cash_register_operation (reservation_id) WHERE reservation_id IS NOT NULL',
+            "SELECT state, COUNT(*) FROM cash_register_operation WHERE reservation_id = %s GROUP BY state",
+            (self.reservation_id,),
+        )
+
+    def test_operation_list_order(self):
+        """Première page de la liste des opérations (ordre date desc)."""
+        self.assertIndexGain(
+            'operation_list_order', 'cash_register_operation__date_index',
+            'cash_register_operation (date)',
+            "SELECT id FROM cash_register_operation ORDER BY date DESC, id DESC LIMIT 80",
+            (),
+        )
+
+    def test_credit_usage_by_reservation(self):
+        """Crédit consommé par réservation."""
+        self.assertIndexGain(
+            'credit_usage_by_reservation', 'travel_credit_history_reservation_type_idx',
+            'travel_credit_history (reservation_id, type) WHERE reservation_id IS NOT NULL',
+            """SELECT reservation_id, SUM(amount) FROM travel_credit_history
+                WHERE reservation_id IN %s AND type = 'usage'
+             GROUP BY reservation_id""",
+            ((self.credit_reservation_id,),),
+        )
+
+    def test_invoice_lines(self):
+        """Lignes d'une facture client."""
+        self.assertIndexGain(
+            'invoice_lines', 'travel_invoice_client_line__invoice_id_index',
+            'travel_invoice_client_line (invoice_id)',
+            "SELECT id FROM travel_invoice_client_line WHERE invoice_id = %s ORDER BY sequence, id",
+            (self.invoice_id,),
+        )
+
+    def test_invoice_line_by_reservation(self):
+        """Statut facturé d'une réservation (is_invoiced)."""
+        self.assertIndexGain(
+            'invoice_line_by_reservation', 'travel_invoice_client_line__reservation_id_index',
+            'travel_invoice_client_line (reservation_id) WHERE reservation_id IS NOT NULL',
+            "SELECT reservation_id FROM travel_invoice_client_line WHERE reservation_id IN %s",
+            ((self.invoice_reservation_id,),),
+        )
+
+    def test_member_name_trigram(self):
+        """Autocomplétion d'un membre par fragment de nom (ilike '%terme%')."""
+        if not self.env['travel.member']._has_pg_trgm():
+            self.skipTest("Extension pg_trgm absente")
+        self.assertPlanUsesIndex(
+            'member_name_trigram', 'travel_member_name_trgm_idx',
+            """SELECT id FROM travel_member
+                WHERE name::text ILIKE %s OR matricule::text ILIKE %s
+             ORDER BY name LIMIT 8""",
+            ('%member 04217%', '%member 04217%'),
+        )
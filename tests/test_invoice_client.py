@@ -9,6 +9,8 @@ Couvre:
 - Retenues à la source
 - Workflow
 """
+from datetime import date
+
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import UserError, ValidationError
 
@@ -267,3 +269,235 @@ class TestTravelInvoiceClient(TransactionCase):
 
 
 
+
+    def test_batch_amounts_match_lines(self):
+        """Test: Le calcul groupé des totaux correspond aux montants des lignes."""
+        line_specs = [
+            {'price_ttc': 1070.0, 'tax_rate': '7', 'member_count': 3},
+            {'price_ttc': 1190.0, 'tax_rate': '19'},
+            {'price_ttc': 226.0, 'tax_rate': 'custom', 'tax_rate_custom': 13.0, 'member_count': 2},
+            {'price_ttc': 450.0, 'is_ticket': True, 'ticket_price': 400.0, 'commission': 50.0,
+             'tax_rate': '19', 'member_count': 2},
+            {'price_ttc': 300.0, 'tax_rate': '0'},
+        ]
+        invoices = self.env['travel.invoice.client'].create([{
+            'travel_company_id': self.company.id,
+            'member_ids': [(6, 0, [self.member.id])],
+            'discount_type': 'percent',
+            'discount_rate': 5.0 * i,
+            'invoice_line_ids': [(0, 0, dict(spec, description=f'Ligne {n}'))
+                                 for n, spec in enumerate(line_specs[i:])],
+        } for i in range(3)])
+
+        invoices.invalidate_recordset()
+        for invoice in invoices:
+            lines = invoice.invoice_line_ids
+            untaxed = sum(lines.mapped('price_subtotal'))
+            tax = sum(lines.mapped('price_tax'))
+            ratio = (untaxed - invoice.discount_amount) / untaxed
+            self.assertAlmostEqual(invoice.amount_untaxed, untaxed, places=3)
+            self.assertAlmostEqual(invoice.amount_tax, tax * ratio, places=3)
+            self.assertAlmostEqual(
+                invoice.amount_total,
+                invoice.amount_after_discount + invoice.amount_tax + invoice.fiscal_stamp,
+                places=3,
+            )
+        self.assertIn('TVA 13.0%', invoices[0].tax_details)
+        # Taux personnalisé: HT = 452 / 1.13 = 400, TVA = 52
+        self.assertAlmostEqual(invoices[0].tax_custom_amount, 52.0, places=3)
+
+        # Facture non enregistrée (onchange): même résultat depuis le cache
+        draft = self.env['travel.invoice.client'].new({
+            'travel_company_id': self.company.id,
+            'invoice_line_ids': [(0, 0, dict(spec, description='Brouillon')) for spec in line_specs],
+        })
+        self.assertAlmostEqual(draft.amount_untaxed, invoices[0].amount_untaxed, places=3)
+
+    def test_revenue_by_tax_rate(self):
+        """Test: Le chiffre d'affaires par taux de TVA est agrégé depuis les montants stockés."""
+        company = self.env['travel.company'].create({'name': 'Revenue Company'})
+        invoice = self.env['travel.invoice.client'].create({
+            'travel_company_id': company.id,
+            'invoice_line_ids': [
+                (0, 0, {'description': 'A', 'price_ttc': 1070.0, 'tax_rate': '7', 'member_count': 2}),
+                (0, 0, {'description': 'B', 'price_ttc': 1190.0, 'tax_rate': '19'}),
+            ],
+        })
+        domain = [('travel_company_id', '=', company.id)]
+        Line = self.env['travel.invoice.client.line']
+
+        # Brouillon: non compté
+        self.assertFalse(Line._get_revenue_by('tax_rate', domain))
+
+        invoice.action_confirm()
+        groups = {g['tax_rate']: g for g in Line._get_revenue_by('tax_rate', domain)}
+        self.assertAlmostEqual(groups['7']['price_subtotal'], 2000.0, places=3)
+        self.assertAlmostEqual(groups['7']['price_tax'], 140.0, places=3)
+        self.assertAlmostEqual(groups['19']['price_total'], 1190.0, places=3)
+
+        by_company = Line._get_revenue_by('travel_company_id', domain)
+        self.assertEqual(len(by_company), 1)
+        self.assertAlmostEqual(by_company[0]['price_subtotal'], invoice.amount_untaxed, places=3)
+
+    def test_tax_lines_incremental(self):
+        """Test: Le récapitulatif TVA suit les lignes, la remise et les taux personnalisés."""
+        invoice = self.env['travel.invoice.client'].create({
+            'travel_company_id': self.company.id,
+            'invoice_line_ids': [
+                (0, 0, {'description': 'A', 'price_ttc': 1070.0, 'tax_rate': '7'}),
+                (0, 0, {'description': 'B', 'price_ttc': 226.0, 'tax_rate': 'custom', 'tax_rate_custom': 13.0}),
+                (0, 0, {'description': 'C', 'price_ttc': 115.5, 'tax_rate': 'custom', 'tax_rate_custom': 5.0}),
+            ],
+        })
+        taxes = {t.rate_key: t for t in invoice.tax_ids}
+        self.assertEqual(set(taxes), {'7%', '13.0%', '5.0%'})
+        self.assertAlmostEqual(taxes['7%'].base, 1000.0, places=3)
+        self.assertAlmostEqual(taxes['13.0%'].amount, 26.0, places=3)
+        self.assertAlmostEqual(sum(invoice.tax_ids.mapped('amount')), invoice.amount_tax, places=3)
+
+        # Modification d'une ligne: seule la ligne de TVA concernée change
+        tax_7 = taxes['7%']
+        invoice.invoice_line_ids[0].write({'member_count': 2})
+        self.assertEqual(invoice.tax_ids.filtered(lambda t: t.rate_key == '7%'), tax_7)
+        self.assertAlmostEqual(tax_7.amount, 140.0, places=3)
+
+        # Remise: appliquée proportionnellement
+        invoice.write({'discount_type': 'percent', 'discount_rate': 10.0})
+        self.assertAlmostEqual(tax_7.amount, 126.0, places=3)
+
+        # Suppression d'une ligne: son taux disparaît
+        invoice.invoice_line_ids[2].unlink()
+        self.assertEqual(set(invoice.tax_ids.mapped('rate_key')), {'7%', '13.0%'})
+
+    def test_vat_declaration(self):
+        """Test: La déclaration TVA agrège les factures validées de la période."""
+        Tax = self.env['travel.invoice.client.tax']
+        day = date(2031, 3, 15)
+        invoices = self.env['travel.invoice.client'].create([{
+            'travel_company_id': self.company.id,
+            'date_invoice': day,
+            'invoice_line_ids': [(0, 0, {'description': 'VAT', 'price_ttc': 1190.0, 'tax_rate': '19'})],
+        } for _i in range(3)])
+        for invoice in invoices[:2]:
+            invoice.action_confirm()
+
+        declaration = Tax._get_vat_declaration(date(2031, 3, 1), date(2031, 3, 31))
+        self.assertEqual(len(declaration), 1)
+        self.assertEqual(declaration[0]['rate_key'], '19%')
+        self.assertEqual(declaration[0]['invoice_count'], 2)
+        self.assertAlmostEqual(declaration[0]['base'], 2000.0, places=3)
+        self.assertAlmostEqual(declaration[0]['amount'], 380.0, places=3)
+
+    def test_vat_declaration_exempt_base(self):
+        """Test: Les bases à 0% ont une ligne de TVA nulle et figurent dans la déclaration."""
+        Tax = self.env['travel.invoice.client.tax']
+        invoice = self.env['travel.invoice.client'].create({
+            'travel_company_id': self.company.id,
+            'date_invoice': date(2031, 4, 10),
+            'invoice_line_ids': [
+                (0, 0, {'description': 'Taxable', 'price_ttc': 1070.0, 'tax_rate': '7'}),
+                (0, 0, {'description': 'Exonéré', 'price_ttc': 500.0, 'tax_rate': '0'}),
+            ],
+        })
+        exempt = invoice.tax_ids.filtered(lambda t: t.rate_key == '0%')
+        self.assertAlmostEqual(exempt.base, 500.0, places=3)
+        self.assertEqual(exempt.amount, 0.0)
+        self.assertNotIn('Sans TVA', invoice.tax_details)
+        invoice.action_confirm()
+
+        declaration = {row['rate_key']: row for row in Tax._get_vat_declaration(date(2031, 4, 1), date(2031, 4, 30))}
+        self.assertEqual(set(declaration), {'0%', '7%'})
+        self.assertAlmostEqual(declaration['0%']['base'], 500.0, places=3)
+        self.assertEqual(declaration['0%']['amount'], 0.0)
+
+    def test_amount_in_words_cached(self):
+        """Test: Le convertisseur en lettres est partagé et mis en cache par montant arrondi."""
+        from ..models.mixins import amount_to_words
+
+        invoice_model = self.env['travel.invoice.client']
+        first = invoice_model._format_amount_in_words(1234.4)
+        hits = amount_to_words.cache_info().hits
+        self.assertEqual(invoice_model._format_amount_in_words(1233.6), first)
+        self.assertEqual(amount_to_words.cache_info().hits, hits + 1)
+        self.assertEqual(first, 'Mille deux cent trente-quatre')
+        self.assertEqual(
+            self.env['travel.purchase']._amount_in_words(1234.4, lang='fr'),
+            'mille deux cent trente-quatre',
+        )
+
+    def test_fill_lines_from_selected_members(self):
+        """Test: Remplissage des lignes pour plusieurs membres sans doublon de facturation."""
+        member_2 = self.env['travel.member'].create({
+            'name': 'Invoice Fill Member',
+            'company_id': self.company.id,
+        })
+        reservations = self.env['travel.reservation'].create([{
+            'member_id': member.id,
+            'destination_id': self.destination.id,
+            'check_in': date(2031, 5, 1),
+            'check_out': date(2031, 5, 4),
+            'price': price,
+            'status': 'confirmed',
+        } for member, price in [(member_2, 300.0), (self.member, 100.0), (self.member, 200.0)]])
+
+        # Réservation déjà facturée sur une autre facture
+        self.env['travel.invoice.client'].create({
+            'travel_company_id': self.company.id,
+            'invoice_line_ids': [(0, 0, {
+                'description': 'Déjà facturée',
+                'price_ttc': 200.0,
+                'reservation_id': reservations[2].id,
+            })],
+        })
+
+        invoice = self.env['travel.invoice.client'].create({
+            'travel_company_id': self.company.id,
+            'member_ids': [(6, 0, [self.member.id, member_2.id])],
+        })
+        invoice.action_fill_lines_from_selected_members()
+
+        self.assertEqual(invoice.invoice_line_ids.reservation_id, reservations[:2])
+        self.assertEqual(invoice.invoice_line_ids.mapped('passenger_id'), self.member | member_2)
+        self.assertEqual(invoice.invoice_line_ids[0].passenger_id, self.member)
+
+        # Un second remplissage n'ajoute rien
+        with self.assertRaises(UserError):
+            invoice.action_fill_lines_from_selected_members()
+
+    def test_cron_monthly_invoicing(self):
+        """Test: Facturation mensuelle consolidée idempotente par société."""
+        company = self.env['travel.company'].create({'name': 'Monthly Company'})
+        members = self.env['travel.member'].create([
+            {'name': f'Monthly Member {i}', 'company_id': company.id} for i in range(2)
+        ])
+        reservations = self.env['travel.reservation'].create([{
+            'member_id': member.id,
+            'destination_id': self.destination.id,
+            'check_in': check_in,
+            'check_out': date(2031, 2, 28),
+            'price': 100.0,
+            'status': status,
+        } for member, check_in, status in [
+            (members[0], date(2031, 1, 10), 'confirmed'),
+            (members[1], date(2031, 1, 20), 'done'),
+            (members[1], date(2031, 1, 25), 'draft'),
+            (members[0], date(2031, 2, 5), 'confirmed'),
+        ]])
+        Invoice = self.env['travel.invoice.client']
+        domain = [('travel_company_id', '=', company.id), ('billing_period', '=', date(2031, 1, 1))]
+
+        Invoice.cron_generate_monthly_invoices(period_date=date(2031, 2, 15))
+        invoice = Invoice.search(domain)
+        self.assertEqual(len(invoice), 1)
+        self.assertEqual(invoice.date_invoice, date(2031, 1, 31))
+        self.assertEqual(invoice.invoice_line_ids.reservation_id, reservations[:2])
+        self.assertEqual(invoice.member_ids, members)
+
+        # Relance: aucune nouvelle facture
+        Invoice.cron_generate_monthly_invoices(period_date=date(2031, 2, 15))
+        self.assertEqual(Invoice.search_count(domain), 1)
+
+        # Mois suivant: seule la réservation non facturée est reprise
+        Invoice.cron_generate_monthly_invoices(period_date=date(2031, 3, 1))
+        next_invoice = Invoice.search([('travel_company_id', '=', company.id), ('billing_period', '=', date(2031, 2, 1))])
+        self.assertEqual(next_invoice.invoice_line_ids.reservation_id, reservations[3])
@@ -7,6 +7,7 @@ Couvre:
 - Validation email et téléphone
 - Système de crédit
 - Recherche par nom/matricule
+- Recherche classée (trigrammes) et recherche globale
 """
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import ValidationError
@@ -46,6 +47,20 @@ class TestTravelMember(TransactionCase):
         self.assertEqual(member.partner_id.email, 'client@test.com')
         self.assertEqual(member.partner_id.customer_rank, 1)
 
+    def test_create_members_batch(self):
+        """Test: Création groupée, un partner par membre, partner fourni conservé."""
+        partner = self.env['res.partner'].create({'name': 'Contact Existant'})
+        members = self.env['travel.member'].create([
+            {'name': 'Lot Membre 1', 'email': 'lot1@test.com'},
+            {'name': 'Lot Membre 2', 'phone': '+216 50 111 222'},
+            {'name': 'Lot Membre 3', 'partner_id': partner.id},
+        ])
+
+        self.assertEqual(len(members.partner_id), 3)
+        self.assertEqual(members.mapped('partner_id.name'), ['Lot Membre 1', 'Lot Membre 2', 'Contact Existant'])
+        self.assertEqual(members[0].partner_id.email, 'lot1@test.com')
+        self.assertEqual(members[1].partner_id.phone, '+216 50 111 222')
+
     def test_create_member_with_company(self):
         """Test: Création d'un membre avec une société."""
         member = self.env['travel.member'].create({
@@ -155,6 +170,38 @@ class TestTravelMember(TransactionCase):
         member_ids = [r[0] for r in results]
         self.assertIn(member.id, member_ids)
 
+    def test_search_ranked(self):
+        """Test: Recherche classée, préfixe en tête, matricule inclus."""
+        inner, prefix = self.env['travel.member'].create([
+            {'name': 'Karim Zorblatt', 'matricule': 'MEM-RANK-001'},
+            {'name': 'Zorblatt Karim', 'matricule': 'MEM-RANK-002'},
+        ])
+
+        ranked = self.env['travel.member']._search_ranked('zorblatt')
+        self.assertEqual([record_id for record_id, _score in ranked], [prefix.id, inner.id])
+        self.assertEqual(ranked[0][1], 1.0)
+        self.assertEqual([record_id for record_id, _score in self.env['travel.member']._search_ranked('RANK-002')],
+                         [prefix.id])
+        self.assertFalse(self.env['travel.member']._search_ranked('Inexistant Zorblatt'))
+
+    def test_search_ranked_global(self):
+        """Test: Recherche globale sur membres, sociétés, services et voyages."""
+        member = self.env['travel.member'].create({'name': 'Quixaro Membre'})
+        company = self.env['travel.company'].create({'name': 'Quixaro Société'})
+        service = self.env['travel.service'].create({'name': 'Hôtel Quixaro'})
+        destination = self.env['travel.destination'].create({'name': 'Circuit Quixaro', 'price': 100.0})
+
+        results = self.env['travel.search'].search_ranked('quixaro')
+        found = {(result['model'], result['id']) for result in results}
+        self.assertEqual(found, {
+            ('travel.member', member.id),
+            ('travel.company', company.id),
+            ('travel.service', service.id),
+            ('travel.destination', destination.id),
+        })
+        self.assertEqual(results[0]['score'], 1.0)
+        self.assertEqual(len(self.env['travel.search'].search_ranked('quixaro', limit=2)), 2)
+
     def test_partner_sync_on_write(self):
         """Test: Le partner est mis à jour quand le membre est modifié."""
         member = self.env['travel.member'].create({
@@ -204,3 +251,39 @@ class TestTravelMember(TransactionCase):
 
 
 
+
+    def test_payment_stats(self):
+        """Test: Statistiques de paiement agrégées et mises à jour à l'annulation."""
+        member = self.env['travel.member'].create({'name': 'Test Payment Stats'})
+        reservation = self.env['travel.reservation'].create({
+            'member_id': member.id,
+            'destination_id': self.test_destination.id,
+            'check_in': '2024-01-01',
+            'check_out': '2024-01-05',
+            'price': 500.0,
+        })
+        cash = self.env['cash.register'].create({
+            'name': 'Caisse Stats',
+            'code': 'STATS-TEST',
+            'is_main': True,
+            'user_id': self.env.user.id,
+        })
+        cash.action_open_cash()
+        receipt, _expense = self.env['cash.register.operation'].create([{
+            'cash_register_id': cash.id,
+            'type': operation_type,
+            'amount': amount,
+            'payment_method': 'cash',
+            'reservation_id': reservation.id,
+            'state': 'confirmed',
+        } for operation_type, amount in (('receipt', 300.0), ('expense', 50.0))])
+
+        self.assertEqual(member.total_paid, 250.0)
+        self.assertEqual(member.total_remaining, 200.0)
+        self.assertEqual(member.payment_count, 1)
+        self.assertIn(member, self.env['travel.member'].search([('total_remaining', '>', 0)]))
+
+        receipt.action_cancel()
+        self.assertEqual(member.total_paid, -50.0)
+        self.assertEqual(member.total_remaining, 500.0)
+        self.assertEqual(member.payment_count, 0)
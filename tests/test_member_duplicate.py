@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de la détection et de la fusion des membres en double.
+
+Couvre:
+- Empreintes normalisées (email, téléphone, clé phonétique du nom)
+- Regroupement des doublons par critère
+- Fusion: report des réservations et du crédit, suppression des doublons
+- Fusion: report des messages, pièces jointes et activités, fusion des contacts
+- Groupes ignorés non recréés
+"""
+from odoo.tests.common import TransactionCase
+from odoo.exceptions import UserError
+
+from ..models.member import name_phonetic_key
+
+
+class TestTravelMemberDuplicate(TransactionCase):
+    """Tests pour le modèle travel.member.duplicate et la fusion des membres."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.Member = cls.env['travel.member']
+        cls.Duplicate = cls.env['travel.member.duplicate']
+        cls.test_company = cls.env['travel.company'].create({
+            'name': 'Société Doublons',
+        })
+        cls.test_destination = cls.env['travel.destination'].create({
+            'name': 'Destination Doublons',
+            'price': 300.0,
+        })
+
+    def _group_of(self, member):
+        return self.Duplicate.search([('member_ids', 'in', member.ids), ('state', '=', 'open')])
+
+    def test_name_phonetic_key(self):
+        """Test: La clé phonétique ignore accents, casse, ordre des mots et voyelles."""
+        self.assertEqual(name_phonetic_key('Ben Salah Ahmed'), 'a530 b500 s400')
+        self.assertEqual(name_phonetic_key('ahmad ben-saleh'), 'a530 b500 s400')
+        self.assertEqual(name_phonetic_key('Hélène'), name_phonetic_key('helene'))
+        self.assertEqual(name_phonetic_key(''), '')
+
+    def test_fingerprint_fields(self):
+        """Test: Les empreintes sont normalisées et recalculées à l'écriture."""
+        member = self.Member.create({
+            'name': 'Sami Trabelsi',
+            'email': '  Sami.Trabelsi@Example.COM ',
+            'phone': '+216 98-123.456',
+        })
+        self.assertEqual(member.email_normalized, 'sami.trabelsi@example.com')
+        self.assertEqual(member.phone_normalized, '21698123456')
+        self.assertEqual(member.name_key, name_phonetic_key('Sami Trabelsi'))
+
+        member.write({'email': False})
+        self.assertFalse(member.email_normalized)
+
+    def test_detect_duplicates(self):
+        """Test: Les doublons sont regroupés par email, téléphone ou nom et société."""
+        by_email = self.Member.create([
+            {'name': 'Karim Jaziri', 'email': 'karim.dup@example.com'},
+            {'name': 'K. Jaziri', 'email': 'KARIM.DUP@example.com'},
+        ])
+        by_phone = self.Member.create([
+            {'name': 'Leila Mansour', 'phone': '+216 71 000 111'},
+            {'name': 'Leïla Mansouri', 'phone': '21671000111'},
+        ])
+        by_name = self.Member.create([
+            {'name': 'Mohamed Gharbi', 'company_id': self.test_company.id},
+            {'name': 'gharbi mohammed', 'company_id': self.test_company.id},
+        ])
+        other_company = self.Member.create({'name': 'Mohamed Gharbi'})
+
+        self.Duplicate.detect_duplicates()
+
+        for members, reason in ((by_email, 'email'), (by_phone, 'phone'), (by_name, 'name')):
+            group = self._group_of(members[:1])
+            self.assertEqual(len(group), 1)
+            self.assertEqual(group.reason, reason)
+            self.assertEqual(group.member_ids, members)
+            self.assertEqual(group.master_id, members[0])
+        self.assertFalse(self._group_of(other_company))
+
+    def test_merge_members(self):
+        """Test: La fusion reporte réservations et crédit puis supprime les doublons."""
+        master, duplicate = self.Member.create([
+            {'name': 'Nadia Ferchichi', 'company_id': self.test_company.id},
+            {'name': 'Nadia Ferchichi', 'email': 'nadia@example.com', 'phone': '98765432'},
+        ])
+        reservation = self.env['travel.reservation'].create({
+            'member_id': duplicate.id,
+            'destination_id': self.test_destination.id,
+            'check_in': '2024-03-01',
+            'check_out': '2024-03-05',
+        })
+        self.env['travel.credit.history'].create([
+            {'member_id': master.id, 'amount': 100.0, 'type': 'recharge'},
+            {'member_id': duplicate.id, 'amount': 50.0, 'type': 'recharge'},
+        ])
+
+        (master | duplicate)._merge_into(master)
+
+        self.assertFalse(duplicate.exists())
+        self.assertEqual(reservation.member_id, master)
+        self.assertEqual(master.reservation_count, 1)
+        self.assertEqual(master.credit_balance, 150.0)
+        self.assertEqual(
+            self.env['travel.credit.history'].search([('member_id', '=', master.id)], order='id').mapped('balance_after'),
+            [100.0, 150.0],
+        )
+        # Coordonnées manquantes reprises du doublon
+        self.assertEqual(master.email, 'nadia@example.com')
+        self.assertEqual(master.phone, '98765432')
+
+    def test_merge_moves_chatter_and_partners(self):
+        """Test: Messages, pièces jointes et activités passent au membre conservé; les contacts sont fusionnés."""
+        master, duplicate = self.Member.create([
+            {'name': 'Hedi Bouazizi'},
+            {'name': 'Hedi Bouazizi'},
+        ])
+        duplicate_partner = duplicate.partner_id
+        message = duplicate.message_post(body="Note sur le doublon")
+        attachment = self.env['ir.attachment'].create({
+            'name': 'passeport.pdf',
+            'raw': b'%PDF-passeport',
+            'res_model': 'travel.member',
+            'res_id': duplicate.id,
+        })
+        activity = duplicate.activity_schedule('mail.mail_activity_data_todo', summary="Rappeler le client")
+
+        (master | duplicate)._merge_into(master)
+
+        self.assertEqual(message.res_id, master.id)
+        self.assertEqual(attachment.res_id, master.id)
+        self.assertEqual(activity.res_id, master.id)
+        self.assertIn(message, master.message_ids)
+        self.assertFalse(duplicate_partner.exists())
+        self.assertTrue(master.partner_id.exists())
+
+    def test_merge_group(self):
+        """Test: Fusion d'un groupe détecté dans le membre conservé choisi."""
+        members = self.Member.create([
+            {'name': 'Omar Sassi', 'email': 'omar.dup@example.com'},
+            {'name': 'Omar Sassi', 'email': 'omar.dup@example.com'},
+        ])
+        self.Duplicate.detect_duplicates()
+        group = self._group_of(members[:1])
+        group.master_id = members[1]
+
+        group.action_merge()
+
+        self.assertEqual(group.state, 'merged')
+        self.assertFalse(members[0].exists())
+        self.assertTrue(members[1].exists())
+        with self.assertRaises(UserError):
+            group.action_merge()
+
+    def test_action_merge_members_requires_two(self):
+        """Test: La fusion depuis la liste exige au moins deux membres."""
+        member = self.Member.create({'name': 'Seul Membre'})
+        with self.assertRaises(UserError):
+            member.action_merge_members()
+
+    def test_ignored_group_not_recreated(self):
+        """Test: Un groupe ignoré n'est pas recréé à la détection suivante."""
+        members = self.Member.create([
+            {'name': 'Rim Ayari', 'phone': '55 123 456'},
+            {'name': 'Rym Ayari', 'phone': '55-123-456'},
+        ])
+        self.Duplicate.detect_duplicates()
+        group = self._group_of(members[:1])
+        group.action_ignore()
+
+        self.Duplicate.detect_duplicates()
+
+        self.assertFalse(self._group_of(members[:1]))
+        self.assertEqual(group.state, 'ignored')
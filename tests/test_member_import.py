@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour l'import en masse de membres (travel.member.import.wizard).
+
+Couvre:
+- Import CSV par lots avec société
+- Doublons de matricule (base et fichier)
+- Validation email et téléphone
+- Chargement sans messages de suivi
+- Import planifié (cron) et reprise après le dernier lot validé
+"""
+import base64
+
+from odoo.exceptions import UserError
+from odoo.tests.common import TransactionCase
+
+
+class TestMemberImport(TransactionCase):
+    """Tests pour l'import de membres."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Préparer les données de test."""
+        super().setUpClass()
+        cls.company = cls.env['travel.company'].create({'name': 'Société Import'})
+        cls.existing = cls.env['travel.member'].create({
+            'name': 'Membre Existant',
+            'matricule': 'IMP-EXIST',
+        })
+
+    def _import(self, content, filename='membres.csv', **vals):
+        wizard = self.env['travel.member.import.wizard'].create(dict({
+            'file': base64.b64encode(content.encode('utf-8')),
+            'filename': filename,
+            'company_id': self.company.id,
+        }, **vals))
+        wizard.action_import()
+        self.assertEqual(wizard.state, 'running')
+        wizard.cron_process_member_imports()
+        return wizard
+
+    def test_import_csv(self):
+        """Test: Import CSV par lots, doublons ignorés, lignes invalides rapportées."""
+        wizard = self._import(
+            "Nom;Matricule;Email;Téléphone\n"
+            "Import Un;IMP-001;un@test.com;+216 50 100 200\n"
+            "Import Deux;IMP-002;;\n"
+            "Import Trois;IMP-003;pas-un-email;\n"
+            "Import Quatre;IMP-004;;123\n"
+            "Import Existant;IMP-EXIST;;\n"
+            "Import Répété;IMP-001;;\n"
+            "Import Cinq;;cinq@test.com;\n",
+            batch_size=2,
+        )
+
+        self.assertEqual(wizard.state, 'done')
+        self.assertEqual(wizard.total_count, 7)
+        self.assertEqual(wizard.created_count, 3)
+        self.assertEqual(wizard.duplicate_count, 2)
+        self.assertEqual(wizard.error_count, 2)
+        self.assertIn('Ligne 4', wizard.report)
+        self.assertIn('Ligne 5', wizard.report)
+
+        members = self.env['travel.member'].search([('company_id', '=', self.company.id)])
+        self.assertEqual(sorted(members.mapped('name')), ['Import Cinq', 'Import Deux', 'Import Un'])
+        self.assertEqual(len(members.partner_id), 3)
+        member = members.filtered(lambda m: m.matricule == 'IMP-001')
+        self.assertEqual(member.partner_id.email, 'un@test.com')
+        self.assertFalse(member.message_ids, "Aucun message de suivi pendant l'import")
+
+    def test_import_csv_comma(self):
+        """Test: Séparateur virgule et en-têtes en anglais."""
+        wizard = self._import("name,matricule\nComma Member,IMP-COMMA\n")
+        self.assertEqual(wizard.created_count, 1)
+        self.assertTrue(self.env['travel.member'].search([('matricule', '=', 'IMP-COMMA')]))
+
+    def test_import_missing_name_column(self):
+        """Test: Un fichier sans colonne Nom est refusé."""
+        with self.assertRaises(UserError):
+            self._import("Matricule;Email\nIMP-X;x@test.com\n")
+
+    def test_import_resume(self):
+        """Test: Une reprise saute les lignes des lots déjà validés."""
+        wizard = self.env['travel.member.import.wizard'].create({
+            'file': base64.b64encode(
+                "Nom;Matricule\n"
+                "Reprise Un;IMP-R1\n"
+                "Reprise Deux;IMP-R2\n"
+                "Reprise Trois;IMP-R3\n".encode('utf-8')
+            ),
+            'filename': 'membres.csv',
+            'company_id': self.company.id,
+            'batch_size': 2,
+        })
+        wizard.action_import()
+        # Premier lot validé avant l'interruption
+        self.env['travel.member'].create({'name': 'Reprise Un', 'matricule': 'IMP-R1', 'company_id': self.company.id})
+        wizard.write({'total_count': 1, 'created_count': 1})
+
+        wizard._process_import()
+
+        self.assertEqual(wizard.state, 'done')
+        self.assertEqual(wizard.total_count, 3)
+        self.assertEqual(wizard.created_count, 3)
+        self.assertEqual(wizard.duplicate_count, 0)
+        self.assertEqual(wizard.report, "Aucune erreur.")
+        self.assertEqual(
+            self.env['travel.member'].search_count([('matricule', 'in', ['IMP-R1', 'IMP-R2', 'IMP-R3'])]), 3
+        )
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour l'instrumentation des boutons (travel.perf.sample).
+
+Couvre:
+- Mesure d'une action lorsque l'échantillonnage est actif
+- Aucune mesure lorsqu'il est désactivé
+- Mesure unique pour des actions imbriquées
+- Synthèse p50/p95 par action
+"""
+from odoo.tests.common import TransactionCase
+
+from ..models.perf_sample import PERF_SAMPLE_RATE_PARAM
+
+
+class TestPerfSample(TransactionCase):
+    """Tests pour l'instrumentation des méthodes action_*."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Préparer les données de test."""
+        super().setUpClass()
+        cls.cash = cls.env['cash.register'].create({
+            'name': 'Perf Cash',
+            'code': 'PERF-TEST',
+            'is_main': True,
+            'user_id': cls.env.user.id,
+        })
+        cls.cash.action_open_cash()
+        cls.Sample = cls.env['travel.perf.sample']
+
+    def _create_operation(self):
+        return self.env['cash.register.operation'].create({
+            'cash_register_id': self.cash.id,
+            'type': 'receipt',
+            'amount': 100.0,
+            'payment_method': 'cash',
+        })
+
+    def _samples(self, action):
+        return self.Sample.search([('model_name', '=', 'cash.register.operation'), ('action', '=', action)])
+
+    def test_sampling_disabled_by_default(self):
+        """Test: Aucune mesure sans paramètre d'échantillonnage."""
+        self._create_operation().action_confirm()
+        self.assertFalse(self._samples('action_confirm'))
+
+    def test_action_sampled(self):
+        """Test: Durée, requêtes et lignes écrites sont mesurées; les appels imbriqués ne le sont pas."""
+        self.env['ir.config_parameter'].sudo().set_param(PERF_SAMPLE_RATE_PARAM, '1')
+        self._create_operation().action_confirm()
+
+        sample = self._samples('action_confirm')
+        self.assertEqual(len(sample), 1)
+        self.assertEqual(sample.record_count, 1)
+        self.assertGreater(sample.query_count, 0)
+        self.assertGreater(sample.rows_written, 0)
+        self.assertGreaterEqual(sample.duration_ms, 0.0)
+        # action_print_receipt est appelée par action_confirm: pas de mesure séparée
+        self.assertFalse(self._samples('action_print_receipt'))
+
+    def test_summary_percentiles(self):
+        """Test: La synthèse agrège les mesures par action."""
+        self.env['ir.config_parameter'].sudo().set_param(PERF_SAMPLE_RATE_PARAM, '1')
+        for _i in range(3):
+            self._create_operation().action_confirm()
+
+        self.env.flush_all()
+        summary = self.env['travel.perf.summary'].search([
+            ('model_name', '=', 'cash.register.operation'),
+            ('action', '=', 'action_confirm'),
+        ])
+        self.assertEqual(summary.sample_count, 3)
+        self.assertLessEqual(summary.p50_ms, summary.p95_ms)
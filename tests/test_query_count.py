@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+Tests de non-régression du nombre de requêtes SQL sur les chemins critiques.
+
+Chaque chemin est exécuté pour deux tailles de lot (SMALL et LARGE): le
+nombre de requêtes du grand lot ne doit pas dépasser celui du petit lot.
+Une boucle qui lit ou écrit enregistrement par enregistrement (N+1) fait
+donc échouer le test, quelle que soit la machine.
+
+Couvre:
+- Confirmation de N réservations avec crédit
+- Calcul des totaux de N factures
+- Remplissage des lignes d'une facture pour N membres
+- Fermeture d'une caisse principale avec K sous-caisses
+- Liste de N membres avec leurs statistiques de paiement
+- Compteurs des boutons intelligents de N réservations, membres et sociétés
+
+Le suivi des champs (mail tracking), qui crée un message par
+enregistrement par conception, est désactivé dans ces tests.
+"""
+from datetime import date, timedelta
+
+from odoo.tests.common import TransactionCase
+
+
+class TestQueryCount(TransactionCase):
+    """Nombre de requêtes indépendant de la taille des lots."""
+
+    SMALL = 3
+    LARGE = 15
+
+    @classmethod
+    def setUpClass(cls):
+        """Préparer les données de test."""
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True))
+        cls.company = cls.env['travel.company'].create({'name': 'Query Count Company'})
+        cls.destination = cls.env['travel.destination'].create({
+            'name': 'Query Count Destination',
+            'price': 400.0,
+        })
+        cls.main_cash = cls.env['cash.register'].create({
+            'name': 'Query Count Cash',
+            'code': 'QC-MAIN',
+            'is_main': True,
+            'user_id': cls.env.user.id,
+        })
+        cls.main_cash.action_open_cash()
+        cls.batch = 0
+
+    # ===== OUTILS =====
+
+    def _count_queries(self, func):
+        """Nombre de requêtes exécutées par func, ORM vidé avant et après."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries_before = self.env.cr.sql_log_count
+        func()
+        self.env.flush_all()
+        return self.env.cr.sql_log_count - queries_before
+
+    def assertQueryCountIndependent(self, build, action, sizes=None):
+        """
+        Vérifier que action(build(n)) ne fait pas plus de requêtes pour le
+        grand lot que pour le petit.
+        """
+        counts = []
+        for size in sizes or (self.SMALL, self.LARGE):
+            records = build(size)
+            counts.append(self._count_queries(lambda: action(records)))
+        self.assertLessEqual(
+            counts[-1], counts[0],
+            f"Le nombre de requêtes croît avec la taille du lot: {counts} pour {sizes or (self.SMALL, self.LARGE)}",
+        )
+
+    def _create_members(self, count):
+        """Membres identiques (valeurs calculées égales: une seule écriture groupée au flush)."""
+        self.__class__.batch += 1
+        return self.env['travel.member'].create([{
+            'name': f'QC Member {self.batch}-{i}',
+            'company_id': self.company.id,
+        } for i in range(count)])
+
+    def _create_reservations(self, members, **vals):
+        return self.env['travel.reservation'].create([dict({
+            'member_id': member.id,
+            'destination_id': self.destination.id,
+            'check_in': date.today(),
+            'check_out': date.today() + timedelta(days=3),
+            'price': 400.0,
+        }, **vals) for member in members])
+
+    # ===== CHEMINS CRITIQUES =====
+
+    def test_confirm_reservations(self):
+        """Test: Confirmer N réservations avec crédit."""
+        def build(size):
+            members = self._create_members(size)
+            self.env['travel.credit.history'].create([{
+                'member_id': member.id,
+                'amount': 1000.0,
+                'type': 'recharge',
+            } for member in members])
+            return self._create_reservations(members, use_credit=True)
+
+        self.assertQueryCountIndependent(build, lambda reservations: reservations.action_confirm())
+
+    def test_invoice_totals(self):
+        """Test: Calculer les totaux de N factures."""
+        def build(size):
+            return self.env['travel.invoice.client'].create([{
+                'travel_company_id': self.company.id,
+                'invoice_line_ids': [
+                    (0, 0, {'description': 'Hôtel', 'price_ttc': 535.0, 'tax_rate': '7'}),
+                    (0, 0, {'description': 'Transfert', 'price_ttc': 119.0, 'tax_rate': '19'}),
+                ],
+            } for _i in range(size)])
+
+        self.assertQueryCountIndependent(build, lambda invoices: invoices._compute_amounts())
+
+    def test_fill_lines_from_members(self):
+        """Test: Remplir les lignes d'une facture pour N membres."""
+        def build(size):
+            members = self._create_members(size)
+            self._create_reservations(members, status='confirmed')
+            return self.env['travel.invoice.client'].create({
+                'travel_company_id': self.company.id,
+                'member_ids': [(6, 0, members.ids)],
+            })
+
+        self.assertQueryCountIndependent(build, lambda invoice: invoice.action_fill_lines_from_selected_members())
+
+    def test_close_main_cash_with_sub_cashes(self):
+        """Test: Fermer une caisse principale avec K sous-caisses (K = 2 puis 10)."""
+        sub_cashes = self.env['cash.register']
+
+        def build(size):
+            nonlocal sub_cashes
+            if self.main_cash.state != 'opened':
+                self.main_cash.action_open_cash()
+            while len(sub_cashes) < size:
+                sub_cashes |= self.env['cash.register'].create({
+                    'name': f'QC Sub {len(sub_cashes) + 1}',
+                    'code': f'QC-SUB-{len(sub_cashes) + 1}',
+                    'is_main': False,
+                    'main_cash_id': self.main_cash.id,
+                    'user_id': self.env.user.id,
+                })
+            for sub_cash in sub_cashes:
+                sub_cash.action_open_cash()
+                sub_cash.action_close_sub_cash()
+            return self.main_cash
+
+        self.assertQueryCountIndependent(build, lambda main_cash: main_cash.action_close_cash(), sizes=(2, 10))
+
+    def test_member_payment_stats(self):
+        """Test: Lister N membres avec leurs statistiques de paiement."""
+        def build(size):
+            members = self._create_members(size)
+            reservations = self._create_reservations(members, status='confirmed')
+            self.env['cash.register.operation'].create([{
+                'cash_register_id': self.main_cash.id,
+                'type': 'receipt',
+                'amount': 100.0,
+                'payment_method': 'cash',
+                'reservation_id': reservation.id,
+                'state': 'confirmed',
+            } for reservation in reservations])
+            return members
+
+        def compute_and_read(members):
+            # Champs stockés: sans recalcul explicite, read() ne ferait que relire les colonnes.
+            # Valeurs égales pour tous les membres: une seule écriture groupée au flush.
+            members.invalidate_recordset(['total_paid', 'total_remaining', 'payment_count'])
+            members._compute_payment_stats()
+            members.read(['name', 'total_paid', 'total_remaining', 'payment_count'])
+
+        self.assertQueryCountIndependent(build, compute_and_read)
+
+    def test_smart_button_counters(self):
+        """Test: Lire les compteurs des boutons intelligents de N réservations, membres et sociétés."""
+        def build(size):
+            members = self._create_members(size)
+            reservations = self._create_reservations(members, status='confirmed')
+            self.env['cash.register.operation'].create([{
+                'cash_register_id': self.main_cash.id,
+                'type': 'receipt',
+                'amount': 50.0,
+                'payment_method': 'cash',
+                'reservation_id': reservation.id,
+                'state': state,
+            } for reservation in reservations for state in ('confirmed', 'draft')])
+            return reservations
+
+        def read_counters(reservations):
+            reservations.read(['invoice_count', 'cash_operation_count', 'pos_order_count'])
+            reservations.member_id.read(['reservation_count'])
+            reservations.member_id.company_id.read(['member_count'])
+            reservations.destination_id.read(['reservation_count'])
+
+        self.assertQueryCountIndependent(build, read_counters)
+
+        reservations = build(2)
+        self.assertEqual(reservations.mapped('cash_operation_count'), [1, 1])
+        self.assertEqual(reservations.mapped('invoice_count'), [0, 0])
+        self.assertEqual(reservations.member_id.mapped('reservation_count'), [1, 1])
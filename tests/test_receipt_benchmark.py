@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark des reçus de caisse: rendu QWeb contre reçu thermique.
+
+Mesure le nombre de reçus produits par seconde pour 200 opérations
+confirmées, via le rapport QWeb d'une part et via le gabarit texte/ESC/POS
+d'autre part. En mode test Odoo s'arrête au HTML sans lancer wkhtmltopdf:
+le débit PDF réel est donc encore inférieur à celui mesuré ici.
+
+Non exécuté par défaut. Lancement:
+    ./odoo-bin -d <db> -i travel_pro_version1 --test-tags travel_benchmark
+"""
+import logging
+import time
+
+from odoo.tests.common import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('-standard', 'post_install', '-at_install', 'travel_benchmark')
+class TestReceiptBenchmark(TransactionCase):
+    """Débit de production des reçus de caisse selon le format."""
+
+    OPERATIONS = 200
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.cash = cls.env['cash.register'].create({
+            'name': 'Benchmark Receipt Cash',
+            'code': 'BENCH-RECEIPT',
+            'is_main': True,
+            'user_id': cls.env.user.id,
+        })
+        cls.cash.action_open_cash()
+        cls.operations = cls.env['cash.register.operation'].create([{
+            'cash_register_id': cls.cash.id,
+            'type': 'receipt',
+            'amount': 100.0 + i,
+            'payment_method': 'cash',
+            'note': f'Benchmark {i}',
+            'state': 'confirmed',
+        } for i in range(cls.OPERATIONS)])
+
+    def _receipts_per_second(self, render):
+        self.operations.invalidate_recordset()
+        start = time.perf_counter()
+        for operation in self.operations:
+            render(operation)
+        elapsed = time.perf_counter() - start
+        return self.OPERATIONS / elapsed if elapsed else 0.0
+
+    def test_receipts_per_second(self):
+        """Benchmark: reçus par seconde, QWeb contre texte et ESC/POS."""
+        report = self.env.ref('travel_pro_version1.action_report_cash_receipt')
+        Report = self.env['ir.actions.report']
+
+        qweb_rate = self._receipts_per_second(lambda op: Report._render_qweb_pdf(report, [op.id]))
+        text_rate = self._receipts_per_second(lambda op: op._render_text_receipt('text'))
+        escpos_rate = self._receipts_per_second(lambda op: op._render_text_receipt('escpos'))
+
+        _logger.info(
+            "Reçus de caisse (%d opérations): QWeb %.1f reçus/s, texte %.1f reçus/s (x%.1f), "
+            "ESC/POS %.1f reçus/s (x%.1f)",
+            self.OPERATIONS, qweb_rate,
+            text_rate, text_rate / qweb_rate if qweb_rate else 0.0,
+            escpos_rate, escpos_rate / qweb_rate if qweb_rate else 0.0,
+        )
+        self.assertGreater(text_rate, qweb_rate)
+        self.assertGreater(escpos_rate, qweb_rate)
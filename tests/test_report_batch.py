@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour l'impression PDF en lot (travel.report.batch).
+
+Couvre:
+- Rendu par paquets et archivage en pièces jointes
+- Reprise sans re-rendu des documents déjà archivés
+- Compteurs d'une reprise: déjà archivés et rendus comptés séparément
+"""
+from odoo.tests.common import TransactionCase
+
+
+class TestReportBatch(TransactionCase):
+    """Tests pour le modèle travel.report.batch."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Préparer les données de test."""
+        super().setUpClass()
+        company = cls.env['travel.company'].create({'name': 'Batch Print Company'})
+        cls.invoices = cls.env['travel.invoice.client'].create([{
+            'travel_company_id': company.id,
+            'invoice_line_ids': [(0, 0, {'description': f'Batch {i}', 'price_ttc': 107.0})],
+        } for i in range(3)])
+        cls.batch = cls.env['travel.report.batch'].create({
+            'name': 'Lot Test',
+            'report_id': cls.env.ref('travel_pro_version1.action_report_travel_invoice_client').id,
+            'domain': str([('id', 'in', cls.invoices.ids)]),
+            'chunk_size': 2,
+        })
+
+    def _attachments(self):
+        return self.env['ir.attachment'].search([
+            ('res_model', '=', 'travel.invoice.client'),
+            ('res_id', 'in', self.invoices.ids),
+        ])
+
+    def test_batch_renders_attachments(self):
+        """Test: Chaque document est rendu une fois et archivé."""
+        self.batch.write({'state': 'running'})
+        self.batch._process()
+
+        self.assertEqual(self.batch.state, 'done')
+        self.assertEqual(self.batch.total_count, 3)
+        self.assertEqual(self.batch.done_count, 3)
+        self.assertEqual(len(self._attachments()), 3)
+
+    def test_batch_resume_skips_archived(self):
+        """Test: Une relance ne rend pas les documents déjà archivés."""
+        self.batch.write({'state': 'running'})
+        self.batch._process()
+        self.batch.action_reset()
+        self.batch.write({'state': 'running'})
+        self.batch._process()
+
+        self.assertEqual(self.batch.done_count, 0)
+        self.assertEqual(self.batch.skipped_count, 3)
+        self.assertEqual(len(self._attachments()), 3)
+
+    def test_batch_resume_counts_separately(self):
+        """Test: À la reprise, les documents archivés avant sont ignorés, pas recomptés comme rendus."""
+        self.batch.write({'state': 'running'})
+        self.batch._process()
+        self._attachments().filtered(lambda att: att.res_id == self.invoices[-1].id).unlink()
+
+        # Reprise par le cron, sans remise à zéro
+        self.batch.write({'state': 'running'})
+        self.batch._process()
+
+        self.assertEqual(self.batch.skipped_count, 2)
+        self.assertEqual(self.batch.done_count, 1)
+        self.assertEqual(self.batch.failed_count, 0)
+        self.assertEqual(len(self._attachments()), 3)
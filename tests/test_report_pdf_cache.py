@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""
+Tests unitaires pour le cache des PDF (ir.actions.report).
+
+Couvre:
+- Réimpression d'un document confirmé servie depuis le cache
+- Documents brouillons jamais mis en cache
+- Réimpression depuis le client web (data ne contenant que le contexte)
+- Changement de clé après modification ou suppression d'une ligne
+- Changement de clé d'un reçu après modification de sa réservation
+- Changement de clé d'une facture fournisseur après modification de ses services
+- Éviction au-delà de la taille maximale
+"""
+from odoo.tests.common import TransactionCase
+
+from ..models.report_pdf_cache import PDF_CACHE_MAX_MB_PARAM, PDF_CACHE_TAG
+
+
+class TestReportPdfCache(TransactionCase):
+    """Tests pour le cache PDF des documents validés."""
+
+    @classmethod
+    def setUpClass(cls):
+        """Préparer les données de test."""
+        super().setUpClass()
+        company = cls.env['travel.company'].create({'name': 'PDF Cache Company'})
+        cls.invoice = cls.env['travel.invoice.client'].create({
+            'travel_company_id': company.id,
+            'invoice_line_ids': [(0, 0, {'description': 'Cache', 'price_ttc': 107.0})],
+        })
+        cls.report = cls.env.ref('travel_pro_version1.action_report_travel_invoice_client')
+        cls.Report = cls.env['ir.actions.report']
+
+    def _cache_attachments(self):
+        return self.env['ir.attachment'].search([
+            ('res_model', '=', 'travel.invoice.client'),
+            ('res_id', '=', self.invoice.id),
+            ('description', '=', PDF_CACHE_TAG),
+        ])
+
+    def test_confirmed_invoice_served_from_cache(self):
+        """Test: Une facture confirmée est relue depuis la pièce jointe de cache."""
+        self.invoice.action_confirm()
+        name = self.Report._get_pdf_cache_name(self.report, self.invoice)
+        self.Report._pdf_cache_store(self.report, self.invoice, name, b'%PDF-cached')
+
+        content, report_type = self.Report._render_qweb_pdf(self.report, [self.invoice.id])
+        self.assertEqual(content, b'%PDF-cached')
+        self.assertEqual(report_type, 'pdf')
+
+    def test_web_client_print_served_from_cache(self):
+        """Test: Un data ne contenant que le contexte (/report/download) n'empêche pas le cache."""
+        self.invoice.action_confirm()
+        name = self.Report._get_pdf_cache_name(self.report, self.invoice)
+        self.Report._pdf_cache_store(self.report, self.invoice, name, b'%PDF-cached')
+
+        data = {'context': dict(self.env.context)}
+        content, report_type = self.Report._render_qweb_pdf(self.report, [self.invoice.id], data=data)
+        self.assertEqual(content, b'%PDF-cached')
+        self.assertEqual(report_type, 'pdf')
+
+    def test_draft_invoice_not_cached(self):
+        """Test: Une facture brouillon n'est pas éligible au cache."""
+        self.assertIsNone(self.Report._get_pdf_cache_record(self.report, [self.invoice.id], None))
+        self.invoice.action_confirm()
+        self.assertEqual(self.Report._get_pdf_cache_record(self.report, [self.invoice.id], None), self.invoice)
+        self.assertIsNone(self.Report._get_pdf_cache_record(self.report, self.invoice.ids, {'x': 1}))
+        self.assertEqual(
+            self.Report._get_pdf_cache_record(self.report, self.invoice.ids, {'context': {'lang': 'fr_FR'}}),
+            self.invoice,
+        )
+
+    def test_line_change_invalidates_key(self):
+        """Test: Modifier une ligne change la clé et purge l'ancienne version."""
+        self.invoice.action_confirm()
+        old_name = self.Report._get_pdf_cache_name(self.report, self.invoice)
+        self.Report._pdf_cache_store(self.report, self.invoice, old_name, b'%PDF-old')
+
+        self.env.cr.execute(
+            "UPDATE travel_invoice_client_line SET write_date = write_date + interval '1 second' WHERE invoice_id = %s",
+            (self.invoice.id,),
+        )
+        self.invoice.invoice_line_ids.invalidate_recordset(['write_date'])
+        new_name = self.Report._get_pdf_cache_name(self.report, self.invoice)
+        self.assertNotEqual(old_name, new_name)
+        self.assertIsNone(self.Report._pdf_cache_lookup(self.invoice, new_name))
+
+        self.Report._pdf_cache_store(self.report, self.invoice, new_name, b'%PDF-new')
+        self.assertEqual(self._cache_attachments().mapped('name'), [new_name])
+
+    def test_line_deletion_invalidates_key(self):
+        """Test: Supprimer une ligne autre que la dernière modifiée change la clé."""
+        invoice = self.env['travel.invoice.client'].create({
+            'travel_company_id': self.invoice.travel_company_id.id,
+            'invoice_line_ids': [
+                (0, 0, {'description': 'Ancienne', 'price_ttc': 50.0}),
+                (0, 0, {'description': 'Récente', 'price_ttc': 60.0}),
+            ],
+        })
+        old_name = self.Report._get_pdf_cache_name(self.report, invoice)
+
+        invoice.invoice_line_ids[:1].unlink()
+        invoice.invalidate_recordset(['invoice_line_ids'])
+        self.assertNotEqual(self.Report._get_pdf_cache_name(self.report, invoice), old_name)
+
+    def test_receipt_key_follows_reservation(self):
+        """Test: Modifier la réservation d'un reçu (reste à payer imprimé) change la clé."""
+        member = self.env['travel.member'].create({'name': 'PDF Cache Member'})
+        destination = self.env['travel.destination'].create({'name': 'PDF Cache Destination'})
+        reservation = self.env['travel.reservation'].create({
+            'member_id': member.id,
+            'destination_id': destination.id,
+            'check_in': '2024-05-01',
+            'check_out': '2024-05-03',
+            'price': 300.0,
+        })
+        cash = self.env['cash.register'].create({
+            'name': 'Caisse PDF Cache',
+            'code': 'PDF-CACHE',
+            'is_main': True,
+            'user_id': self.env.user.id,
+        })
+        operation = self.env['cash.register.operation'].create({
+            'cash_register_id': cash.id,
+            'type': 'receipt',
+            'amount': 100.0,
+            'payment_method': 'cash',
+            'reservation_id': reservation.id,
+        })
+        report = self.env.ref('travel_pro_version1.action_report_cash_receipt')
+        old_name = self.Report._get_pdf_cache_name(report, operation)
+
+        self.env.cr.execute(
+            "UPDATE travel_reservation SET write_date = write_date + interval '1 second' WHERE id = %s",
+            (reservation.id,),
+        )
+        reservation.invalidate_recordset(['write_date'])
+        self.assertNotEqual(self.Report._get_pdf_cache_name(report, operation), old_name)
+
+    def test_purchase_key_follows_services(self):
+        """Test: Modifier ou retirer un service d'une facture fournisseur change la clé."""
+        supplier = self.env['res.partner'].create({'name': 'PDF Cache Fournisseur'})
+        services = self.env['travel.service'].create([
+            {'name': 'Service Ancien', 'supplier_id': supplier.id},
+            {'name': 'Service Récent', 'supplier_id': supplier.id},
+        ])
+        purchase = self.env['travel.purchase'].create({
+            'supplier_id': supplier.id,
+            'amount_ttc': 119.0,
+            'service_ids': [(6, 0, services.ids)],
+        })
+        report = self.env.ref('travel_pro_version1.action_report_travel_purchase')
+        old_name = self.Report._get_pdf_cache_name(report, purchase)
+
+        self.env.cr.execute(
+            "UPDATE travel_service SET write_date = write_date + interval '1 second' WHERE id = %s",
+            (services[1].id,),
+        )
+        services.invalidate_recordset(['write_date'])
+        new_name = self.Report._get_pdf_cache_name(report, purchase)
+        self.assertNotEqual(new_name, old_name)
+
+        purchase.write({'service_ids': [(3, services[0].id)]})
+        self.assertNotEqual(self.Report._get_pdf_cache_name(report, purchase), new_name)
+
+    def test_cache_eviction(self):
+        """Test: Le cache est borné par le paramètre de taille maximale."""
+        self.invoice.action_confirm()
+        self.env['ir.config_parameter'].sudo().set_param(PDF_CACHE_MAX_MB_PARAM, '0')
+        name = self.Report._get_pdf_cache_name(self.report, self.invoice)
+        self.Report._pdf_cache_store(self.report, self.invoice, name, b'%PDF-evicted')
+        self.assertFalse(self._cache_attachments())
@@ -10,8 +10,11 @@ Couvre:
 """
 from odoo.tests.common import TransactionCase
 from odoo.exceptions import UserError
+from odoo.tools import mute_logger
 from datetime import date, timedelta
 
+from psycopg2 import IntegrityError
+
 
 class TestTravelReservation(TransactionCase):
     """Tests pour le modèle travel.reservation."""
@@ -236,14 +239,174 @@ class TestTravelReservation(TransactionCase):
         
         self.assertEqual(supplier.supplier_rank, 1)
 
+    def test_batch_financial_computation(self):
+        """Test: Calcul groupé des totaux, crédit et reste à payer sur plusieurs réservations."""
+        service = self.env['travel.service'].create({'name': 'Transfert', 'price': 50.0})
+        cash = self.env['cash.register'].search([('is_main', '=', True)], limit=1) or self.env['cash.register'].create({
+            'name': 'Caisse Batch Test',
+            'code': 'BATCH-TEST',
+            'is_main': True,
+            'user_id': self.env.user.id,
+        })
+        if cash.state != 'opened':
+            cash.action_open_cash()
+
+        reservations = self.env['travel.reservation'].create([{
+            'member_id': self.member.id,
+            'destination_id': self.destination.id,
+            'check_in': date.today(),
+            'check_out': date.today() + timedelta(days=3),
+            'price': 100.0 * (i + 1),
+            'service_ids': [(6, 0, service.ids)],
+        } for i in range(3)])
+        self.env['cash.register.operation'].create({
+            'cash_register_id': cash.id,
+            'type': 'receipt',
+            'amount': 60.0,
+            'payment_method': 'cash',
+            'reservation_id': reservations[1].id,
+            'state': 'confirmed',
+        })
+
+        reservations.invalidate_recordset(['total_price', 'remaining_to_pay'])
+        reservations._compute_total()
+        reservations._compute_remaining()
+
+        self.assertEqual(reservations.mapped('total_price'), [150.0, 250.0, 350.0])
+        self.assertEqual(reservations.mapped('remaining_to_pay'), [150.0, 190.0, 350.0])
+
+    def test_bulk_confirm_shares_member_credit(self):
+        """Test: Confirmation groupée alloue le crédit du membre dans l'ordre."""
+        member = self.env['travel.member'].create({'name': 'Bulk Credit Member'})
+        self.env['travel.credit.history'].create({
+            'member_id': member.id,
+            'amount': 500.0,
+            'type': 'recharge',
+        })
+        reservations = self.env['travel.reservation'].create([{
+            'member_id': member.id,
+            'destination_id': self.destination.id,
+            'check_in': date.today(),
+            'check_out': date.today() + timedelta(days=3),
+            'price': 300.0,
+            'use_credit': True,
+        } for _i in range(3)])
+
+        reservations.action_confirm()
+
+        self.assertEqual(set(reservations.mapped('status')), {'confirmed'})
+        usages = self.env['travel.credit.history'].search([
+            ('reservation_id', 'in', reservations.ids),
+            ('type', '=', 'usage'),
+        ])
+        self.assertEqual(len(usages), 2)
+        self.assertEqual(sum(usages.mapped('amount')), -500.0)
+        member.invalidate_recordset(['credit_balance'])
+        self.assertEqual(member.credit_balance, 0.0)
 
+        # Une seconde confirmation ne débite rien de plus
+        reservations.action_confirm()
+        member.invalidate_recordset(['credit_balance'])
+        self.assertEqual(member.credit_balance, 0.0)
 
+    def _create_credit_reservations(self, name, credit, prices):
+        member = self.env['travel.member'].create({'name': name})
+        self.env['travel.credit.history'].create({
+            'member_id': member.id,
+            'amount': credit,
+            'type': 'recharge',
+        })
+        return self.env['travel.reservation'].create([{
+            'member_id': member.id,
+            'destination_id': self.destination.id,
+            'check_in': date.today(),
+            'check_out': date.today() + timedelta(days=3),
+            'price': price,
+            'use_credit': True,
+        } for price in prices])
 
+    def _usage_amounts(self, reservations):
+        return [
+            (usage.reservation_id.price, usage.amount, usage.balance_after)
+            for usage in self.env['travel.credit.history'].search([
+                ('reservation_id', 'in', reservations.ids),
+                ('type', '=', 'usage'),
+            ], order='id')
+        ]
 
+    def test_bulk_confirm_matches_one_by_one(self):
+        """Test: Confirmation groupée et une par une produisent le même registre crédit."""
+        prices = [300.0, 150.0, 200.0, 100.0]
+        batched = self._create_credit_reservations('Bulk Ledger Member', 500.0, prices)
+        one_by_one = self._create_credit_reservations('Single Ledger Member', 500.0, prices)
 
+        batched.action_confirm()
+        for reservation in one_by_one:
+            reservation.action_confirm()
 
+        self.assertEqual(self._usage_amounts(batched), self._usage_amounts(one_by_one))
+        self.assertEqual(
+            [(300.0, -300.0, 200.0), (150.0, -150.0, 50.0), (200.0, -50.0, 0.0)],
+            self._usage_amounts(batched),
+        )
+        self.assertEqual(batched.mapped('member_id').credit_balance, one_by_one.mapped('member_id').credit_balance)
 
+    def test_bulk_confirm_insufficient_credit_error(self):
+        """Test: Crédit requis supérieur au solde du registre: même erreur en groupé et une par une."""
+        errors = []
+        for name in ('Bulk Short Member', 'Single Short Member'):
+            reservations = self._create_credit_reservations(name, 500.0, [300.0, 100.0])
+            self.assertEqual(reservations.mapped('credit_used'), [300.0, 100.0])
+            # Crédit consommé ailleurs: le registre ne contient plus que 100
+            self.env.flush_all()
+            self.env.cr.execute(
+                "UPDATE travel_credit_history SET balance_after = 100.0 WHERE member_id = %s",
+                (reservations.member_id.id,),
+            )
+            self.env['travel.credit.history'].invalidate_model(['balance_after'])
+            with self.assertRaises(UserError) as error:
+                if name.startswith('Bulk'):
+                    reservations.action_confirm()
+                else:
+                    for reservation in reservations:
+                        reservation.action_confirm()
+            errors.append(str(error.exception).replace(name, '<member>'))
+            self.assertEqual(set(reservations.mapped('status')), {'draft'})
+            self.assertFalse(self._usage_amounts(reservations))
 
+        self.assertEqual(errors[0], errors[1])
+        self.assertIn("n'a pas suffisamment de crédit", errors[0])
 
+    def test_invoice_reservation_only_once(self):
+        """Test: Une réservation ne peut être facturée que sur une facture non annulée."""
+        reservation = self.env['travel.reservation'].create({
+            'member_id': self.member.id,
+            'destination_id': self.destination.id,
+            'check_in': date.today(),
+            'check_out': date.today() + timedelta(days=3),
+            'price': 500.0,
+            'status': 'confirmed',
+        })
+        self.assertFalse(reservation.is_invoiced)
+
+        result = reservation.action_create_invoice()
+        invoice = self.env['travel.invoice.client'].browse(result['res_id'])
+        self.assertTrue(reservation.is_invoiced)
+
+        with self.assertRaises(UserError):
+            reservation.action_create_invoice()
 
+        # Garde au niveau base de données (contrainte d'exclusion partielle)
+        with self.assertRaises(IntegrityError), mute_logger('odoo.sql_db'), self.env.cr.savepoint():
+            self.env['travel.invoice.client.line'].create({
+                'invoice_id': invoice.id,
+                'description': 'Doublon',
+                'price_ttc': 500.0,
+                'reservation_id': reservation.id,
+            })
 
+        # Une facture annulée libère la réservation
+        invoice.action_cancel()
+        self.assertFalse(reservation.is_invoiced)
+        reservation.action_create_invoice()
+        self.assertTrue(reservation.is_invoiced)
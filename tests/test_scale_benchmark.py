@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks à l'échelle des chemins critiques de TravelPro.
+
+Chaque benchmark mesure la durée et le nombre de requêtes SQL d'une
+opération de taille fixe (50 réservations, 200 factures, 80 membres...)
+sur un jeu de données synthétiques (voir scale_data.py). Le nombre de
+requêtes est comparé à la référence enregistrée dans scale_baseline.json:
+tout dépassement au-delà de la tolérance fait échouer le test. Un
+benchmark sans référence est ignoré (skip) et sa mesure est ajoutée au
+fichier: la référence se constitue à la première exécution. Les durées,
+dépendantes de la machine, sont seulement journalisées.
+
+Non exécuté par défaut. Lancement:
+    ./odoo-bin -d <db> -i travel_pro_version1 --test-tags travel_scale
+
+Variables d'environnement:
+    TRAVEL_SCALE_FACTOR: facteur des volumes générés (0.01 par défaut),
+        ignoré si la base contient déjà un jeu généré
+    TRAVEL_SCALE_RECORD_BASELINE=1: enregistrer toutes les mesures comme nouvelle référence
+"""
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from odoo.tests.common import TransactionCase, tagged
+
+from .scale_data import generate_scale_data, scale_data_exists
+
+_logger = logging.getLogger(__name__)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'scale_baseline.json')
+# Marge tolérée sur le nombre de requêtes: 10% + 2 requêtes
+BASELINE_TOLERANCE = 0.10
+BASELINE_SLACK = 2
+
+
+@tagged('-standard', 'post_install', '-at_install', 'travel_scale')
+class TestScaleBenchmark(TransactionCase):
+    """Durée et requêtes SQL des chemins critiques sur un jeu de données à l'échelle."""
+
+    RESERVATIONS = 50
+    INVOICES = 200
+    MEMBERS = 80
+    BORDEREAU_OPERATIONS = 2000
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        if scale_data_exists(cls.env):
+            _logger.info("Benchmarks à l'échelle: jeu de données existant réutilisé")
+        else:
+            generate_scale_data(cls.env, factor=float(os.environ.get('TRAVEL_SCALE_FACTOR', '0.01')))
+        with open(BASELINE_PATH) as baseline_file:
+            cls.baseline = json.load(baseline_file)
+        cls.results = {}
+        cls.record_baseline = os.environ.get('TRAVEL_SCALE_RECORD_BASELINE') == '1'
+
+    @classmethod
+    def tearDownClass(cls):
+        benchmarks = cls.baseline['benchmarks']
+        recorded = {
+            name: {'queries': result['queries']}
+            for name, result in cls.results.items()
+            if cls.record_baseline or name not in benchmarks
+        }
+        if recorded:
+            benchmarks.update(recorded)
+            with open(BASELINE_PATH, 'w') as baseline_file:
+                json.dump(cls.baseline, baseline_file, indent=4, sort_keys=True)
+                baseline_file.write('\n')
+            _logger.info("Benchmarks à l'échelle: référence enregistrée dans %s", BASELINE_PATH)
+        super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        self.missing_baselines = []
+
+    def tearDown(self):
+        super().tearDown()
+        if self.missing_baselines:
+            self.skipTest(
+                f"Sans référence, mesure enregistrée dans {os.path.basename(BASELINE_PATH)}: "
+                f"{', '.join(self.missing_baselines)}"
+            )
+
+    @contextmanager
+    def measure(self, name):
+        """Mesurer un bloc (ORM vidé avant et après) et le comparer à la référence."""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries_before = self.env.cr.sql_log_count
+        started = time.perf_counter()
+        yield
+        self.env.flush_all()
+        elapsed = time.perf_counter() - started
+        queries = self.env.cr.sql_log_count - queries_before
+        self.results[name] = {'queries': queries, 'seconds': elapsed}
+
+        expected = self.baseline['benchmarks'].get(name, {}).get('queries')
+        _logger.info(
+            "Benchmark %s: %.3fs, %d requêtes (référence: %s)",
+            name, elapsed, queries, expected if expected is not None else 'aucune',
+        )
+        if self.record_baseline:
+            return
+        if expected is None:
+            # Comparaison à partir de l'exécution suivante (test ignoré, voir tearDown)
+            self.missing_baselines.append(name)
+            return
+        limit = int(expected * (1 + BASELINE_TOLERANCE)) + BASELINE_SLACK
+        self.assertLessEqual(
+            queries, limit,
+            f"Régression {name}: {queries} requêtes SQL, référence {expected} (limite {limit})",
+        )
+
+    def _open_main_cash(self):
+        main = self.env['cash.register'].search([('is_main', '=', True), ('company_id', '=', self.env.company.id)],
+                                                limit=1)
+        if main.state != 'opened':
+            main.action_open_cash()
+        return main
+
+    def test_reservation_confirm_cancel(self):
+        """Benchmark: confirmation puis annulation de 50 réservations."""
+        reservations = self.env['travel.reservation'].search(
+            [('status', '=', 'draft')], limit=self.RESERVATIONS, order='id')
+        reservations.write({'use_credit': True})
+        with self.measure('reservation_confirm'):
+            reservations.action_confirm()
+        with self.measure('reservation_cancel'):
+            reservations.action_cancel()
+
+    def test_invoice_compute(self):
+        """Benchmark: recalcul des montants de 200 factures."""
+        invoices = self.env['travel.invoice.client'].search([], limit=self.INVOICES, order='id desc')
+        with self.measure('invoice_compute'):
+            invoices._compute_amounts()
+
+    def test_invoice_fill(self):
+        """Benchmark: remplissage d'une facture depuis 80 membres sélectionnés."""
+        company = self.env['travel.company'].search([('member_ids', '!=', False)], limit=1, order='id')
+        members = company.member_ids[:self.MEMBERS]
+        invoice = self.env['travel.invoice.client'].create({
+            'travel_company_id': company.id,
+            'member_ids': [(6, 0, members.ids)],
+        })
+        with self.measure('invoice_fill'):
+            invoice.action_fill_lines_from_selected_members()
+
+    def test_cash_close_open(self):
+        """Benchmark: fermeture puis réouverture de la caisse principale et de ses sous-caisses."""
+        main = self._open_main_cash()
+        for sub in main.sub_cash_ids.filtered(lambda c: c.state != 'opened'):
+            sub.action_open_cash()
+        with self.measure('cash_close'):
+            for sub in main.sub_cash_ids:
+                sub.action_close_sub_cash()
+            main.action_close_cash()
+        with self.measure('cash_open'):
+            main.action_open_cash()
+
+    def test_bordereau_rendering(self):
+        """Benchmark: rendu HTML du bordereau de la caisse principale (2 000 recettes dans la session)."""
+        main = self._open_main_cash()
+        for sub in main.sub_cash_ids.filtered(lambda c: c.state != 'opened'):
+            sub.action_open_cash()
+        # Les opérations générées sont historiques: rattacher les plus récentes aux sessions courantes
+        self.env.cr.execute("""
+            UPDATE cash_register_operation op
+               SET session_id = cash.current_session_id
+              FROM cash_register cash
+             WHERE cash.id = op.cash_register_id
+               AND op.id IN (SELECT id FROM cash_register_operation
+                              WHERE cash_register_id IN %s AND state = 'confirmed' AND type = 'receipt'
+                           ORDER BY id DESC LIMIT %s)
+        """, (tuple((main | main.sub_cash_ids).ids), self.BORDEREAU_OPERATIONS))
+        with self.measure('bordereau_rendering'):
+            self.env['ir.actions.report']._render_qweb_html(
+                'travel_pro_version1.action_report_cash_bordereau', main.ids)
+
+    def test_member_list_payment_stats(self):
+        """Benchmark: liste de 80 membres avec leurs statistiques de paiement."""
+        with self.measure('member_list_payment_stats'):
+            members = self.env['travel.member'].search([], limit=self.MEMBERS)
+            members.read(['name', 'company_id', 'credit_balance', 'total_paid', 'total_remaining',
+                          'payment_count'])
+
+    def test_member_duplicate_detection(self):
+        """Benchmark: détection des doublons sur l'ensemble des membres."""
+        with self.measure('member_duplicate_detection'):
+            group_count = self.env['travel.member.duplicate'].detect_duplicates()
+        self.assertTrue(group_count, "Le jeu à l'échelle contient des membres en double")
@@ -1,3 +1,3 @@
 # -*- coding: utf-8 -*-
 from . import invoice_reservations_wizard
-
+from . import member_import_wizard
@@ -86,14 +86,7 @@ class InvoiceReservationsWizard(models.TransientModel):
             reservations = self.env['travel.reservation'].browse(active_ids)
             
             # Vérifier que toutes les réservations peuvent être facturées
-            invalid_reservations = reservations.filtered(
-                lambda r: r.status not in ['confirmed', 'done'] or r.total_price <= 0
-            )
-            if invalid_reservations:
-                raise UserError(
-                    f"Certaines réservations ne peuvent pas être facturées:\n"
-                    f"- Réservations non confirmées ou sans prix: {', '.join(invalid_reservations.mapped('name'))}"
-                )
+            reservations._check_invoiceable()
             
             # Récupérer la société si disponible (sans validation stricte)
             companies = reservations.mapped('member_id.company_id')
@@ -123,14 +116,7 @@ class InvoiceReservationsWizard(models.TransientModel):
         reservations = self.env['travel.reservation'].browse(reservation_ids)
         
         # Vérifier que toutes les réservations peuvent être facturées
-        invalid_reservations = reservations.filtered(
-            lambda r: r.status not in ['confirmed', 'done'] or r.total_price <= 0
-        )
-        if invalid_reservations:
-            raise UserError(
-                f"Certaines réservations ne peuvent pas être facturées:\n"
-                f"- Réservations non confirmées ou sans prix: {', '.join(invalid_reservations.mapped('name'))}"
-            )
+        reservations._check_invoiceable()
         
         # Récupérer les membres uniques des réservations
         members = reservations.mapped('member_id')
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+Wizard d'import en masse de membres depuis un fichier CSV ou XLSX.
+
+Le fichier est stocké en pièce jointe et lu en flux, ligne par ligne
+(csv.reader, openpyxl en lecture seule), sans être décodé en mémoire. Les
+membres sont créés par lots: un seul create par lot pour les contacts
+res.partner puis pour les membres, sans suivi ni messages de création.
+Les matricules existants sont chargés en une requête.
+
+L'import est exécuté par un cron, hors des workers HTTP: chaque lot est
+validé avec l'avancement enregistré sur le wizard, un import interrompu
+reprend après la dernière ligne validée.
+"""
+import csv
+import io
+import logging
+import threading
+
+import psycopg2
+
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+
+from ..models.member import PHONE_MIN_DIGITS, clean_phone
+
+_logger = logging.getLogger(__name__)
+
+# Nombre de membres créés par lot
+MEMBER_IMPORT_BATCH_SIZE = 500
+# Nombre maximal d'erreurs détaillées dans le rapport
+MEMBER_IMPORT_MAX_ERRORS = 200
+
+# En-têtes acceptés (en minuscules) et champ du membre correspondant
+MEMBER_IMPORT_COLUMNS = {
+    'nom': 'name',
+    'name': 'name',
+    'matricule': 'matricule',
+    'email': 'email',
+    'e-mail': 'email',
+    'téléphone': 'phone',
+    'telephone': 'phone',
+    'tel': 'phone',
+    'phone': 'phone',
+}
+
+# Chargement sans suivi des champs, message de création ni abonnement
+MEMBER_IMPORT_CONTEXT = {
+    'tracking_disable': True,
+    'mail_create_nolog': True,
+    'mail_create_nosubscribe': True,
+    'mail_notrack': True,
+}
+
+
+def _cell_to_str(value):
+    """Valeur de cellule en texte (les nombres entiers XLSX sans '.0')."""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+class TravelMemberImportWizard(models.TransientModel):
+    _name = 'travel.member.import.wizard'
+    _description = 'Import en Masse de Membres'
+
+    file = fields.Binary('Fichier', required=True, attachment=True,
+                         help="CSV (séparateur , ; ou tabulation, UTF-8) ou XLSX. Première ligne: "
+                              "en-têtes Nom, Matricule, Email, Téléphone")
+    filename = fields.Char('Nom du Fichier')
+    company_id = fields.Many2one('travel.company', string='Société',
+                                 help="Société des membres importés")
+    batch_size = fields.Integer('Taille des Lots', default=MEMBER_IMPORT_BATCH_SIZE)
+    state = fields.Selection([
+        ('draft', 'Brouillon'),
+        ('running', 'En cours'),
+        ('done', 'Terminé'),
+    ], default='draft')
+
+    # Rapport d'import, mis à jour après chaque lot validé
+    total_count = fields.Integer('Lignes Lues', readonly=True,
+                                 help="Lignes traitées et validées: une reprise repart de la suivante")
+    created_count = fields.Integer('Membres Créés', readonly=True)
+    duplicate_count = fields.Integer('Doublons Ignorés', readonly=True,
+                                     help="Matricule déjà existant ou répété dans le fichier")
+    error_count = fields.Integer('Lignes en Erreur', readonly=True)
+    report = fields.Text('Rapport', readonly=True)
+
+    # ===== LECTURE DU FICHIER =====
+
+    def _open_file(self):
+        """Flux binaire du fichier importé, lu depuis sa pièce jointe."""
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('res_field', '=', 'file'),
+        ], limit=1)
+        if attachment.store_fname:
+            return open(attachment._full_path(attachment.store_fname), 'rb')
+        return io.BytesIO(attachment.raw or b'')
+
+    def _iter_file_rows(self):
+        """Lignes brutes du fichier (listes de cellules), en-tête compris."""
+        with self._open_file() as data:
+            if (self.filename or '').lower().endswith('.xlsx'):
+                yield from self._iter_xlsx_rows(data)
+            else:
+                yield from self._iter_csv_rows(data)
+
+    def _iter_csv_rows(self, data):
+        stream = io.TextIOWrapper(data, encoding='utf-8-sig', newline='')
+        try:
+            sample = stream.read(4096)
+            stream.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+            except csv.Error:
+                dialect = csv.excel
+            yield from csv.reader(stream, dialect)
+        except UnicodeDecodeError:
+            raise UserError("Le fichier CSV doit être encodé en UTF-8.")
+        finally:
+            stream.detach()
+
+    def _iter_xlsx_rows(self, data):
+        try:
+            import openpyxl
+        except ImportError:
+            raise UserError("La bibliothèque Python openpyxl est requise pour importer un fichier XLSX.")
+        workbook = openpyxl.load_workbook(data, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+
+    def _iter_member_values(self):
+        """
+        Valeurs des membres du fichier, lues en flux ligne par ligne.
+
+        Yields:
+            tuple: (numéro de ligne, {champ: valeur})
+        """
+        rows = self._iter_file_rows()
+        try:
+            header = next(rows, None)
+            if not header:
+                raise UserError("Le fichier est vide.")
+            columns = {
+                index: MEMBER_IMPORT_COLUMNS[_cell_to_str(name).lower()]
+                for index, name in enumerate(header)
+                if _cell_to_str(name).lower() in MEMBER_IMPORT_COLUMNS
+            }
+            if 'name' not in columns.values():
+                raise UserError(
+                    "Colonne 'Nom' introuvable dans l'en-tête.\n"
+                    f"Colonnes reconnues: {', '.join(sorted(set(MEMBER_IMPORT_COLUMNS)))}"
+                )
+            for line_number, row in enumerate(rows, start=2):
+                values = {
+                    field_name: _cell_to_str(row[index])
+                    for index, field_name in columns.items()
+                    if index < len(row) and _cell_to_str(row[index])
+                }
+                if values:
+                    yield line_number, values
+        finally:
+            # Ferme le fichier même si la lecture est interrompue
+            rows.close()
+
+    # ===== VALIDATION =====
+
+    def _get_existing_matricules(self):
+        """Matricules déjà enregistrés (une requête)."""
+        self.env['travel.member'].flush_model(['matricule'])
+        self.env.cr.execute("SELECT matricule FROM travel_member WHERE matricule IS NOT NULL")
+        return {matricule for matricule, in self.env.cr.fetchall()}
+
+    def _check_member_values(self, values):
+        """Erreur de validation d'une ligne (mêmes règles que travel.member), ou None."""
+        if not values.get('name'):
+            return "Nom manquant"
+        email = values.get('email')
+        if email and not self.env['travel.member'].EMAIL_PATTERN.match(email):
+            return f"Format d'email invalide: {email}"
+        phone = values.get('phone')
+        if phone and len(clean_phone(phone)) < PHONE_MIN_DIGITS:
+            return f"Numéro de téléphone trop court: {phone}"
+        return None
+
+    # ===== IMPORT =====
+
+    def _create_batch(self, batch, result):
+        """
+        Créer un lot de membres dans un savepoint.
+
+        Si le lot échoue (contrainte SQL, validation), il est rejoué ligne
+        par ligne pour n'écarter que les lignes fautives. create() complète
+        les valeurs (partner_id): chaque essai reçoit une copie.
+        """
+        Member = self.env['travel.member'].with_context(**MEMBER_IMPORT_CONTEXT)
+        try:
+            with self.env.cr.savepoint():
+                Member.create([dict(values) for _line_number, values in batch])
+            result['created'] += len(batch)
+            return
+        except (UserError, psycopg2.Error) as e:
+            _logger.info("Import membres: lot rejeté (%s), reprise ligne par ligne", e)
+        for line_number, values in batch:
+            try:
+                with self.env.cr.savepoint():
+                    Member.create([dict(values)])
+                result['created'] += 1
+            except (UserError, psycopg2.Error) as e:
+                result['errors'].append((line_number, str(e).splitlines()[0] if str(e) else repr(e)))
+
+    def action_import(self):
+        """
+        Vérifier l'en-tête du fichier et planifier l'import.
+
+        Les membres sont créés par le cron, hors de la requête HTTP; le
+        wizard affiche l'avancement enregistré après chaque lot.
+        """
+        self.ensure_one()
+        # Lit seulement l'en-tête et la première ligne: erreur immédiate si le fichier est invalide
+        rows = self._iter_member_values()
+        try:
+            next(rows, None)
+        finally:
+            rows.close()
+        self.write({
+            'state': 'running',
+            'total_count': 0,
+            'created_count': 0,
+            'duplicate_count': 0,
+            'error_count': 0,
+            'report': False,
+        })
+        self.env.ref('travel_pro_version1.cron_process_member_imports')._trigger()
+        return self._action_reopen()
+
+    def action_refresh(self):
+        """Rafraîchir l'avancement de l'import."""
+        return self._action_reopen()
+
+    def _action_reopen(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @api.model
+    def cron_process_member_imports(self):
+        """Cron: traiter les imports en cours (reprend les imports interrompus)."""
+        for wizard in self.search([('state', '=', 'running')], order='id'):
+            wizard._process_import()
+
+    def _process_import(self):
+        """
+        Importer les membres du fichier par lots.
+
+        Chaque lot est validé (commit) hors tests avec les compteurs du
+        wizard: une reprise saute les total_count lignes déjà traitées, les
+        lignes suivantes ne sont donc jamais comptées deux fois.
+        """
+        self.ensure_one()
+        batch_size = max(self.batch_size, 1)
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        existing_matricules = self._get_existing_matricules()
+        resume_after = self.total_count
+        result = {'total': 0, 'created': 0, 'duplicates': 0, 'errors': []}
+        batch = []
+
+        def flush_batch():
+            self._create_batch(batch, result)
+            batch.clear()
+            self._save_progress(result)
+            if auto_commit:
+                self.env.cr.commit()
+            self.env.invalidate_all()
+            _logger.info(
+                "Import membres %s: %d lignes lues, %d créés, %d doublons, %d erreurs",
+                self.id, self.total_count, self.created_count, self.duplicate_count, self.error_count,
+            )
+
+        for line_number, values in self._iter_member_values():
+            if resume_after:
+                resume_after -= 1
+                continue
+            result['total'] += 1
+            error = self._check_member_values(values)
+            if error:
+                result['errors'].append((line_number, error))
+                continue
+            matricule = values.get('matricule')
+            if matricule:
+                if matricule in existing_matricules:
+                    result['duplicates'] += 1
+                    continue
+                existing_matricules.add(matricule)
+            if self.company_id:
+                values['company_id'] = self.company_id.id
+            batch.append((line_number, values))
+            if len(batch) >= batch_size:
+                flush_batch()
+        flush_batch()
+
+        self.write({
+            'state': 'done',
+            'report': self._format_report(self.report, self.error_count),
+        })
+
+    def _save_progress(self, result):
+        """Ajouter les compteurs accumulés depuis le dernier lot validé, puis les remettre à zéro."""
+        report_lines = (self.report or '').splitlines()
+        report_lines += [
+            f"Ligne {line_number}: {message}"
+            for line_number, message in result['errors'][:max(0, MEMBER_IMPORT_MAX_ERRORS - len(report_lines))]
+        ]
+        self.write({
+            'total_count': self.total_count + result['total'],
+            'created_count': self.created_count + result['created'],
+            'duplicate_count': self.duplicate_count + result['duplicates'],
+            'error_count': self.error_count + len(result['errors']),
+            'report': '\n'.join(report_lines) or False,
+        })
+        result.update({'total': 0, 'created': 0, 'duplicates': 0, 'errors': []})
+
+    def _format_report(self, report, error_count):
+        """Rapport final: les erreurs détaillées, puis le nombre d'erreurs non listées."""
+        if not error_count:
+            return "Aucune erreur."
+        if error_count > MEMBER_IMPORT_MAX_ERRORS:
+            report += f"\n... et {error_count - MEMBER_IMPORT_MAX_ERRORS} autre(s) erreur(s)"
+        return report
+
+    def action_view_members(self):
+        """Ouvrir la liste des membres de la société importée."""
+        self.ensure_one()
+        action = {
+            'name': 'Membres',
+            'type': 'ir.actions.act_window',
+            'res_model': 'travel.member',
+            'view_mode': 'tree,form',
+        }
+        if self.company_id:
+            action['domain'] = [('company_id', '=', self.company_id.id)]
+        return action